@@ -0,0 +1,71 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Các nghĩa được nối bằng ' | ' (add_new_word_with_check) hoặc '/' (ví dụ: 'gạo/ cơm')
+ALTERNATIVE_SEPARATORS = re.compile(r'[|/]')
+# Tỉ lệ ký tự được phép sai, tương đương ngưỡng 0.9 của difflib trước đây
+MAX_ERROR_RATIO = 0.1
+
+
+# === FUNCTION: Chuẩn hoá câu trả lời ===
+# Viết thường, bỏ dấu tiếng Việt (kể cả đ -> d) và gộp khoảng trắng
+@lru_cache(maxsize=65536)
+def normalize_answer(text):
+    text = unicodedata.normalize('NFD', text.strip().lower())
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.replace('đ', 'd').split())
+
+
+# === FUNCTION: Các đáp án chấp nhận được của một nghĩa (có cache theo từng nghĩa) ===
+@lru_cache(maxsize=65536)
+def meaning_alternatives(meaning):
+    alternatives = [normalize_answer(meaning)]
+    for part in ALTERNATIVE_SEPARATORS.split(meaning):
+        part = normalize_answer(part)
+        if part and part not in alternatives:
+            alternatives.append(part)
+    return tuple(alternatives)
+
+
+# === FUNCTION: Khoảng cách chỉnh sửa có giới hạn ===
+# Chỉ tính trong dải |i - j| <= max_distance và dừng sớm khi cả hàng đã vượt ngưỡng
+def within_edit_distance(a, b, max_distance):
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    limit = max_distance + 1
+    previous = [j if j <= max_distance else limit for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [limit] * (len(b) + 1)
+        current[0] = i if i <= max_distance else limit
+        row_min = current[0]
+        ch = a[i - 1]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            value = min(previous[j - 1] + (ch != b[j - 1]), previous[j] + 1, current[j - 1] + 1)
+            current[j] = value if value < limit else limit
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return False
+        previous = current
+    return previous[len(b)] <= max_distance
+
+
+# === FUNCTION: So khớp câu trả lời với nghĩa đúng ===
+def answer_matches(answer, meaning):
+    answer = normalize_answer(answer)
+    if not answer:
+        return False
+    for expected in meaning_alternatives(meaning):
+        if not expected:
+            continue
+        if answer == expected or answer in expected or expected in answer:
+            return True
+        max_distance = int(max(len(answer), len(expected)) * MAX_ERROR_RATIO)
+        if max_distance and within_edit_distance(answer, expected, max_distance):
+            return True
+    return False
@@ -0,0 +1,73 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_import import BulkImporter  # noqa: E402
+from synthetic import make_deck, write_csv  # noqa: E402
+from vocab_store import FIELDNAMES, VocabStore  # noqa: E402
+
+IMPORT_FIELDS = ['word', 'meaning', 'phonetic', 'language', 'example', 'type', 'category', 'level']
+
+
+# File nhập m dòng: 10% là từ đã có trong deck (nghĩa khác -> gộp), còn lại là từ mới;
+# synthetic.make_deck đã có khoảng 1% cấp độ 'connector' (dòng lỗi)
+def make_import(deck, m, seed=1):
+    rng = random.Random(seed)
+    rows = [{field: row[field] for field in IMPORT_FIELDS} for row in make_deck(m, seed)]
+    for row in rng.sample(rows, m // 10):
+        existing = rng.choice(deck)
+        row.update(word=existing['word'], language=existing['language'], meaning=row['meaning'] + ' khác')
+    return rows
+
+
+def write_import(path, rows):
+    if path.endswith('.jsonl'):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+    elif path.endswith('.tsv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=IMPORT_FIELDS, dialect='excel-tab')
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        write_csv(path, IMPORT_FIELDS, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo tốc độ nhập hàng loạt (bulk_import.py)")
+    parser.add_argument('--deck', type=int, default=100_000, help="Số dòng vocab.csv có sẵn")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Số dòng file nhập")
+    parser.add_argument('--formats', nargs='+', default=['csv', 'tsv', 'jsonl'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    deck = make_deck(args.deck)
+    rows = make_import(deck, args.rows)
+    print(f"{'định dạng':>10}{'tiến trình':>12}{'dòng/s':>12}{'đọc+kiểm tra (s)':>18}{'tổng (s)':>10}"
+          f"{'thêm':>10}{'gộp':>9}{'lỗi':>7}")
+    for fmt in args.formats:
+        for workers in sorted(set(args.workers)):
+            with tempfile.TemporaryDirectory() as tmp:
+                vocab = os.path.join(tmp, 'vocab.csv')
+                source = os.path.join(tmp, f'import.{fmt}')
+                write_csv(vocab, FIELDNAMES, deck)
+                write_import(source, rows)
+                start = time.perf_counter()
+                store = VocabStore(vocab)
+                importer = BulkImporter(store, workers)
+                importer.run(source)
+                store.compact()
+                seconds = time.perf_counter() - start
+            print(f"{fmt:>10}{workers:>12}{importer.read / seconds:>12,.0f}{importer.parse_seconds:>18.1f}"
+                  f"{seconds:>10.1f}{importer.added:>10}{importer.merged:>9}{len(importer.errors):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import csv
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_deck, write_csv  # noqa: E402
+from vocab_store import FIELDNAMES, VocabStore, WordIndex  # noqa: E402
+
+SIZES = [100_000, 1_000_000]
+
+
+# Bộ nhớ còn giữ sau build() (tracemalloc); trả về cả kết quả để so sánh
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, current
+
+
+# Cách lưu cũ: mỗi dòng một dict (csv.DictReader) kèm số phiên bản
+def load_dicts(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    for rev, row in enumerate(rows, 1):
+        row['_rev'] = rev
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh bộ nhớ: danh sách dict và deck.Deck")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+
+    print(f"{'dòng':>10}{'dict (MB)':>12}{'Deck (MB)':>12}{'giảm':>8}{'kho (MB)':>12}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'vocab.csv')
+            write_csv(path, FIELDNAMES, make_deck(n))
+
+            rows, dict_bytes = measure(lambda: load_dicts(path))
+            store, store_bytes = measure(lambda: VocabStore(path, use_journal=False, use_snapshot=False))
+            # Phần của riêng các cột (không tính chỉ mục theo từ)
+            store._words = WordIndex()
+            gc.collect()
+            _, deck_bytes = measure(lambda: store.rows.copy())
+
+            assert len(rows) == len(store.rows)
+            for pos in range(0, n, max(1, n // 1000)):
+                assert {k: rows[pos][k] for k in FIELDNAMES} == dict(zip(FIELDNAMES, store.rows.record(pos)))
+            del rows, store
+
+        print(f"{n:>10}{dict_bytes / 1e6:>12.1f}{deck_bytes / 1e6:>12.1f}"
+              f"{dict_bytes / deck_bytes:>7.1f}x{store_bytes / 1e6:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_analytics import HistoryAnalytics  # noqa: E402
+from history_logger import HISTORY_FIELDNAMES  # noqa: E402
+from synthetic import make_deck, make_history, write_csv  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+# Lần đọc đầu (toàn bộ file), đọc lại từ file đệm, làm mới sau khi ghi thêm 1000 dòng của
+# hôm nay, rồi đo riêng bộ nhớ đỉnh (tracemalloc, chạy chậm hơn nhiều) của một lần đọc đầu.
+def run(path, deck, n):
+    analytics, first_s = timed(lambda: HistoryAnalytics(path).refresh())
+    _, reopen_s = timed(lambda: HistoryAnalytics(path).refresh())
+
+    extra = make_history(1000, deck, seed=n, days=1)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        csv.DictWriter(f, fieldnames=HISTORY_FIELDNAMES).writerows(extra)
+    _, append_s = timed(analytics.refresh)
+    _, query_s = timed(lambda: (analytics.periods('week'), analytics.streaks(), analytics.category_error_rates()))
+
+    os.remove(analytics.snapshot_path)
+    tracemalloc.start()
+    HistoryAnalytics(path).refresh()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_s, reopen_s, append_s, query_s, peak, len(analytics.days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thống kê history.csv theo ngày (history_analytics.py)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    deck = make_deck(5000)
+    print(f"{'dòng':>10}{'đọc đầu (s)':>13}{'mở lại (ms)':>13}{'+1000 dòng (ms)':>17}"
+          f"{'truy vấn (ms)':>15}{'bộ nhớ đỉnh (MB)':>18}{'ngày':>7}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'history.csv')
+            write_csv(path, HISTORY_FIELDNAMES, make_history(n, deck))
+            first_s, reopen_s, append_s, query_s, peak, days = run(path, deck, n)
+        print(f"{n:>10}{first_s:>13.2f}{reopen_s * 1000:>13.1f}{append_s * 1000:>17.1f}"
+              f"{query_s * 1000:>15.1f}{peak / 1e6:>18.1f}{days:>7}")
+
+
+if __name__ == '__main__':
+    main()
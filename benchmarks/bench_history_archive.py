@@ -0,0 +1,82 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import history_analytics  # noqa: E402
+import history_archive  # noqa: E402
+import history_stats  # noqa: E402
+from history_logger import HISTORY_FIELDNAMES  # noqa: E402
+from synthetic import make_deck, make_history, write_csv  # noqa: E402
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def disk_usage(path):
+    archive = path + history_archive.ARCHIVE_SUFFIX
+    total = os.path.getsize(path)
+    if os.path.isdir(archive):
+        total += sum(os.path.getsize(os.path.join(archive, name)) for name in os.listdir(archive))
+    return total
+
+
+# Báo cáo như lần đầu mở trong một tiến trình mới (chưa có ảnh chụp .stats.json/.analytics.jsonl)
+def cold_report(path):
+    for suffix in (history_stats.SNAPSHOT_SUFFIX, history_analytics.ANALYTICS_SUFFIX):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    history_stats._stats.clear()
+    history_analytics._analytics.clear()
+    history_archive._archives.clear()
+    today = date.today()
+    report = history_stats.get_history_stats(path).report()
+    analytics = history_analytics.get_history_analytics(path)
+    analytics.streaks()
+    analytics.totals(today - timedelta(days=6), today)
+    analytics.category_error_rates(today - timedelta(days=29), today)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo lưu trữ theo tháng của history.csv (history_archive.py)")
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--per-day', type=int, default=1000, help="Số sự kiện mỗi ngày")
+    args = parser.parse_args()
+
+    days = int(args.years * 365)
+    rows = days * args.per_day
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.csv')
+        deck = make_deck(2000)
+        write_csv(path, HISTORY_FIELDNAMES, make_history(rows, deck, days=days))
+        before_bytes = disk_usage(path)
+        before, before_s = timed(lambda: cold_report(path))
+        _, rotate_s = timed(lambda: history_archive.get_history_archive(path).rotate())
+        after_bytes = disk_usage(path)
+        after, after_s = timed(lambda: cold_report(path))
+        assert before == after
+        archive = history_archive.get_history_archive(path).load()
+        word = deck[0]['word']
+        _, trajectory_s = timed(lambda: history_analytics.get_history_analytics(path).word_trajectory(
+            word, date.today() - timedelta(days=60), date.today()))
+        manifest = os.path.getsize(archive.manifest_path)
+        active = os.path.getsize(path)
+
+    print(f"{rows:,} sự kiện trong {days} ngày")
+    print(f"dung lượng: {before_bytes / 1e6:.1f} MB -> {after_bytes / 1e6:.1f} MB "
+          f"(history.csv {active / 1e6:.1f} MB, manifest {manifest / 1e3:.0f} KB, {len(archive.segments)} tháng)")
+    print(f"chuyển lần đầu: {rotate_s:.1f} s")
+    print(f"báo cáo khi chưa có ảnh chụp: {before_s:.2f} s -> {after_s:.2f} s")
+    print(f"diễn biến một từ trong 60 ngày (giải nén 2-3 tháng): {trajectory_s:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
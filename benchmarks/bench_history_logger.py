@@ -0,0 +1,61 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as app  # noqa: E402
+
+EVENTS = 20_000
+
+
+# Phiên bản cũ của main.log_history: mở file và tạo DictWriter cho mỗi sự kiện
+def log_history_unbuffered(path, action, word, category, language):
+    file_exists = os.path.exists(path)
+    with open(path, mode='a', newline='', encoding='utf-8') as f:
+        fieldnames = ['action', 'timestamp', 'word', 'category', 'language']
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if not file_exists:
+            writer.writeheader()
+        writer.writerow({
+            'action': action,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'word': word,
+            'category': category,
+            'language': language
+        })
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history_old.csv')
+        start = time.perf_counter()
+        for i in range(EVENTS):
+            log_history_unbuffered(path, 'wrong', f'word{i}', 'food', 'English')
+        old = EVENTS / (time.perf_counter() - start)
+
+        # Đường ghi thật: main.log_history (đọc cấu hình lưu trữ, rồi HistoryLogger)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            path = os.path.join(tmp, app.HISTORY_FILE)
+            start = time.perf_counter()
+            for i in range(EVENTS):
+                app.log_history('wrong', f'word{i}', 'food', 'English')
+            app.flush_history()
+            new = EVENTS / (time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+
+        with open(path, newline='', encoding='utf-8') as f:
+            assert sum(1 for _ in csv.DictReader(f)) == EVENTS
+
+    print(f"log_history (cũ):  {old:>12,.0f} sự kiện/giây")
+    print(f"log_history (mới): {new:>12,.0f} sự kiện/giây ({new / old:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
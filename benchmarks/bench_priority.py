@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import review_queue  # noqa: E402
+from deck import Deck  # noqa: E402
+from main import calculate_priority  # noqa: E402
+from vector_priority import review_mask, score_all, top_n_indices  # noqa: E402
+from vocab_store import FIELDNAMES  # noqa: E402
+
+SIZES = [10_000, 100_000, 1_000_000]
+TOP_N = 10
+
+
+def make_deck(n, seed=0):
+    rng = random.Random(seed)
+    today = date.today().toordinal()
+    records = []
+    for i in range(n):
+        reviewed = rng.random() < 0.6
+        row = {
+            'word': f'word{i}',
+            'language': rng.choice(['English', 'Korean']),
+            'review_count': str(rng.randint(1, 8)) if reviewed else '0',
+            'last_review': date.fromordinal(today - rng.randint(0, 365)).isoformat() if reviewed else '',
+            'is_mastered': 'True' if reviewed and rng.random() < 0.3 else 'False',
+            'last_result': rng.choice(['correct', 'wrong']) if reviewed else '',
+            'level': str(rng.randint(1, 5)),
+        }
+        # Một ít giá trị bất thường (giữ nguyên văn trong Deck) và số lượt ôn lớn
+        if rng.random() < 0.001:
+            row['review_count'] = rng.choice([' 3', '40000', 'x'])
+            row['last_review'] = rng.choice(['2024-1-5', ' ', row['last_review']])
+            row['level'] = rng.choice([' 2', 'a', ''])
+        records.append([row.get(field, '') for field in FIELDNAMES])
+    deck = Deck(FIELDNAMES)
+    deck.extend(records, range(1, n + 1))
+    return deck
+
+
+class _Store:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def add_listener(self, listener):
+        pass
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+# Hàng đợi ôn tập dựng từng dòng (như khi không có numpy)
+def scalar_queue(deck):
+    sys.modules['vector_priority'] = None
+    try:
+        return review_queue.ReviewQueue(_Store(deck))
+    finally:
+        del sys.modules['vector_priority']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo tính độ ưu tiên hàng loạt (vector_priority.py)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+
+    today = date.today().toordinal()
+    print(f"{'rows':>10} {'scalar (s)':>11} {'vector (s)':>11} {'speedup':>8} "
+          f"{'queue (s)':>10} {'queue vec (s)':>14} {'speedup':>8}")
+    for n in args.sizes:
+        deck = make_deck(n)
+        rows = [deck.to_dict(pos) for pos in range(n)]
+
+        expected, scalar = timed(lambda: [calculate_priority(row) for row in rows])
+        scores, vector = timed(lambda: score_all(deck, today))
+        assert scores.tolist() == expected, "Kết quả vector khác với calculate_priority"
+
+        order = sorted(range(n), key=lambda pos: -expected[pos])
+        assert top_n_indices(scores, TOP_N).tolist() == order[:TOP_N]
+        mask = review_mask(deck, 'Korean', 3)
+        allowed = [pos for pos in order if mask[pos]]
+        assert top_n_indices(scores, TOP_N, mask).tolist() == allowed[:TOP_N]
+
+        old, queue_s = timed(lambda: scalar_queue(deck))
+        new, queue_vec = timed(lambda: review_queue.ReviewQueue(_Store(deck)))
+        assert (new._entries, dict(new._active), dict(new._zero)) == \
+            (old._entries, dict(old._active), dict(old._zero))
+        assert new.top('Korean', 3, TOP_N) == old.top('Korean', 3, TOP_N)
+        print(f"{n:>10} {scalar:>11.3f} {vector:>11.4f} {scalar / vector:>7.0f}x "
+              f"{queue_s:>10.3f} {queue_vec:>14.3f} {queue_s / queue_vec:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import related_words  # noqa: E402
+from synthetic import make_deck, write_csv  # noqa: E402
+from vocab_store import FIELDNAMES, VocabStore  # noqa: E402
+
+QUERIES = 1000
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+# Dựng, đọc lại từ file, truy vấn và thêm từ trên bộ từ n dòng
+def run(path, n, queries):
+    store = VocabStore(path, use_journal=False)
+    index, build_s = timed(lambda: related_words.RelatedIndex(store))
+    _, load_s = timed(lambda: related_words.RelatedIndex(store))
+
+    rng = random.Random(0)
+    latencies = []
+    for pos in rng.sample(range(len(store)), min(queries, len(store))):
+        _, seconds = timed(lambda: index.related(pos, 5, language=store.rows.get(pos, 'language')))
+        latencies.append(seconds)
+
+    store.add_listener(index._on_change)
+    adds = []
+    for i in range(100):
+        row = dict(store.row(rng.randrange(n)))
+        row['word'] = f"{row['word']}x{i}"
+        _, seconds = timed(lambda: store._append(row))
+        adds.append(seconds)
+    return build_s, load_s, latencies, adds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo chỉ mục từ liên quan (related_words.py)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=QUERIES)
+    args = parser.parse_args()
+
+    print(f"{'dòng':>10}{'dựng (s)':>10}{'đọc (ms)':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}"
+          f"{'max (ms)':>10}{'thêm (ms)':>11}{'file (MB)':>11}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'vocab.csv')
+            write_csv(path, FIELDNAMES, make_deck(n))
+            build_s, load_s, latencies, adds = run(path, n, args.queries)
+            size = os.path.getsize(path + related_words.RELATED_SUFFIX)
+        print(f"{n:>10}{build_s:>10.1f}{load_s * 1000:>10.1f}{percentile(latencies, 0.5) * 1000:>10.2f}"
+              f"{percentile(latencies, 0.99) * 1000:>10.2f}{max(latencies) * 1000:>10.2f}"
+              f"{percentile(adds, 0.5) * 1000:>11.2f}{size / 1e6:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
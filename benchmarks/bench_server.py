@@ -0,0 +1,145 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILES = ('vocab.csv', 'history.csv', 'config.json')
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+# Một kết nối keep-alive, gửi lần lượt các yêu cầu và đo thời gian từng yêu cầu
+async def client(host, port, requests, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for name, method, target, body in requests:
+            data = json.dumps(body).encode('utf-8') if body is not None else b''
+            start = time.perf_counter()
+            writer.write((f"{method} {target} HTTP/1.1\r\nHost: {host}\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n").encode('latin-1') + data)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                if key.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies[name].append(time.perf_counter() - start)
+            if status >= 500:
+                errors[name] += 1
+    finally:
+        writer.close()
+
+
+def build_requests(words, count, write_ratio, rng):
+    requests = []
+    for _ in range(count):
+        word = rng.choice(words)
+        if rng.random() < write_ratio:
+            requests.append(('grade+apply', 'POST', '/grade',
+                             {'answers': [{'word': word['word'], 'answer': word['meaning']}],
+                              'language': word['language'], 'apply': True}))
+            continue
+        kind = rng.choice(['lookup', 'review', 'grade', 'game'])
+        if kind == 'lookup':
+            requests.append((kind, 'GET', f"/lookup?word={quote(word['word'])}"
+                                          f"&language={quote(word['language'])}", None))
+        elif kind == 'review':
+            requests.append((kind, 'GET', f"/review?language={quote(word['language'])}&level=5", None))
+        elif kind == 'grade':
+            requests.append((kind, 'POST', '/grade',
+                             {'answers': [{'word': word['word'], 'answer': word['meaning']}],
+                              'language': word['language']}))
+        else:
+            requests.append((kind, 'GET', f"/game/round?language={quote(word['language'])}&level=5",
+                             None))
+    return requests
+
+
+async def run_load(host, port, words, clients, per_client, write_ratio, seed):
+    rng = random.Random(seed)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(host, port, build_requests(words, per_client, write_ratio, rng), latencies, errors)
+        for _ in range(clients)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Máy chủ không khởi động được trên cổng {port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo độ trễ p50/p99 của server.py")
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help="Số yêu cầu mỗi client")
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Chạy máy chủ trên bản sao dữ liệu để không thay đổi vocab.csv / history.csv thật
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in DATA_FILES:
+            if os.path.exists(os.path.join(ROOT, name)):
+                shutil.copy(os.path.join(ROOT, name), tmp)
+        with open(os.path.join(tmp, 'vocab.csv'), newline='', encoding='utf-8') as f:
+            words = [row for row in csv.DictReader(f) if row['word'].strip()]
+
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'), '--port', str(port)],
+                                  cwd=tmp, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port('127.0.0.1', port)
+            elapsed, latencies, errors = asyncio.run(run_load(
+                '127.0.0.1', port, words, args.clients, args.requests, args.write_ratio, args.seed))
+        finally:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} yêu cầu, {args.clients} client, {elapsed:.2f} s ({total / elapsed:,.0f} yêu cầu/giây)")
+    print(f"{'endpoint':<14}{'số lượng':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'lỗi':>6}")
+    for name in sorted(latencies):
+        values = latencies[name]
+        print(f"{name:<14}{len(values):>10}{percentile(values, 0.5) * 1000:>12.2f}"
+              f"{percentile(values, 0.99) * 1000:>12.2f}{errors[name]:>6}")
+    every = [v for values in latencies.values() for v in values]
+    print(f"{'tất cả':<14}{len(every):>10}{percentile(every, 0.5) * 1000:>12.2f}"
+          f"{percentile(every, 0.99) * 1000:>12.2f}{sum(errors.values()):>6}")
+
+
+if __name__ == '__main__':
+    main()
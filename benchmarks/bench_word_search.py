@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import word_search  # noqa: E402
+from synthetic import make_deck, write_csv  # noqa: E402
+from vocab_store import FIELDNAMES, VocabStore  # noqa: E402
+
+QUERIES = 1000
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+# Một lỗi gõ ngẫu nhiên: thiếu, thừa, sai một ký tự hoặc đảo hai ký tự liền nhau
+def misspell(rng, word):
+    i = rng.randrange(len(word))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return word[:i] + word[i + 1:]
+    if kind == 1:
+        return word[:i] + rng.choice('aeiourst') + word[i:]
+    if kind == 2:
+        return word[:i] + rng.choice('aeiourst') + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+# Dựng, đọc lại từ file, tra gần đúng / theo tiền tố và thêm từ trên bộ từ n dòng.
+# Trả về thêm tỉ lệ lỗi gõ tìm lại được đúng từ gốc trong 5 gợi ý đầu.
+def run(path, n, queries):
+    store = VocabStore(path, use_journal=False)
+    index, build_s = timed(lambda: word_search.WordSearch(store))
+    _, load_s = timed(lambda: word_search.WordSearch(store))
+
+    rng = random.Random(0)
+    words = [store.rows.get(pos, 'word').lower() for pos in rng.sample(range(len(store)), min(queries, len(store)))]
+    words = [word for word in words if len(word) > word_search.MIN_FUZZY_LENGTH]
+    fuzzy, prefix, hits = [], [], 0
+    for word in words:
+        typo = misspell(rng, word)
+        found, seconds = timed(lambda: index.suggest(typo, 5))
+        fuzzy.append(seconds)
+        hits += typo == word or word in [match for match, _ in found]
+        _, seconds = timed(lambda: index.complete(word[:3], 5))
+        prefix.append(seconds)
+
+    store.add_listener(index._on_change)
+    adds = []
+    for i in range(100):
+        row = dict(store.row(rng.randrange(n)))
+        row['word'] = f"{row['word']}x{i}"
+        _, seconds = timed(lambda: store._append(row))
+        adds.append(seconds)
+    return build_s, load_s, fuzzy, prefix, adds, hits / len(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo chỉ mục tra từ (word_search.py)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=QUERIES)
+    args = parser.parse_args()
+
+    print(f"{'dòng':>10}{'dựng (s)':>10}{'đọc (ms)':>10}{'gần đúng p50/p99 (ms)':>24}"
+          f"{'tiền tố p50/p99 (ms)':>23}{'thêm (ms)':>11}{'file (MB)':>11}{'tìm lại':>9}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'vocab.csv')
+            write_csv(path, FIELDNAMES, make_deck(n))
+            build_s, load_s, fuzzy, prefix, adds, recall = run(path, n, args.queries)
+            size = os.path.getsize(path + word_search.SEARCH_SUFFIX)
+        print(f"{n:>10}{build_s:>10.1f}{load_s * 1000:>10.1f}"
+              f"{percentile(fuzzy, 0.5) * 1000:>15.3f}/{percentile(fuzzy, 0.99) * 1000:<8.3f}"
+              f"{percentile(prefix, 0.5) * 1000:>14.3f}/{percentile(prefix, 0.99) * 1000:<8.3f}"
+              f"{percentile(adds, 0.5) * 1000:>11.3f}{size / 1e6:>11.1f}{recall:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(ROOT))
+
+from synthetic import write_dataset  # noqa: E402
+
+MAIN = os.path.join(os.path.dirname(ROOT), 'main.py')
+BUDGET_MS = 100
+# Không được nạp trước khi người dùng chọn chức năng: thư viện nặng (requirements.txt)
+# và các module đọc dữ liệu
+LAZY_MODULES = (
+    'numpy', 'matplotlib', 'language_tool_python',
+    'vocab_store', 'deck', 'snapshot', 'sqlite_store', 'review_queue', 'review_journal',
+    'history_logger', 'history_stats', 'history_analytics', 'history_archive', 'profiles', 'game_index',
+    'game_rounds', 'sm2', 'vector_priority', 'answer_matcher', 'related_words', 'word_search',
+)
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+# Chạy main.py, chọn "7. Thoát" ngay ở menu đầu tiên
+def run_menu(directory, *options):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *options, MAIN], cwd=directory, input='7\n',
+                            capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stderr
+
+
+# -X importtime: (thời gian riêng, tên module) của mọi module được import
+def parse_importtime(stderr):
+    return [(int(match.group(1)), match.group(4))
+            for match in map(IMPORT_LINE.match, stderr.splitlines()) if match]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=f"Kiểm tra thời gian khởi động: python main.py phải tới menu trong {BUDGET_MS} ms")
+    parser.add_argument('--rows', type=int, default=100_000,
+                        help="Số dòng vocab.csv giả lập (không được đọc khi chỉ mở menu)")
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, args.rows)
+        with open(os.path.join(tmp, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump({"language": "English", "user_level": 3}, f)
+
+        run_menu(tmp)  # làm nóng bộ nhớ đệm file và __pycache__
+        wall = [run_menu(tmp)[0] for _ in range(args.repeat)]
+        imports = parse_importtime(run_menu(tmp, '-X', 'importtime')[1])
+
+    wall_ms = statistics.median(wall) * 1000
+    imported = {name for _, name in imports}
+    loaded = sorted(imported.intersection(LAZY_MODULES)
+                    | {name for name in imported if name.split('.')[0] in LAZY_MODULES})
+
+    print(f"python main.py tới menu rồi thoát: trung vị {wall_ms:.1f} ms "
+          f"(min {min(wall) * 1000:.1f} ms, {args.repeat} lần), ngân sách {args.budget_ms:.0f} ms")
+    print(f"Tổng thời gian import: {sum(us for us, _ in imports) / 1000:.1f} ms, {len(imports)} module")
+    print("Import chậm nhất (thời gian riêng):")
+    for us, name in sorted(imports, reverse=True)[:10]:
+        print(f"  {us / 1000:>7.2f} ms  {name}")
+
+    failed = False
+    if wall_ms > args.budget_ms:
+        print(f"❌ Vượt ngân sách khởi động: {wall_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"❌ Nạp sớm khi mới mở menu: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("✅ Khởi động trong ngân sách")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 1_000
+ANSWERS = 1_000
+ROUNDS = 1_000
+SAVE_BATCH = 10
+
+
+@contextlib.contextmanager
+def quiet(answer='y'):
+    # Các hàm menu in ra console và hỏi input(): trả lời sẵn và bỏ phần in ra
+    original = builtins.input
+    builtins.input = lambda *args: answer
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        builtins.input = original
+
+
+# === FUNCTION: Đo một đường nóng ===
+# cold: lần gọi đầu tiên; warm: nhanh nhất trong các lần sau; peak_kb: bộ nhớ cấp phát thêm
+# tối đa trong một lần gọi (tracemalloc, đo riêng vì tracemalloc làm chậm)
+def measure(func, repeat, memory, reset=None):
+    timings = []
+    for _ in range(repeat + 1):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    result = {'cold_s': timings[0], 'warm_s': min(timings[1:]) if repeat else timings[0]}
+    if memory:
+        if reset is not None:
+            reset()
+        tracemalloc.start()
+        func()
+        result['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+# Chạy trong thư mục tạm chứa bộ dữ liệu n dòng (xem run_size)
+def run_workloads(n, repeat, memory):
+    from synthetic import write_dataset
+
+    start = time.perf_counter()
+    deck, _ = write_dataset('.', n)
+    generate_s = time.perf_counter() - start
+
+    import main
+    import vocab_store
+    from game_index import GameIndex
+    from game_rounds import game_vocab, generate_rounds
+
+    rng = random.Random(0)
+    lookups = [rng.choice(deck)['word'] if i % 2 else f'missing{i}' for i in range(LOOKUPS)]
+    # Câu trả lời đúng, sai một ký tự và sai hẳn
+    answers = [(rng.choice([row['meaning'], row['meaning'][:-1] + 'x', 'sai hoàn toàn']), row['meaning'])
+               for row in rng.sample(deck, min(ANSWERS, n))]
+
+    results = {'generate_dataset': {'cold_s': generate_s, 'warm_s': generate_s}}
+
+    # Lần đầu đọc CSV và ghi vocab.csv.snapshot, các lần sau đọc ảnh chụp
+    def load():
+        main.open_store()
+
+    results['load_deck'] = measure(load, repeat, memory, reset=vocab_store._stores.clear)
+    load()
+
+    def exists():
+        for word in lookups:
+            main.word_exists(word)
+
+    results['word_exists_x1000'] = measure(exists, repeat, memory)
+    results['get_words_to_review'] = measure(lambda: main.get_words_to_review('English', 5), repeat, memory)
+
+    # Trước learn_new_words (cũng đọc history.csv) để lần đầu là lần đọc toàn bộ lịch sử
+    def report():
+        with quiet():
+            main.generate_learning_report()
+
+    results['generate_learning_report'] = measure(report, repeat, memory)
+
+    def learn():
+        with quiet():
+            main.learn_new_words('English', 5)
+
+    results['learn_new_words'] = measure(learn, repeat, memory)
+
+    def save():
+        words = [dict(row) for row in rng.sample(main.open_store().rows, SAVE_BATCH)]
+        for word in words:
+            main.update_word(word, rng.random() < 0.7)
+        main.save_vocab_list(words)
+
+    results['save_vocab_list'] = measure(save, repeat, memory)
+
+    def similar():
+        for answer, meaning in answers:
+            main.is_similar(answer, meaning)
+
+    results['is_similar_x1000'] = measure(similar, repeat, memory)
+
+    vocab = game_vocab(main.open_store(), 'English', 5)
+    results['game_index'] = measure(lambda: GameIndex(vocab), repeat, memory)
+    index = GameIndex(vocab)
+
+    def rounds():
+        generated = generate_rounds(index, rng)
+        for _ in range(ROUNDS):
+            next(generated)
+
+    results['game_rounds_x1000'] = measure(rounds, repeat, memory)
+    return results
+
+
+# Mỗi kích thước chạy trong một tiến trình và thư mục riêng để bộ nhớ đệm không ảnh hưởng lẫn nhau
+def run_size(n, repeat, memory):
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [sys.executable, os.path.abspath(__file__), '--single', str(n), '--repeat', str(repeat)]
+        if not memory:
+            command.append('--no-memory')
+        output = subprocess.run(command, cwd=tmp, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    for size, ops in results.items():
+        print(f"\n📦 {int(size):,} dòng")
+        print(f"{'thao tác':<26}{'cold (ms)':>12}{'warm (ms)':>12}{'peak (KB)':>12}"
+              + (f"{'so với gốc':>12}" if baseline else ''))
+        for name, values in ops.items():
+            line = (f"{name:<26}{values['cold_s'] * 1000:>12.2f}{values['warm_s'] * 1000:>12.2f}"
+                    f"{values.get('peak_kb', float('nan')):>12.0f}")
+            old = (baseline or {}).get(size, {}).get(name)
+            if old and old['warm_s']:
+                line += f"{values['warm_s'] / old['warm_s']:>11.2f}x"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo các đường nóng trên bộ dữ liệu giả lập")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help="Bỏ qua đo bộ nhớ (tracemalloc)")
+    parser.add_argument('--out', default=None, help="File JSON kết quả (mặc định benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', default=None, help="File JSON của lần chạy trước để so sánh")
+    parser.add_argument('--single', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        print(json.dumps(run_workloads(args.single, args.repeat, not args.no_memory)))
+        return
+
+    commit = git_commit()
+    results = {}
+    for n in args.sizes:
+        print(f"⏱️ {n:,} dòng...", flush=True)
+        results[str(n)] = run_size(n, args.repeat, not args.no_memory)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    out = args.out or os.path.join(ROOT, 'benchmarks', 'results', f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'commit': commit,
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"\n✅ Đã ghi kết quả vào {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import vocab_store  # noqa: E402
+from vocab_store import FIELDNAMES  # noqa: E402
+
+
+def make_deck(path, words):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for i in range(words):
+            writer.writerow({'word': f'word{i}', 'meaning': f'nghĩa {i}', 'language': 'English',
+                             'review_count': '0', 'is_mastered': 'False', 'level': '1',
+                             'category': 'test', 'type': 'noun'})
+
+
+# Một tiến trình: ôn ngẫu nhiên các từ như review_session (update_word + save_vocab_list)
+# và đổi một khóa cấu hình riêng; in ra số lần ôn của từng từ (JSON)
+def worker(directory, worker_id, rounds, batch):
+    os.chdir(directory)
+    # Nhật ký nhỏ để việc nén vào vocab.csv xảy ra nhiều lần trong lúc chạy
+    vocab_store.COMPACT_JOURNAL_BYTES = 16 * 1024
+    from main import load_config, save_config, save_vocab_list, update_word
+    from vocab_store import get_store
+
+    rng = random.Random(worker_id)
+    reviewed = Counter()
+    for _ in range(rounds):
+        store = get_store('vocab.csv')
+        words = []
+        for i in rng.sample(range(len(store)), batch):
+            word = dict(store.row(i))
+            update_word(word, rng.random() < 0.7)
+            words.append(word)
+            reviewed[word['word']] += 1
+        save_vocab_list(words)
+
+    config = load_config()
+    config[f'worker_{worker_id}'] = rounds
+    save_config(config)
+    print(json.dumps(reviewed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhiều tiến trình cùng ôn tập trên một vocab.csv")
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=5)
+    parser.add_argument('--words', type=int, default=50)
+    parser.add_argument('--worker', nargs=2, metavar=('DIR', 'ID'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker[0], int(args.worker[1]), args.rounds, args.batch)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_deck(os.path.join(tmp, 'vocab.csv'), args.words)
+        with open(os.path.join(tmp, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump({'language': 'English', 'user_level': 1}, f)
+
+        # Mỗi worker là một tiến trình Python riêng, thoát bình thường (chạy cả phần nén khi thoát)
+        workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker', tmp, str(i),
+                                     '--rounds', str(args.rounds), '--batch', str(args.batch)],
+                                    stdout=subprocess.PIPE)
+                   for i in range(args.processes)]
+        expected = Counter()
+        for process in workers:
+            output, _ = process.communicate()
+            if process.returncode:
+                sys.exit(f"Worker lỗi (mã {process.returncode})")
+            expected.update(json.loads(output))
+
+        # Đọc lại từ đầu (vocab.csv + nhật ký còn lại) như một tiến trình mới
+        actual = {row['word']: int(row['review_count'])
+                  for row in vocab_store.VocabStore(os.path.join(tmp, 'vocab.csv')).rows}
+        with open(os.path.join(tmp, 'config.json'), encoding='utf-8') as f:
+            config = json.load(f)
+
+    lost = sum(expected[word] - actual.get(word, 0) for word in expected)
+    total = sum(expected.values())
+    missing_keys = [i for i in range(args.processes) if f'worker_{i}' not in config]
+    print(f"{args.processes} tiến trình, {total} lượt ôn, {len(actual)} từ")
+    print(f"Lượt ôn bị mất: {lost}, khóa cấu hình bị mất: {len(missing_keys)}")
+    if lost or missing_keys or len(actual) != args.words:
+        sys.exit(1)
+    print("✅ Không mất cập nhật nào")
+
+
+if __name__ == '__main__':
+    main()
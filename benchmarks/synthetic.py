@@ -0,0 +1,138 @@
+import argparse
+import csv
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_logger import HISTORY_FIELDNAMES  # noqa: E402
+from vocab_store import FIELDNAMES  # noqa: E402
+
+# Phân bố lấy theo vocab.csv hiện có
+LANGUAGES = [('English', 50), ('Korean', 50)]
+TYPES = [('noun', 52), ('verb', 15), ('adjective', 10), ('phrase', 6), ('adverb', 5),
+         ('preposition', 3), ('phrasal verb', 3), ('collocation', 3), ('question word', 2), ('adj', 1)]
+CATEGORIES = [('education', 13), ('work', 12), ('place', 7), ('food', 4), ('action', 4), ('law', 4),
+              ('media', 4), ('object', 3), ('nature', 3), ('body', 3), ('time', 3), ('location', 3),
+              ('emotion', 3), ('color', 2), ('family', 2), ('health', 2), ('travel', 2), ('sport', 2)]
+LEVELS = [('1', 20), ('2', 20), ('3', 20), ('4', 19), ('5', 20), ('connector', 1)]
+ACTIONS = [('learn', 35), ('correct', 30), ('wrong', 15), ('lookup', 20)]
+
+VIETNAMESE_SYLLABLES = ('vui vẻ nhà trường học sinh giáo viên công việc thời gian nước ăn uống '
+                        'đi về làm bàn ghế sách vở màu đỏ xanh gia đình bạn bè luật báo chí '
+                        'thành tựu sức khỏe du lịch thể thao cơ thể tay chân mắt tai').split()
+ENGLISH_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+HANGUL_START, HANGUL_END = 0xAC00, 0xD7A3
+
+
+def _choices(rng, weighted):
+    values, weights = zip(*weighted)
+    return lambda: rng.choices(values, weights)[0]
+
+
+def _english_word(rng):
+    return ''.join(rng.choice(ENGLISH_LETTERS) for _ in range(rng.randint(3, 10)))
+
+
+def _korean_word(rng):
+    return ''.join(chr(rng.randint(HANGUL_START, HANGUL_END)) for _ in range(rng.randint(1, 3)))
+
+
+def _meaning(rng):
+    meaning = ' '.join(rng.choice(VIETNAMESE_SYLLABLES) for _ in range(rng.randint(1, 3)))
+    # Một số từ có nhiều nghĩa nối bằng ' | ' như add_new_word_with_check
+    if rng.random() < 0.1:
+        meaning += ' | ' + ' '.join(rng.choice(VIETNAMESE_SYLLABLES) for _ in range(rng.randint(1, 2)))
+    return meaning
+
+
+# === FUNCTION: Sinh một bộ từ vựng n dòng ===
+# learned_ratio: tỉ lệ từ đã học (review_count >= 1)
+def make_deck(n, seed=0, learned_ratio=0.4, today=None):
+    rng = random.Random(seed)
+    today = (today or date.today()).toordinal()
+    language = _choices(rng, LANGUAGES)
+    word_type = _choices(rng, TYPES)
+    category = _choices(rng, CATEGORIES)
+    level = _choices(rng, LEVELS)
+
+    seen = set()
+    rows = []
+    for i in range(n):
+        lang = language()
+        word = _english_word(rng) if lang == 'English' else _korean_word(rng)
+        if word in seen:
+            word = f'{word}{i}'
+        seen.add(word)
+
+        learned = rng.random() < learned_ratio
+        review_count = min(int(rng.expovariate(0.4)) + 1, 20) if learned else 0
+        rows.append({
+            'word': word,
+            'meaning': _meaning(rng),
+            'phonetic': f'/{word}/' if lang == 'English' else word,
+            'language': lang,
+            'review_count': str(review_count),
+            'last_review': date.fromordinal(today - rng.randint(0, 120)).isoformat() if learned else '',
+            'is_mastered': 'True' if learned and rng.random() < 0.2 else 'False',
+            'last_result': ('wrong' if rng.random() < 0.25 else 'correct') if learned else '',
+            'example': f'Example sentence with {word}.',
+            'type': word_type(),
+            'category': category(),
+            'level': level(),
+        })
+    return rows
+
+
+# === FUNCTION: Sinh n sự kiện lịch sử trên các từ của deck ===
+def make_history(n, deck, seed=0, days=180, now=None):
+    rng = random.Random(seed + 1)
+    action = _choices(rng, ACTIONS)
+    now = now or datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=days)
+    step = timedelta(days=days) / max(n, 1)
+    rows = []
+    for i in range(n):
+        word = rng.choice(deck)
+        rows.append({
+            'action': action(),
+            'timestamp': (start + step * i).strftime("%Y-%m-%d %H:%M:%S"),
+            'word': word['word'],
+            'category': word['category'],
+            'language': word['language'],
+        })
+    return rows
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_dataset(directory, rows, history_rows=None, seed=0):
+    deck = make_deck(rows, seed)
+    write_csv(os.path.join(directory, 'vocab.csv'), FIELDNAMES, deck)
+    history = make_history(rows if history_rows is None else history_rows, deck, seed)
+    write_csv(os.path.join(directory, 'history.csv'), HISTORY_FIELDNAMES, history)
+    return deck, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh vocab.csv / history.csv giả lập")
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--history', type=int, default=None, help="Số dòng lịch sử (mặc định = --rows)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='.')
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    deck, history = write_dataset(args.out, args.rows, args.history, args.seed)
+    print(f"✅ {len(deck)} từ và {len(history)} sự kiện lịch sử trong {args.out}")
+
+
+if __name__ == '__main__':
+    main()
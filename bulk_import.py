@@ -0,0 +1,270 @@
+import argparse
+import csv
+import io
+import json
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from vocab_store import FIELDNAMES, get_store, normalize_word
+
+LANGUAGES = ('English', 'Korean')
+LEVELS = ('1', '2', '3', '4', '5')
+# Loại từ hợp lệ; nhiều loại ghép bằng '/' (ví dụ: noun/adjective)
+WORD_TYPES = ('noun', 'verb', 'adjective', 'adj', 'adverb', 'preposition', 'conjunction', 'pronoun',
+              'determiner', 'interjection', 'phrase', 'phrasal verb', 'collocation', 'idiom',
+              'question word', 'direction', 'number')
+# Mỗi tiến trình con đọc và kiểm tra khoảng này byte của file mỗi lượt
+CHUNK_BYTES = 4 * 1024 * 1024
+# Số lỗi in ra khi kết thúc (tổng số lỗi luôn được báo)
+MAX_REPORTED_ERRORS = 10
+FORMATS = ('csv', 'tsv', 'jsonl')
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'json':
+        extension = 'jsonl'
+    if extension not in FORMATS:
+        raise ValueError(f"không nhận ra định dạng của {path} (chỉ hỗ trợ {', '.join(FORMATS)})")
+    return extension
+
+
+# === FUNCTION: Kiểm tra và chuẩn hoá một dòng nhập ===
+# Trả về tuple theo FIELDNAMES, hoặc ném ValueError kèm lý do. Cột chỉ có ở từ mới
+# (review_count, last_review...) lấy giá trị mặc định như add_new_word_with_check.
+def validate_row(record, today):
+    word = (record.get('word') or '').strip()
+    meaning = (record.get('meaning') or '').strip()
+    if not word:
+        raise ValueError("thiếu từ")
+    if not meaning:
+        raise ValueError(f"'{word}': thiếu nghĩa")
+    language = (record.get('language') or '').strip().capitalize()
+    if language not in LANGUAGES:
+        raise ValueError(f"'{word}': ngôn ngữ '{language}' không hợp lệ ({'/'.join(LANGUAGES)})")
+    level = (record.get('level') or '').strip()
+    if level not in LEVELS:
+        raise ValueError(f"'{word}': cấp độ '{level}' không hợp lệ (1–5)")
+    type_ = (record.get('type') or '').strip().lower()
+    if type_ and not all(part.strip() in WORD_TYPES for part in type_.split('/')):
+        raise ValueError(f"'{word}': loại từ '{type_}' không hợp lệ")
+    row = {
+        'word': word,
+        'meaning': meaning,
+        'phonetic': (record.get('phonetic') or '').strip(),
+        'language': language,
+        'review_count': (record.get('review_count') or '0').strip(),
+        'last_review': (record.get('last_review') or today).strip(),
+        'is_mastered': (record.get('is_mastered') or 'False').strip(),
+        'last_result': (record.get('last_result') or '').strip(),
+        'example': (record.get('example') or '').strip(),
+        'type': type_,
+        'category': (record.get('category') or '').strip().lower(),
+        'level': level,
+    }
+    return tuple(row[field] for field in FIELDNAMES)
+
+
+# === FUNCTION: Chia file thành các đoạn [start, end) kết thúc ở ranh giới dòng ===
+# Với CSV/TSV, dấu xuống dòng nằm trong ô có ngoặc kép (câu ví dụ nhiều dòng) không phải ranh
+# giới: chỉ cắt ở '\n' mà số dấu '"' từ đầu file tới đó là chẵn ("" trong ô vẫn giữ tính chẵn).
+# Trả về [(start, end, số thứ tự dòng đầu tiên)].
+def plan_chunks(mapped, start, quoted, chunk_bytes=CHUNK_BYTES):
+    chunks = []
+    line = 2 if quoted else 1
+    while start < len(mapped):
+        target = min(len(mapped), start + chunk_bytes)
+        end, quotes = start, 0
+        while end < len(mapped):
+            newline = mapped.find(b'\n', max(end, target - 1))
+            next_end = len(mapped) if newline < 0 else newline + 1
+            if quoted:
+                quotes += mapped[end:next_end].count(b'"')
+            end = next_end
+            if quotes % 2 == 0:
+                break
+        chunks.append((start, end, line))
+        line += mapped[start:end].count(b'\n')
+        start = end
+    return chunks
+
+
+# === FUNCTION: Đọc và kiểm tra một đoạn (chạy trong tiến trình con) ===
+# Trả về (các dòng hợp lệ theo thứ tự trong file, [(số dòng, lý do)] của các dòng lỗi)
+def parse_chunk(path, fmt, fieldnames, start, end, first_line, today):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = mapped[start:end].decode('utf-8')
+    rows, errors = [], []
+    if fmt == 'jsonl':
+        for number, line in enumerate(text.split('\n'), first_line):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("mỗi dòng phải là một object JSON")
+                rows.append(validate_row({k: str(v) for k, v in record.items() if v is not None}, today))
+            except ValueError as e:
+                errors.append((number, str(e)))
+        return rows, errors
+
+    reader = csv.reader(io.StringIO(text, newline=''), dialect='excel-tab' if fmt == 'tsv' else 'excel')
+    line = first_line
+    for values in reader:
+        if values:
+            try:
+                if len(values) > len(fieldnames):
+                    raise ValueError(f"có {len(values)} cột, tiêu đề chỉ có {len(fieldnames)}")
+                rows.append(validate_row(dict(zip(fieldnames, values)), today))
+            except ValueError as e:
+                errors.append((line, str(e)))
+        line = first_line + reader.line_num
+    return rows, errors
+
+
+# === FUNCTION: Gộp nghĩa và ví dụ vào một từ đã có ===
+# Cùng quy tắc với add_new_word_with_check: nghĩa mới (không phân biệt hoa thường) nối bằng
+# ' | ', ví dụ mới nối bằng '\n- '. Trả về True nếu dòng thay đổi.
+def merge_entry(row, meaning, example):
+    changed = False
+    if meaning and meaning.lower() not in row['meaning'].lower():
+        row['meaning'] = f"{row['meaning']} | {meaning}" if row['meaning'] else meaning
+        changed = True
+    if example and example not in row['example']:
+        row['example'] = f"{row['example']}\n- {example}" if row['example'] else example
+        changed = True
+    return changed
+
+
+# === CLASS: Nhập hàng loạt từ file CSV/TSV/JSONL vào vocab.csv ===
+# Đọc và kiểm tra chạy song song trên các đoạn của file (ProcessPoolExecutor), còn việc ghi
+# vào kho chỉ do tiến trình chính làm, theo đúng thứ tự trong file: từ đã có (cùng từ viết
+# thường và cùng ngôn ngữ, tra qua chỉ mục crc32 của kho) được gộp nghĩa/ví dụ, từ mới được
+# thêm. Cả lượt nhập được ghi một lần (store.persist) khi xong; nếu một đoạn sau bị lỗi thì các
+# đoạn trước đó đã được áp dụng vẫn được giữ và ghi lại.
+class BulkImporter:
+    def __init__(self, store, workers=None, chunk_bytes=CHUNK_BYTES):
+        self.store = store
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.added = self.merged = self.unchanged = self.read = 0
+        self.errors = []
+        self.parse_seconds = 0.0
+
+    def _jobs(self, path):
+        fmt = detect_format(path)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return fmt, None, []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if fmt == 'jsonl':
+                    return fmt, None, plan_chunks(mapped, 0, False, self.chunk_bytes)
+                header_end = mapped.find(b'\n') + 1 or len(mapped)
+                header = mapped[:header_end].decode('utf-8-sig')
+                fieldnames = next(csv.reader([header], dialect='excel-tab' if fmt == 'tsv' else 'excel'), [])
+                fieldnames = [name.strip().lower() for name in fieldnames]
+                missing = {'word', 'meaning', 'language', 'level'} - set(fieldnames)
+                if missing:
+                    raise ValueError(f"{path}: tiêu đề thiếu cột {', '.join(sorted(missing))}")
+                return fmt, fieldnames, plan_chunks(mapped, header_end, True, self.chunk_bytes)
+
+    # Các đoạn đã đọc xong, theo thứ tự trong file
+    def _parsed(self, path):
+        fmt, fieldnames, chunks = self._jobs(path)
+        today = datetime.today().strftime('%Y-%m-%d')
+        args = [[path] * len(chunks), [fmt] * len(chunks), [fieldnames] * len(chunks),
+                *zip(*chunks), [today] * len(chunks)] if chunks else []
+        if len(chunks) <= 1 or self.workers == 1:
+            yield from map(parse_chunk, *args)
+            return
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+            yield from pool.map(parse_chunk, *args)
+
+    # Áp dụng một đoạn đã đọc, theo thứ tự trong file. Từ mới được gom lại và thêm một lượt
+    # (store.add_pending); từ mới lặp lại trong cùng đoạn được gộp vào lần xuất hiện đầu tiên.
+    def _apply(self, records, changed):
+        store = self.store
+        new_rows, new_index = [], {}
+        for record in records:
+            row = dict(zip(FIELDNAMES, record))
+            positions = store.positions_for_word(row['word'], row['language'])
+            if not positions:
+                key = (normalize_word(row['word']), row['language'])
+                if key not in new_index:
+                    new_index[key] = len(new_rows)
+                    new_rows.append(row)
+                    self.added += 1
+                elif merge_entry(new_rows[new_index[key]], row['meaning'], row['example']):
+                    self.merged += 1
+                else:
+                    self.unchanged += 1
+                continue
+            for pos in positions:
+                current = dict(store.row(pos))
+                if merge_entry(current, row['meaning'], row['example']):
+                    store.update(pos, current)
+                    changed.append(pos)
+                    self.merged += 1
+                else:
+                    self.unchanged += 1
+        changed.extend(store.add_pending(new_rows))
+
+    def run(self, path):
+        changed = []
+        try:
+            parsed = self._parsed(path)
+            while True:
+                start = time.perf_counter()
+                result = next(parsed, None)
+                self.parse_seconds += time.perf_counter() - start
+                if result is None:
+                    break
+                rows, errors = result
+                self.read += len(rows) + len(errors)
+                self.errors.extend((path, line, reason) for line, reason in errors)
+                self._apply(rows, changed)
+        finally:
+            self.store.persist(sorted(set(changed)))
+        return len(changed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhập hàng loạt từ vựng từ file CSV, TSV hoặc JSONL")
+    parser.add_argument('paths', nargs='+', help="File cần nhập (.csv, .tsv, .jsonl)")
+    parser.add_argument('--vocab', default='vocab.csv')
+    parser.add_argument('--workers', type=int, default=None, help="Số tiến trình đọc file (mặc định: số CPU)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = get_store(args.vocab)
+    importer = BulkImporter(store, args.workers)
+    for path in args.paths:
+        added, merged = importer.added, importer.merged
+        try:
+            importer.run(path)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            added, merged = importer.added - added, importer.merged - merged
+            if added or merged:
+                print(f"❌ Nhập dở {path}: {e} (đã giữ {added} từ mới và {merged} dòng gộp "
+                      f"từ các đoạn trước chỗ lỗi)")
+            else:
+                print(f"❌ Không nhập được {path}: {e}")
+    store.compact()
+    seconds = time.perf_counter() - start
+
+    print(f"✅ Đã đọc {importer.read} dòng: thêm {importer.added} từ mới, gộp nghĩa/ví dụ của "
+          f"{importer.merged} dòng vào từ đã có, bỏ qua {importer.unchanged} dòng không có gì mới, "
+          f"{len(importer.errors)} dòng lỗi")
+    print(f"⏱️ {seconds:.1f} s ({importer.read / seconds:,.0f} dòng/s; chờ đọc và kiểm tra "
+          f"{importer.parse_seconds:.1f} s với {importer.workers} tiến trình)")
+    for path, line, reason in importer.errors[:MAX_REPORTED_ERRORS]:
+        print(f"⚠️ {path}:{line}: {reason}")
+    if len(importer.errors) > MAX_REPORTED_ERRORS:
+        print(f"... và {len(importer.errors) - MAX_REPORTED_ERRORS} lỗi khác")
+
+
+if __name__ == '__main__':
+    main()
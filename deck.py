@@ -0,0 +1,551 @@
+from array import array
+from collections.abc import Mapping, Sequence
+from datetime import date
+from functools import lru_cache
+from itertools import accumulate, compress
+from zlib import crc32
+
+# Số phiên bản của dòng trong bộ nhớ (không ghi ra file), xem VocabStore.update
+REVISION = '_rev'
+
+# Các cột ít giá trị khác nhau: lưu mã số nguyên nhỏ trỏ vào bảng giá trị dùng chung
+CODED_FIELDS = ('language', 'is_mastered', 'last_result', 'type', 'category')
+
+def _count_code(value):
+    if value.isdigit() and value.isascii() and (value == '0' or value[0] != '0') and len(value) < 10:
+        return int(value)
+    return None
+
+
+def _level_code(value):
+    code = _count_code(value)
+    return code if code is not None and code <= 127 else None
+
+
+@lru_cache(maxsize=4096)
+def _day_code(value):
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return None
+    return day.toordinal() if day.isoformat() == value else None
+
+
+@lru_cache(maxsize=4096)
+def _day_string(code):
+    return date.fromordinal(code).isoformat()
+
+
+_SMALL_NUMBERS = [str(i) for i in range(256)]
+
+
+def _number_string(code):
+    return _SMALL_NUMBERS[code] if code < 256 else str(code)
+
+
+# Cột số: (typecode, mã chuỗi rỗng, mã giá trị bất thường, chuỗi -> mã, mã -> chuỗi).
+# Giá trị không ở dạng chuẩn (vd. 'connector', ' 3') giữ nguyên văn trong một dict riêng
+# để ghi ra file đúng như cũ. last_review lưu số thứ tự ngày (date.toordinal), 0 là chưa ôn.
+NUMBER_FIELDS = {
+    'review_count': ('I', 0xFFFFFFFE, 0xFFFFFFFF, _count_code, _number_string),
+    'last_review': ('I', 0, 0xFFFFFFFF, _day_code, _day_string),
+    'level': ('b', -2, -1, _level_code, _number_string),
+}
+
+
+def _text(value):
+    return '' if value is None else value if isinstance(value, str) else str(value)
+
+
+# Cột đọc từ ảnh chụp (snapshot.py) là memoryview chỉ đọc trên mmap, không chép dữ liệu;
+# cột được chép ra array / bytearray ở lần ghi đầu tiên
+def _typecode(values):
+    return values.typecode if isinstance(values, array) else values.format
+
+
+def _writable(values):
+    return values if isinstance(values, array) else array(values.format, values.tobytes())
+
+
+def _copy(values):
+    return array(values.typecode, values) if isinstance(values, array) else _writable(values)
+
+
+# Mặt nạ 0/1 theo mã: accept(mã) cho biết mã có được chọn không
+def _mask(codes, accept):
+    if codes.itemsize == 1:
+        # Mã một byte: dịch cả cột một lượt bằng bytes.translate
+        signed = _typecode(codes) == 'b'
+        table = bytes(accept(u - 256 if signed and u > 127 else u) for u in range(256))
+        return codes.tobytes().translate(table)
+    cache = {}
+    return bytes(cache[c] if c in cache else cache.setdefault(c, accept(c)) for c in codes)
+
+
+# === CLASS: Cột chuỗi (UTF-8 nối liền trong một bytearray) ===
+# Mỗi dòng giữ vị trí bắt đầu và độ dài; giá trị mới dài hơn được nối vào cuối,
+# phần bỏ đi được dọn khi chiếm quá nửa bộ đệm.
+class _Strings:
+    __slots__ = ('data', 'starts', 'lengths', 'garbage')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.starts = array('I')
+        self.lengths = array('I')
+        self.garbage = 0
+
+    def get(self, pos):
+        start = self.starts[pos]
+        return str(self.data[start:start + self.lengths[pos]], 'utf-8')
+
+    def raw(self, pos):
+        start = self.starts[pos]
+        return bytes(self.data[start:start + self.lengths[pos]])
+
+    def _own(self):
+        if not isinstance(self.data, bytearray):
+            self.data = bytearray(self.data)
+            self.starts = _writable(self.starts)
+            self.lengths = _writable(self.lengths)
+
+    def append(self, value):
+        self._own()
+        data = _text(value).encode('utf-8')
+        self.starts.append(len(self.data))
+        self.lengths.append(len(data))
+        self.data += data
+
+    def extend(self, values):
+        self._own()
+        encoded = [value.encode('utf-8') for value in values]
+        lengths = list(map(len, encoded))
+        self.starts.extend(accumulate(lengths[:-1], initial=len(self.data)))
+        self.lengths.extend(lengths)
+        self.data += b''.join(encoded)
+
+    def set(self, pos, value):
+        self._own()
+        data = _text(value).encode('utf-8')
+        start, length = self.starts[pos], self.lengths[pos]
+        if len(data) <= length:
+            self.data[start:start + len(data)] = data
+            self.garbage += length - len(data)
+        else:
+            self.starts[pos] = len(self.data)
+            self.data += data
+            self.garbage += length
+        self.lengths[pos] = len(data)
+        if self.garbage > len(self.data) // 2:
+            self._pack()
+
+    def _pack(self):
+        data = bytearray()
+        for pos, (start, length) in enumerate(zip(self.starts, self.lengths)):
+            self.starts[pos] = len(data)
+            data += self.data[start:start + length]
+        self.data = data
+        self.garbage = 0
+
+    # crc32 của rows dòng đầu theo cách lưu: size byte dữ liệu đầu, starts và lengths
+    def digest(self, rows, size, crc=0):
+        with memoryview(self.data) as data, memoryview(self.starts) as starts, \
+                memoryview(self.lengths) as lengths:
+            crc = crc32(data[:size], crc)
+            crc = crc32(starts[:rows], crc)
+            return crc32(lengths[:rows], crc)
+
+    def dump(self, out):
+        out.bytes(self.data)
+        out.array(self.starts)
+        out.array(self.lengths)
+        out.number(self.garbage)
+
+    def load(self, src):
+        self.data = src.bytes()
+        self.starts = src.array()
+        self.lengths = src.array()
+        self.garbage = src.number()
+
+    def copy(self):
+        column = _Strings()
+        column.data = bytearray(self.data)
+        column.starts = _copy(self.starts)
+        column.lengths = _copy(self.lengths)
+        column.garbage = self.garbage
+        return column
+
+
+# === CLASS: Cột mã hoá theo bảng giá trị (interned) ===
+# Mã một byte, tự chuyển sang hai/bốn byte khi bảng vượt quá 256 / 65536 giá trị
+class _Codes:
+    __slots__ = ('codes', 'values', 'lookup')
+
+    def __init__(self):
+        self.codes = array('B')
+        self.values = []
+        self.lookup = {}
+
+    def code(self, value):
+        value = _text(value)
+        code = self.lookup.get(value)
+        if code is None:
+            self.codes = _writable(self.codes)
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+            if code == 256:
+                self.codes = array('H', self.codes)
+            elif code == 65536:
+                self.codes = array('I', self.codes)
+        return code
+
+    def get(self, pos):
+        return self.values[self.codes[pos]]
+
+    def raw(self, pos):
+        return self.values[self.codes[pos]]
+
+    def append(self, value):
+        code = self.code(value)
+        self.codes = _writable(self.codes)
+        self.codes.append(code)
+
+    def extend(self, values):
+        lookup = self.lookup
+        codes = [lookup[value] if value in lookup else self.code(value) for value in values]
+        # code() có thể đã đổi sang mảng rộng hơn
+        self.codes = _writable(self.codes)
+        self.codes.extend(codes)
+
+    def set(self, pos, value):
+        code = self.code(value)
+        self.codes = _writable(self.codes)
+        self.codes[pos] = code
+
+    def mask(self, accept):
+        values = self.values
+        return _mask(self.codes, lambda c: 1 if c < len(values) and accept(values[c]) else 0)
+
+    def dump(self, out):
+        out.strings(self.values)
+        out.array(self.codes)
+
+    def load(self, src):
+        self.values = src.strings()
+        self.codes = src.array()
+        self.lookup = {value: code for code, value in enumerate(self.values)}
+
+    def copy(self):
+        column = _Codes()
+        column.codes = _copy(self.codes)
+        column.values = list(self.values)
+        column.lookup = dict(self.lookup)
+        return column
+
+
+# === CLASS: Cột số (array) với mã riêng cho chuỗi rỗng và giá trị bất thường ===
+class _Numbers:
+    __slots__ = ('codes', 'irregular', 'spec')
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.codes = array(spec[0])
+        self.irregular = {}
+
+    def _encode(self, pos, value):
+        _, empty, irregular, parse, _ = self.spec
+        value = _text(value)
+        code = parse(value) if value else empty
+        if code is None:
+            self.irregular[pos] = value
+            return irregular
+        self.irregular.pop(pos, None)
+        return code
+
+    def get(self, pos):
+        _, empty, irregular, _, format_code = self.spec
+        code = self.codes[pos]
+        if code == empty:
+            return ''
+        if code == irregular:
+            return self.irregular[pos]
+        return format_code(code)
+
+    def raw(self, pos):
+        code = self.codes[pos]
+        return self.irregular[pos] if code == self.spec[2] else code
+
+    def append(self, value):
+        self.codes = _writable(self.codes)
+        self.codes.append(self._encode(len(self.codes), value))
+
+    def extend(self, values):
+        self.codes = _writable(self.codes)
+        start = len(self.codes)
+        known = {}
+        codes = []
+        for pos, value in enumerate(values, start):
+            code = known.get(value)
+            if code is None:
+                code = self._encode(pos, value)
+                if code != self.spec[2]:
+                    known[value] = code
+            codes.append(code)
+        self.codes.extend(codes)
+
+    def set(self, pos, value):
+        self.codes = _writable(self.codes)
+        self.codes[pos] = self._encode(pos, value)
+
+    def mask(self, accept):
+        _, empty, irregular, _, format_code = self.spec
+        mask = _mask(self.codes, lambda c: 0 if c == irregular else
+                     1 if accept('' if c == empty else format_code(c)) else 0)
+        if self.irregular:
+            mask = bytearray(mask)
+            for pos, value in self.irregular.items():
+                mask[pos] = 1 if accept(value) else 0
+        return mask
+
+    def dump(self, out):
+        out.array(self.codes)
+        out.array(array('I', self.irregular))
+        out.strings(list(self.irregular.values()))
+
+    def load(self, src):
+        self.codes = src.array()
+        positions = src.array()
+        self.irregular = dict(zip(positions, src.strings()))
+
+    def copy(self):
+        column = _Numbers(self.spec)
+        column.codes = _copy(self.codes)
+        column.irregular = dict(self.irregular)
+        return column
+
+
+# Sau khi đọc ảnh chụp, số phiên bản là dãy first, first + 1, ... và chỉ tạo mảng khi bị ghi
+class _Revisions:
+    __slots__ = ('codes', 'first', 'size')
+
+    def __init__(self, first=0, size=0):
+        self.codes = None if size else array('Q')
+        self.first = first
+        self.size = size
+
+    def __len__(self):
+        return self.size if self.codes is None else len(self.codes)
+
+    def _materialize(self):
+        if self.codes is None:
+            self.codes = array('Q', range(self.first, self.first + self.size))
+        return self.codes
+
+    def get(self, pos):
+        if self.codes is None:
+            if not 0 <= pos < self.size:
+                raise IndexError('revision index out of range')
+            return self.first + pos
+        return self.codes[pos]
+
+    raw = get
+
+    def append(self, value):
+        self._materialize().append(value or 0)
+
+    def extend(self, values):
+        self._materialize().extend(values)
+
+    def set(self, pos, value):
+        self._materialize()[pos] = value or 0
+
+    def copy(self):
+        column = _Revisions(self.first, self.size)
+        column.codes = None if self.codes is None else array('Q', self.codes)
+        return column
+
+
+def _column(field):
+    if field in CODED_FIELDS:
+        return _Codes()
+    if field in NUMBER_FIELDS:
+        return _Numbers(NUMBER_FIELDS[field])
+    return _Strings()
+
+
+# === CLASS: Khung nhìn một dòng của Deck ===
+# Dùng như dict (row['word'], row.get, dict(row)); đọc và ghi thẳng vào các cột
+class Row(Mapping):
+    __slots__ = ('_deck', '_pos')
+
+    def __init__(self, deck, pos):
+        self._deck = deck
+        self._pos = pos
+
+    def __getitem__(self, key):
+        return self._deck.columns[key].get(self._pos)
+
+    def get(self, key, default=None):
+        column = self._deck.columns.get(key)
+        return default if column is None else column.get(self._pos)
+
+    def __setitem__(self, key, value):
+        self._deck.columns[key].set(self._pos, value)
+
+    def __iter__(self):
+        return iter(self._deck.columns)
+
+    def __len__(self):
+        return len(self._deck.columns)
+
+    def __contains__(self, key):
+        return key in self._deck.columns
+
+    # Hai dòng của cùng một Deck chỉ bằng nhau khi là cùng một dòng (như dict có số phiên bản riêng)
+    def __eq__(self, other):
+        if isinstance(other, Row) and other._deck is self._deck:
+            return other._pos == self._pos
+        return Mapping.__eq__(self, other)
+
+    __hash__ = None
+
+    def copy(self):
+        return self._deck.to_dict(self._pos)
+
+    def __repr__(self):
+        return f'Row({dict(self)!r})'
+
+
+# === CLASS: Bộ từ vựng dạng cột ===
+# Thay cho danh sách dict: word/meaning/phonetic/example lưu UTF-8 nối liền,
+# language/type/category/... lưu mã trỏ vào bảng giá trị, review_count/last_review/level
+# lưu trong array. deck[pos] trả về Row; deck[pos] = dict ghi đè cả dòng.
+class Deck(Sequence):
+    def __init__(self, fieldnames):
+        self.fieldnames = list(fieldnames)
+        self.columns = {field: _column(field) for field in self.fieldnames}
+        self.columns[REVISION] = _Revisions()
+        self._revisions = self.columns[REVISION]
+
+    def __len__(self):
+        return len(self._revisions)
+
+    def __getitem__(self, pos):
+        size = len(self)
+        if pos < 0:
+            pos += size
+        if not 0 <= pos < size:
+            raise IndexError('deck index out of range')
+        return Row(self, pos)
+
+    def __setitem__(self, pos, row):
+        if not 0 <= pos < len(self):
+            raise IndexError('deck assignment index out of range')
+        for field, column in self.columns.items():
+            column.set(pos, row.get(field, ''))
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield Row(self, pos)
+
+    def append(self, row):
+        for field, column in self.columns.items():
+            column.append(row.get(field, ''))
+
+    # Thêm nhiều dòng một lượt (đọc CSV): records là các danh sách chuỗi theo thứ tự
+    # fieldnames, revisions là số phiên bản tương ứng
+    def extend(self, records, revisions):
+        if not records:
+            return
+        for field, values in zip(self.fieldnames, zip(*records)):
+            self.columns[field].extend(values)
+        self._revisions.extend(revisions)
+
+    def get(self, pos, field):
+        return self.columns[field].get(pos)
+
+    def set(self, pos, field, value):
+        self.columns[field].set(pos, value)
+
+    # Bản sao dict của một dòng (kể cả số phiên bản), nhanh hơn dict(deck[pos])
+    def to_dict(self, pos):
+        return {field: column.get(pos) for field, column in self.columns.items()}
+
+    # Giá trị các cột theo thứ tự fieldnames (ghi CSV)
+    def record(self, pos):
+        return [self.columns[field].get(pos) for field in self.fieldnames]
+
+    def records(self):
+        for pos in range(len(self)):
+            yield self.record(pos)
+
+    # Hai dòng có cùng giá trị ở mọi cột (không tính số phiên bản)
+    def same(self, pos, other, other_pos):
+        return all(self.columns[field].raw(pos) == other.columns[field].raw(other_pos)
+                   for field in self.fieldnames)
+
+    def copy(self):
+        deck = Deck.__new__(Deck)
+        deck.fieldnames = list(self.fieldnames)
+        deck.columns = {field: column.copy() for field, column in self.columns.items()}
+        deck._revisions = deck.columns[REVISION]
+        return deck
+
+    # --- ảnh chụp nhị phân (xem snapshot.py) ---
+    def dump(self, out):
+        out.strings(self.fieldnames)
+        out.number(len(self))
+        for field in self.fieldnames:
+            self.columns[field].dump(out)
+
+    # crc32 của rows dòng đầu các cột chuỗi fields, theo đúng cách chúng nằm trong bộ nhớ.
+    # Trả về (crc, sizes); truyền lại rows và sizes (số byte dữ liệu của từng cột lúc đó) để
+    # tính lại đúng phần ấy về sau: kết quả giữ nguyên nếu các dòng đó không bị sửa, kể cả khi
+    # đã thêm dòng mới, qua ảnh chụp và copy() (ghi lại cùng giá trị tại chỗ cũng không đổi).
+    # None nếu deck không còn đủ rows dòng / sizes byte.
+    def digest(self, fields, rows=None, sizes=None):
+        columns = [self.columns[field] for field in fields]
+        rows = len(self) if rows is None else rows
+        sizes = [len(column.data) for column in columns] if sizes is None else list(sizes)
+        if rows > len(self) or any(size > len(column.data) for column, size in zip(columns, sizes)):
+            return None
+        crc = 0
+        for column, size in zip(columns, sizes):
+            crc = column.digest(rows, size, crc)
+        return crc, sizes
+
+    # Số phiên bản không được lưu: các dòng nhận first_revision, first_revision + 1, ...
+    @classmethod
+    def load(cls, src, first_revision):
+        deck = cls(src.strings())
+        size = src.number()
+        for field in deck.fieldnames:
+            deck.columns[field].load(src)
+        deck._revisions = deck.columns[REVISION] = _Revisions(first_revision, size)
+        return deck
+
+    # Hàm pos -> bool: giá trị cột field của dòng pos có bằng value không. Dùng khi chỉ cần
+    # xét vài nghìn dòng (mask() duyệt cả cột); chỉ đúng tới lần ghi tiếp theo vào deck.
+    def matcher(self, field, value):
+        column = self.columns[field]
+        if isinstance(column, _Codes):
+            codes, code = column.codes, column.lookup.get(_text(value))
+            return (lambda pos: False) if code is None else (lambda pos: codes[pos] == code)
+        return lambda pos: column.get(pos) == value
+
+    # Mặt nạ bytes (1 = chọn) các dòng có giá trị cột thoả accept(chuỗi);
+    # accept chỉ được gọi một lần cho mỗi giá trị khác nhau
+    def mask(self, field, accept):
+        return self.columns[field].mask(accept)
+
+    # Vị trí các dòng thoả mọi mặt nạ, theo thứ tự tăng dần
+    def select(self, masks):
+        size = len(self)
+        if not masks:
+            return list(range(size))
+        mask = masks[0]
+        if len(masks) > 1:
+            combined = int.from_bytes(mask, 'little')
+            for other in masks[1:]:
+                combined &= int.from_bytes(other, 'little')
+            mask = combined.to_bytes(size, 'little')
+        return list(compress(range(size), mask))
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: không có khoá tư vấn, chỉ còn ghi nguyên tử
+    fcntl = None
+
+LOCK_SUFFIX = '.lock'
+
+
+# === CLASS: Khoá tư vấn (fcntl.flock) trên file <path>.lock ===
+# Khoá giữa các tiến trình và giữa các luồng (mỗi lần khoá mở một file descriptor riêng).
+# Khoá lồng nhau trong cùng một luồng không khoá lại lần nữa; riêng exclusive() lồng trong
+# shared() báo lỗi: flock nâng khoá bằng cách nhả rồi khoá lại, nên không nâng được an toàn.
+class FileLock:
+    def __init__(self, path):
+        self.path = path + LOCK_SUFFIX
+        self._local = threading.local()
+
+    @contextmanager
+    def _acquire(self, exclusive):
+        held = getattr(self._local, 'exclusive', None)
+        if held is not None:
+            if exclusive and not held:
+                raise RuntimeError(f"{self.path}: không thể khoá độc quyền khi đang giữ khoá chung")
+            yield
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._local.exclusive = exclusive
+            yield
+        finally:
+            self._local.exclusive = None
+            os.close(fd)
+
+    def shared(self):
+        return self._acquire(False)
+
+    def exclusive(self):
+        return self._acquire(True)
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+# === FUNCTION: Khoá dùng chung cho một file trong tiến trình ===
+def get_lock(path):
+    key = os.path.abspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = FileLock(path)
+        return lock
+
+
+def _fsync_dir(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# === FUNCTION: Ghi nguyên tử (file tạm, fsync, os.replace) ===
+# Nếu bị crash giữa chừng, file cũ vẫn còn nguyên. binary=True: file nhị phân ('wb').
+@contextmanager
+def atomic_write(path, newline=None, encoding='utf-8', binary=False):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    try:
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        except OSError:
+            os.chmod(tmp_path, 0o644)
+        f = os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', newline=newline, encoding=encoding)
+        with f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
@@ -0,0 +1,49 @@
+import random
+from collections import defaultdict
+
+GROUP_FIELDS = ('type', 'category')
+# Số lần thử lấy mẫu ngẫu nhiên ngoài nhóm trước khi dựng danh sách phần bù
+REJECTION_TRIES = 16
+
+
+# === CLASS: Chỉ mục nội dung mini game ===
+# Dựng một lần cho mỗi phiên chơi: mảng các nghĩa không trùng (kèm vị trí của từng nghĩa)
+# và các nhóm từ theo loại từ / chủ đề, để mỗi câu hỏi chỉ cần lấy mẫu ngẫu nhiên.
+class GameIndex:
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.meanings = list(dict.fromkeys(w['meaning'] for w in vocab))
+        self.meaning_pos = {meaning: i for i, meaning in enumerate(self.meanings)}
+
+        # Chỉ các từ có cả loại từ và chủ đề mới dùng cho trò chọn từ khác nhóm
+        self.grouped = [w for w in vocab if w.get('category') and w.get('type')]
+        self.groups = {field: defaultdict(list) for field in GROUP_FIELDS}
+        for word in self.grouped:
+            for field in GROUP_FIELDS:
+                self.groups[field][word[field]].append(word)
+        self.group_keys = {field: list(self.groups[field]) for field in GROUP_FIELDS}
+        self._complements = {}
+
+    # k nghĩa khác nhau, khác correct_meaning, theo thứ tự ngẫu nhiên
+    def distractor_meanings(self, correct_meaning, k=3, rng=random):
+        skip = self.meaning_pos.get(correct_meaning)
+        pool = len(self.meanings) - (skip is not None)
+        picks = rng.sample(range(pool), min(k, pool))
+        return [self.meanings[i + (skip is not None and i >= skip)] for i in picks]
+
+    def random_group(self, field, rng=random):
+        return rng.choice(self.group_keys[field])
+
+    # Một từ ngoài nhóm: thử lấy mẫu ngẫu nhiên, nếu nhóm quá lớn thì dùng danh sách phần bù
+    def word_outside(self, field, group, rng=random):
+        members = len(self.groups[field].get(group, ()))
+        if members == len(self.grouped):
+            return None
+        for _ in range(REJECTION_TRIES):
+            word = rng.choice(self.grouped)
+            if word[field] != group:
+                return word
+        key = (field, group)
+        if key not in self._complements:
+            self._complements[key] = [w for w in self.grouped if w[field] != group]
+        return rng.choice(self._complements[key])
@@ -0,0 +1,150 @@
+import argparse
+import json
+import queue
+import random
+import threading
+
+from game_index import GameIndex
+
+ROUND_TYPES = ('match', 'type', 'odd')
+# Số câu hỏi được chuẩn bị sẵn trong hàng đợi khi chơi
+PREFETCH_SIZE = 8
+
+
+# === FUNCTION: Các từ dùng cho mini game (đã học ít nhất một lần) ===
+def game_vocab(store, lang, user_level):
+    return [
+        row for row in store.filter(language=lang, max_level=user_level)
+        if row['review_count'].strip().isdigit() and int(row['review_count']) >= 1
+    ]
+
+
+# === Dựng câu hỏi (không đọc/ghi console) ===
+# Mỗi câu hỏi là một dict ghi được ra JSON; 'type' cho biết loại trò chơi.
+def build_match_round(index, rng=random):
+    word = rng.choice(index.vocab)
+    correct_answer = word['meaning']
+    options = [correct_answer] + index.distractor_meanings(correct_answer, 3, rng)
+    rng.shuffle(options)
+    return {'type': 'match', 'word': word['word'], 'options': options, 'answer': correct_answer}
+
+
+def build_type_round(index, rng=random):
+    word = rng.choice(index.vocab)
+    return {'type': 'type', 'meaning': word['meaning'], 'answer': word['word']}
+
+
+# Trả về None nếu không dựng được câu hỏi từ nhóm được chọn
+def build_odd_round(index, rng=random):
+    if len(index.grouped) < 4:
+        return None
+    grouping_field = rng.choice(['type', 'category'])
+    selected_group = index.random_group(grouping_field, rng)
+    same_group_words = index.groups[grouping_field][selected_group]
+    if len(same_group_words) < 3:
+        return None
+    wrong_word = index.word_outside(grouping_field, selected_group, rng)
+    if wrong_word is None:
+        return None
+
+    options = rng.sample(same_group_words, 3) + [wrong_word]
+    rng.shuffle(options)
+    return {
+        'type': 'odd',
+        'field': grouping_field,
+        'group': selected_group,
+        'options': [w['word'] for w in options],
+        'answer_index': options.index(wrong_word),
+        'answer': wrong_word['word'],
+        'answer_meaning': wrong_word['meaning'],
+    }
+
+
+ROUND_BUILDERS = {
+    'match': build_match_round,
+    'type': build_type_round,
+    'odd': build_odd_round,
+}
+
+
+# === GENERATOR: Chuỗi câu hỏi ngẫu nhiên vô hạn ===
+# Câu hỏi không dựng được (nhóm quá nhỏ) được bỏ qua và chọn lại loại trò chơi
+def generate_rounds(index, rng=random):
+    while True:
+        game_round = ROUND_BUILDERS[rng.choice(ROUND_TYPES)](index, rng)
+        if game_round is not None:
+            yield game_round
+
+
+# === CLASS: Chuẩn bị trước câu hỏi trong một luồng nền ===
+# Luồng nền lấy từ generate_rounds và đẩy vào hàng đợi có giới hạn; phiên chơi chỉ việc get().
+class RoundPrefetcher:
+    def __init__(self, index, size=PREFETCH_SIZE, rng=None):
+        self.rounds = generate_rounds(index, rng or random.Random())
+        self.queue = queue.Queue(maxsize=size)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    # Đẩy vào hàng đợi, bỏ cuộc nếu stop() được gọi trong lúc hàng đợi đầy
+    def _put(self, item):
+        while not self._stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for game_round in self.rounds:
+                if not self._put(game_round):
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def get(self):
+        game_round = self.queue.get()
+        if isinstance(game_round, Exception):
+            raise game_round
+        return game_round
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+# === FUNCTION: Ghi trước n câu hỏi ra file JSONL ===
+def export_rounds(vocab, path, n, rng=random):
+    index = GameIndex(vocab)
+    rounds = generate_rounds(index, rng)
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(n):
+            f.write(json.dumps(next(rounds), ensure_ascii=False) + '\n')
+    return n
+
+
+def main():
+    from main import load_config, open_store
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Xuất trước các câu hỏi mini game ra file JSONL")
+    parser.add_argument('command', choices=['export'])
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--out', default='rounds.jsonl')
+    parser.add_argument('--language', default=config['language'])
+    parser.add_argument('--level', type=int, default=config['user_level'])
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    vocab = game_vocab(open_store(), args.language, args.level)
+    if len(vocab) < 4:
+        print("⚠️ Cần ít nhất 4 từ vựng đã học để tạo câu hỏi.")
+        return
+    count = export_rounds(vocab, args.out, args.count, random.Random(args.seed))
+    print(f"✅ Đã ghi {count} câu hỏi vào {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import json
+
+from main import (CSV_FILE, flush_history, is_similar, level_up_decision, log_history,
+                  open_store, save_vocab_list, update_word)
+
+
+# === FUNCTION: Chấm hàng loạt các cặp (từ, câu trả lời) ===
+# Không cần bàn phím: trả về một kết quả cho mỗi cặp, 'correct' là None nếu không tìm thấy từ
+def grade_answers(pairs, language=None, file_path=CSV_FILE):
+    store = open_store(file_path)
+    results = []
+    for word, answer in pairs:
+        row = store.find(word, language=language)
+        results.append({
+            'word': word,
+            'language': language,
+            'answer': answer,
+            'meaning': row['meaning'] if row else None,
+            'correct': is_similar(answer, row['meaning']) if row else None,
+        })
+    return results
+
+
+# === FUNCTION: Đọc các câu trả lời từ file JSONL ===
+# Mỗi dòng: {"word": ..., "answer": ...}; "language" (nếu có) ghi đè tham số language
+def read_answers_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def grade_jsonl(path, language=None, file_path=CSV_FILE):
+    pairs = []
+    by_language = {}
+    for entry in read_answers_jsonl(path):
+        lang = entry.get('language', language)
+        by_language.setdefault(lang, []).append(len(pairs))
+        pairs.append((entry['word'], entry.get('answer', '')))
+    results = [None] * len(pairs)
+    for lang, indexes in by_language.items():
+        for index, result in zip(indexes, grade_answers([pairs[i] for i in indexes], lang, file_path)):
+            results[index] = result
+    return results
+
+
+def _key(result):
+    return result['word'].strip().lower(), result.get('language')
+
+
+# === FUNCTION: Tỷ lệ đúng và quyết định nâng cấp độ (như cuối review_session) ===
+# Đếm theo từng từ như review_session (theo last_result): một từ được trả lời nhiều lần
+# chỉ tính một lần, theo câu trả lời cuối cùng. Từ không tìm thấy được liệt kê trong 'not_found'.
+def summarize(results, user_level, not_found=()):
+    final = {}
+    missing = dict.fromkeys(not_found)
+    for result in results:
+        if result['correct'] is None:
+            missing.setdefault(result['word'])
+        else:
+            final[_key(result)] = result['correct']
+    correct = sum(1 for value in final.values() if value)
+    correct_ratio = correct / len(final) if final else 0
+    return {
+        'total': len(final),
+        'correct': correct,
+        'correct_ratio': correct_ratio,
+        'level_up': level_up_decision(correct_ratio, user_level),
+        'not_found': list(missing),
+    }
+
+
+# === FUNCTION: Áp dụng kết quả chấm vào dữ liệu học ===
+# Cùng các bước như review_session: update_word cho từng từ, ghi 'wrong' vào lịch sử,
+# nhưng chỉ ghi vào kho từ vựng một lần. Mỗi kết quả được tra theo ngôn ngữ nó đã được chấm
+# (lang chỉ dùng khi kết quả không có); từ không còn trong kho thì bỏ qua và báo lại.
+# Trả về tỷ lệ đúng và quyết định nâng cấp độ.
+def apply_results(results, lang, user_level, file_path=CSV_FILE):
+    store = open_store(file_path)
+    updated = {}
+    not_found = []
+    applied = []
+    for result in results:
+        if result['correct'] is None:
+            continue
+        language = result.get('language', lang)
+        key = _key({'word': result['word'], 'language': language})
+        if key not in updated:
+            row = store.find(result['word'], language=language)
+            if row is None:
+                not_found.append(result['word'])
+                continue
+            updated[key] = dict(row)
+        word = updated[key]
+        update_word(word, result['correct'])
+        applied.append(result)
+        if not result['correct']:
+            log_history("wrong", word['word'], word.get('category', ''), word.get('language') or language)
+
+    save_vocab_list(list(updated.values()), file_path)
+    flush_history()
+    return summarize(applied + [r for r in results if r['correct'] is None], user_level, not_found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chấm câu trả lời ôn tập không cần giao diện")
+    parser.add_argument('answers', help="File JSONL, mỗi dòng {\"word\": ..., \"answer\": ...}")
+    parser.add_argument('--language', default=None)
+    parser.add_argument('--level', type=int, default=5)
+    parser.add_argument('--apply', action='store_true', help="Cập nhật trạng thái ôn tập và lịch sử")
+    args = parser.parse_args()
+
+    results = grade_jsonl(args.answers, args.language)
+    if args.apply:
+        summary = apply_results(results, args.language, args.level)
+    else:
+        summary = summarize(results, args.level)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
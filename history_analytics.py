@@ -0,0 +1,308 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+from datetime import date, timedelta
+
+from history_stats import HistoryStats
+
+ANALYTICS_SUFFIX = '.analytics.jsonl'
+ANALYTICS_VERSION = 1
+ACTIONS = ('learn', 'lookup', 'correct', 'wrong')
+PERIODS = ('day', 'week')
+# Viết gọn lại file đệm (một dòng chứa mọi ngày) khi số dòng vượt quá số ngày x hệ số này
+COMPACT_RATIO = 2
+COMPACT_MIN_LINES = 64
+
+
+def _week(day):
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+def _accuracy(correct, wrong):
+    return round(correct / (correct + wrong) * 100, 2) if correct + wrong else None
+
+
+# Ô của một ngày: số lượt từng hành động, [đúng, sai] theo chủ đề và theo từ
+def _bucket(data=None):
+    data = data or {}
+    return {
+        'actions': Counter(data.get('actions', {})),
+        'categories': data.get('categories', {}),
+        'words': data.get('words', {}),
+    }
+
+
+# === FUNCTION: Cộng một dòng lịch sử vào ô của ngày đó ===
+# Trả về ngày, hoặc None nếu dòng không có thời gian. words=False: không đếm theo từ (tóm tắt
+# trong manifest của history_archive); n: số dòng giống nhau được cộng một lần.
+def count_day(days, row, words=True, n=1):
+    day = (row.get('timestamp') or '')[:10]
+    if len(day) != 10:
+        return None
+    bucket = days.get(day)
+    if bucket is None:
+        bucket = days[day] = _bucket()
+    action = row['action']
+    bucket['actions'][action] += n
+    if action == 'correct' or action == 'wrong':
+        wrong = action == 'wrong'
+        bucket['categories'].setdefault(row.get('category') or '', [0, 0])[wrong] += n
+        if words:
+            bucket['words'].setdefault((row.get('word') or '').strip().lower(), [0, 0])[wrong] += n
+    return day
+
+
+# === FUNCTION: Cộng ô source vào ô target (cùng một ngày) ===
+def merge_bucket(target, source):
+    target['actions'].update(source['actions'])
+    for key in ('categories', 'words'):
+        for name, (correct, wrong) in source.get(key, {}).items():
+            counts = target[key].setdefault(name, [0, 0])
+            counts[0] += correct
+            counts[1] += wrong
+    return target
+
+
+# === CLASS: Thống kê history.csv theo ngày ===
+# Cùng cách đọc tăng dần với HistoryStats (chỉ đọc các dòng mới ghi thêm, từng dòng một),
+# nhưng bộ đếm được chia thành ô theo ngày của cột timestamp. Tuần, chuỗi ngày học, tỉ lệ sai
+# theo chủ đề và diễn biến đúng/sai của từng từ trong một khoảng thời gian đều tính từ các ô.
+# File đệm history.csv.analytics.jsonl chỉ được ghi thêm: mỗi lần làm mới thêm một dòng gồm
+# vị trí đã đọc và ô của những ngày vừa thay đổi (thường chỉ hôm nay), nên ngày đã qua không
+# bao giờ bị cộng lại hay ghi lại. Khi đọc, dòng sau thay ô cùng ngày của dòng trước.
+# Ô của các tháng đã chuyển sang history.csv.archive lấy từ manifest (không có số liệu theo từ:
+# word_trajectory đọc các đoạn nén của những tháng cần đến).
+class HistoryAnalytics(HistoryStats):
+    SNAPSHOT_SUFFIX = ANALYTICS_SUFFIX
+
+    def _reset(self):
+        super()._reset()
+        # File lịch sử bị thay/cắt ngắn: ghi lại file đệm từ đầu thay vì ghi thêm
+        self._rewrite = True
+        self._lines = 0
+
+    def _reset_counts(self):
+        self.days = {}
+        self._touched = set()
+
+    def _load_snapshot(self):
+        meta = None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                for line in f:
+                    record = json.loads(line) if line.endswith(b'\n') else None
+                    if not isinstance(record, dict) or record.get('version') != ANALYTICS_VERSION:
+                        break
+                    for day, data in record['days'].items():
+                        self.days[day] = _bucket(data)
+                    meta = record
+                    self._lines += 1
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        if meta is None:
+            self._reset()
+            return
+        self.offset = meta['offset']
+        self.inode = meta['inode']
+        self.fingerprint = meta['fingerprint']
+        self.header = meta['header']
+        self.total_actions = meta['total_actions']
+        # Dòng cuối ghi dở hoặc hỏng: lần ghi sau viết lại cả file
+        self._rewrite = meta is not record
+
+    def _save_snapshot(self):
+        compact = self._rewrite or self._lines >= max(COMPACT_MIN_LINES, COMPACT_RATIO * len(self.days))
+        days = self.days if compact else self._touched
+        record = {
+            'version': ANALYTICS_VERSION,
+            'offset': self.offset,
+            'inode': self.inode,
+            'fingerprint': self.fingerprint,
+            'header': self.header,
+            'total_actions': self.total_actions,
+            'days': {day: self.days[day] for day in sorted(days)},
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        if compact:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(line)
+            os.replace(tmp_path, self.snapshot_path)
+            self._lines = 1
+        else:
+            with open(self.snapshot_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._lines += 1
+        self._touched = set()
+        self._rewrite = False
+
+    def _count(self, row):
+        day = count_day(self.days, row)
+        if day is not None:
+            self._touched.add(day)
+
+    # [(ngày, ô)] theo thứ tự ngày, gồm cả các tháng đã lưu trữ
+    def _days(self, since=None, until=None):
+        since = since.isoformat() if since else ''
+        until = until.isoformat() if until else '9999'
+        archived = self._archive().days
+        days = {day: bucket for day, bucket in self.days.items() if since <= day <= until}
+        for day, data in archived.items():
+            if since <= day <= until and day in days:
+                days[day] = merge_bucket(merge_bucket(_bucket(), data), days[day])
+            elif since <= day <= until:
+                days[day] = _bucket(data)
+        return sorted(days.items())
+
+    # Số lượt từng hành động theo ngày hoặc theo tuần ISO: [{'period', learn, ..., 'accuracy'}]
+    def periods(self, period='day', since=None, until=None):
+        grouped = {}
+        for day, bucket in self._days(since, until):
+            key = day if period == 'day' else _week(day)
+            grouped.setdefault(key, Counter()).update(bucket['actions'])
+        return [{'period': key, **{action: counter[action] for action in ACTIONS},
+                 'accuracy': _accuracy(counter['correct'], counter['wrong'])}
+                for key, counter in grouped.items()]
+
+    # Tổng các hành động trong một khoảng ngày
+    def totals(self, since=None, until=None):
+        counter = Counter()
+        for _, bucket in self._days(since, until):
+            counter.update(bucket['actions'])
+        return counter
+
+    # Chuỗi ngày học liên tiếp: (hiện tại, dài nhất). Chuỗi hiện tại vẫn tính nếu hôm nay
+    # chưa học nhưng hôm qua có học.
+    def streaks(self, today=None):
+        today = today or date.today()
+        days = [date.fromisoformat(day) for day, _ in self._days()]
+        longest = run = 0
+        previous = None
+        for day in days:
+            run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+            longest = max(longest, run)
+            previous = day
+        current = run if previous is not None and today - previous <= timedelta(days=1) else 0
+        return current, longest
+
+    # Tỉ lệ sai theo chủ đề: [(chủ đề, số câu trả lời, tỉ lệ sai %)], sai nhiều trước
+    def category_error_rates(self, since=None, until=None):
+        totals = {}
+        for _, bucket in self._days(since, until):
+            for category, (correct, wrong) in bucket['categories'].items():
+                counts = totals.setdefault(category, [0, 0])
+                counts[0] += correct
+                counts[1] += wrong
+        rates = [(category, correct + wrong, round(wrong / (correct + wrong) * 100, 2))
+                 for category, (correct, wrong) in totals.items() if category]
+        return sorted(rates, key=lambda item: (-item[2], -item[1], item[0]))
+
+    # Diễn biến đúng/sai theo ngày của một từ: [(ngày, đúng, sai)]. Với các tháng đã lưu trữ,
+    # chỉ đọc đoạn nén của những tháng nằm trong khoảng [since, until].
+    def word_trajectory(self, word, since=None, until=None):
+        word = word.strip().lower()
+        days = {}
+        for row in self._archive().rows(since, until):
+            if (row.get('word') or '').strip().lower() == word:
+                count_day(days, row)
+        for day, bucket in self._days(since, until):
+            if day in days:
+                merge_bucket(days[day], bucket)
+            elif word in bucket['words']:
+                days[day] = bucket
+        first = since.isoformat() if since else ''
+        last = until.isoformat() if until else '9999'
+        return [(day, *days[day]['words'][word]) for day in sorted(days)
+                if first <= day <= last and word in days[day]['words']]
+
+    # --- xuất dữ liệu ---
+    def write_csv(self, stream, period='day', since=None, until=None):
+        writer = csv.DictWriter(stream, fieldnames=['period', *ACTIONS, 'accuracy'], lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(self.periods(period, since, until))
+
+    def to_json(self, period='day', since=None, until=None):
+        current, longest = self.streaks()
+        return {
+            'periods': self.periods(period, since, until),
+            'streak': {'current': current, 'longest': longest},
+            'category_error_rates': [
+                {'category': category, 'answers': answers, 'error_rate': rate}
+                for category, answers, rate in self.category_error_rates(since, until)
+            ],
+        }
+
+    # Biểu đồ số lượt học/đúng/sai và tỉ lệ đúng theo thời gian, ghi ra file ảnh.
+    # matplotlib chỉ được nạp khi vẽ.
+    def plot(self, path, period='day', since=None, until=None):
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        rows = self.periods(period, since, until)
+        labels = [row['period'] for row in rows]
+        x = range(len(rows))
+        fig, ax = plt.subplots(figsize=(max(6, len(rows) * 0.3), 4))
+        bottom = [0] * len(rows)
+        for action, color in (('learn', '#4c72b0'), ('correct', '#55a868'), ('wrong', '#c44e52')):
+            values = [row[action] for row in rows]
+            ax.bar(x, values, bottom=bottom, label=action, color=color)
+            bottom = [a + b for a, b in zip(bottom, values)]
+        ax.set_ylabel('Số lượt')
+        ax.set_xticks(list(x))
+        ax.set_xticklabels(labels, rotation=90, fontsize=7)
+        accuracy = ax.twinx()
+        accuracy.plot(list(x), [row['accuracy'] for row in rows], color='black', marker='.', label='accuracy')
+        accuracy.set_ylabel('Tỉ lệ đúng (%)')
+        accuracy.set_ylim(0, 100)
+        ax.legend(loc='upper left')
+        fig.tight_layout()
+        fig.savefig(path)
+        plt.close(fig)
+
+
+_analytics = {}
+
+
+# === FUNCTION: Lấy thống kê theo ngày đã cập nhật tới cuối file ===
+def get_history_analytics(history_path):
+    analytics = _analytics.get(history_path)
+    if analytics is None:
+        analytics = _analytics[history_path] = HistoryAnalytics(history_path)
+    return analytics.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thống kê history.csv theo ngày/tuần")
+    parser.add_argument('--history', default='history.csv')
+    parser.add_argument('--period', choices=PERIODS, default='day')
+    parser.add_argument('--since', type=date.fromisoformat, help="Từ ngày (YYYY-MM-DD)")
+    parser.add_argument('--until', type=date.fromisoformat, help="Tới ngày (YYYY-MM-DD)")
+    parser.add_argument('--format', choices=('csv', 'json'), default='csv')
+    parser.add_argument('--chart', help="Ghi biểu đồ ra file ảnh (cần matplotlib)")
+    parser.add_argument('--word', help="Chỉ in diễn biến đúng/sai của một từ")
+    args = parser.parse_args()
+
+    analytics = get_history_analytics(args.history)
+    if args.word:
+        for day, correct, wrong in analytics.word_trajectory(args.word):
+            print(f"{day}: {correct} đúng, {wrong} sai")
+    elif args.format == 'json':
+        json.dump(analytics.to_json(args.period, args.since, args.until), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        analytics.write_csv(sys.stdout, args.period, args.since, args.until)
+    if args.chart:
+        try:
+            analytics.plot(args.chart, args.period, args.since, args.until)
+        except ImportError:
+            sys.exit("❌ Cần cài matplotlib (pip install -r requirements.txt) để vẽ biểu đồ")
+        print(f"✅ Đã ghi biểu đồ: {args.chart}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
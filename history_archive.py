@@ -0,0 +1,272 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+from itertools import chain
+
+from file_lock import atomic_write, get_lock
+from history_analytics import count_day, merge_bucket
+from history_stats import COUNTERS, count_row
+
+ARCHIVE_SUFFIX = '.archive'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+COMPRESS_LEVEL = 6
+# Cột dùng cho tóm tắt trong manifest
+SUMMARY_FIELDS = ('timestamp', 'action', 'category', 'language')
+# Số dòng gom lại trước mỗi lần ghi vào đoạn nén
+WRITE_BATCH = 4096
+
+
+def _month(row, column):
+    value = row[column][:7] if column < len(row) else ''
+    return value if len(value) == 7 and value[4] == '-' else None
+
+
+def _empty_manifest():
+    return {
+        'version': MANIFEST_VERSION,
+        'source': None,
+        'total_actions': 0,
+        'counters': {name: {} for name in COUNTERS},
+        'segments': {},
+    }
+
+
+# === CLASS: Một đoạn nén đang được ghi (một tháng trong một lần chuyển) ===
+# Dòng được ghi theo lô; tóm tắt chỉ đếm các bộ (ngày, hành động, chủ đề, ngôn ngữ) khác nhau
+# rồi cộng vào bộ đếm một lần cho mỗi bộ khi đóng.
+class _Part:
+    def __init__(self, path, header):
+        self.path = path
+        self._raw = open(path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=COMPRESS_LEVEL, mtime=0)
+        self._text = io.TextIOWrapper(self._gzip, encoding='utf-8', newline='')
+        self._writer = csv.writer(self._text)
+        self._writer.writerow(header)
+        self._columns = [header.index(field) for field in SUMMARY_FIELDS]
+        self._pending = []
+        self._keys = Counter()
+        self.rows = 0
+        self.counters = {name: Counter() for name in COUNTERS}
+        self.days = {}
+
+    def add(self, row):
+        self._pending.append(row)
+        if len(self._pending) >= WRITE_BATCH:
+            self._flush()
+
+    def _flush(self):
+        time, action, category, language = self._columns
+        self._writer.writerows(self._pending)
+        self._keys.update((row[time][:10], row[action], row[category], row[language]) for row in self._pending)
+        self.rows += len(self._pending)
+        self._pending.clear()
+
+    def close(self):
+        self._flush()
+        for key, n in self._keys.items():
+            record = dict(zip(SUMMARY_FIELDS, key))
+            count_row(self.counters, record, n)
+            count_day(self.days, record, words=False, n=n)
+        self._text.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+
+
+# === CLASS: Các tháng cũ của history.csv, nén gzip theo tháng ===
+# history.csv chỉ giữ các sự kiện của tháng hiện tại. Khi sang tháng mới (history_logger gọi
+# rotate trước lần ghi đầu tiên của tháng), các dòng của những tháng trước được chuyển sang
+# history.csv.archive/<YYYY-MM>.csv.gz. manifest.json giữ tóm tắt của từng tháng: bộ đếm của
+# HistoryStats và ô theo ngày của HistoryAnalytics (không có số liệu theo từ), nên báo cáo chỉ
+# đọc manifest; chỉ truy vấn cần từng dòng (word_trajectory, chuyển sang SQLite) mới giải nén
+# các tháng cần đến.
+# manifest là điểm chốt: đoạn nén được ghi trước, rồi manifest, cuối cùng mới thay history.csv.
+# manifest ghi lại file nguồn (inode, dòng đầu) và số dòng đã đọc; nếu bị dừng giữa manifest và
+# việc thay history.csv thì lần chuyển sau nhận ra file đó (kể cả khi đã được ghi thêm) và chỉ
+# lưu trữ các dòng nằm sau số dòng đó.
+class HistoryArchive:
+    def __init__(self, history_path):
+        self.history_path = history_path
+        self.directory = history_path + ARCHIVE_SUFFIX
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self._stamp = None
+        self._set(_empty_manifest())
+
+    def _set(self, manifest):
+        self.manifest = manifest
+        self.segments = manifest['segments']
+        self.total_actions = manifest['total_actions']
+        self.counters = {name: Counter(manifest['counters'][name]) for name in COUNTERS}
+        self.days = {day: data for segment in self.segments.values() for day, data in segment['days'].items()}
+
+    # Đọc lại manifest nếu nó đã đổi (một lần stat cho mỗi lần gọi)
+    def load(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except OSError:
+            if self._stamp is not None:
+                self._stamp = None
+                self._set(_empty_manifest())
+            return self
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stamp == self._stamp:
+            return self
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != MANIFEST_VERSION:
+                raise ValueError(f"{self.manifest_path}: phiên bản {manifest.get('version')} không hỗ trợ")
+        except (OSError, ValueError):
+            # Không ghi đè lên một manifest không đọc được (rotate dừng lại)
+            self._stamp = False
+            self._set(_empty_manifest())
+            return self
+        self._stamp = stamp
+        self._set(manifest)
+        return self
+
+    # Các tháng đã lưu trữ nằm trong khoảng ngày [since, until]
+    def months(self, since=None, until=None):
+        first = since.isoformat()[:7] if since else ''
+        last = until.isoformat()[:7] if until else '9999'
+        return [month for month in sorted(self.segments) if first <= month <= last]
+
+    # Các dòng (dict) của những tháng đã lưu trữ trong khoảng [since, until], theo thứ tự thời gian
+    def rows(self, since=None, until=None):
+        for month in self.months(since, until):
+            for part in self.segments[month]['parts']:
+                with gzip.open(os.path.join(self.directory, part), 'rt', newline='', encoding='utf-8') as f:
+                    yield from csv.DictReader(f)
+
+    # === Chuyển các dòng trước tháng month (YYYY-MM) của history.csv sang các đoạn nén ===
+    # Trả về True nếu history.csv đã được viết lại. Chỉ đọc dòng đầu tiên khi chưa có gì để chuyển.
+    def rotate(self, month=None):
+        month = month or datetime.now().strftime('%Y-%m')
+        with get_lock(self.history_path).exclusive():
+            self.load()
+            if self._stamp is False:
+                return False
+            try:
+                f = open(self.history_path, 'rb')
+            except FileNotFoundError:
+                return False
+            with f:
+                st = os.fstat(f.fileno())
+                reader = csv.reader(io.TextIOWrapper(f, encoding='utf-8', newline=''))
+                header = next(reader, None)
+                if not header or not all(field in header for field in SUMMARY_FIELDS):
+                    return False
+                column = header.index('timestamp')
+                first = next(reader, None)
+                if first is None or (_month(first, column) or month) >= month:
+                    return False
+                source = {'inode': st.st_ino, 'head': list(first)}
+                previous_source = self.manifest['source'] or {}
+                same = all(previous_source.get(key) == value for key, value in source.items())
+                archived = previous_source.get('rows', 0) if same else 0
+                current, parts, previous, count = [], {}, None, 0
+                try:
+                    for row in chain([first], reader):
+                        count += 1
+                        if len(row) < len(header):
+                            row += [''] * (len(header) - len(row))
+                        row_month = _month(row, column) or previous or month
+                        previous = row_month
+                        if row_month >= month:
+                            current.append(row)
+                        elif count > archived:
+                            self._archive_row(parts, header, row_month, row)
+                finally:
+                    for part in parts.values():
+                        part.close()
+            if parts:
+                source['rows'] = count
+                self._commit(parts, source)
+            with atomic_write(self.history_path, newline='') as out:
+                writer = csv.writer(out)
+                writer.writerow(header)
+                writer.writerows(current)
+            return True
+
+    def _archive_row(self, parts, header, month, row):
+        part = parts.get(month)
+        if part is None:
+            os.makedirs(self.directory, exist_ok=True)
+            segment = self.segments.get(month)
+            name = f'{month}.csv.gz' if segment is None else f"{month}.{len(segment['parts'])}.csv.gz"
+            part = parts[month] = _Part(os.path.join(self.directory, name), header)
+        part.add(row)
+
+    # Thêm các đoạn vừa ghi vào manifest (ghi nguyên tử)
+    def _commit(self, parts, source):
+        manifest = self.manifest
+        for month, part in sorted(parts.items()):
+            segment = manifest['segments'].setdefault(month, {
+                'parts': [], 'rows': 0, 'bytes': 0, 'counters': {name: {} for name in COUNTERS}, 'days': {},
+            })
+            segment['parts'].append(os.path.basename(part.path))
+            segment['rows'] += part.rows
+            segment['bytes'] += os.path.getsize(part.path)
+            for name in COUNTERS:
+                segment['counters'][name] = dict(Counter(segment['counters'][name]) + part.counters[name])
+            for day, bucket in part.days.items():
+                if day in segment['days']:
+                    merge_bucket(bucket, segment['days'][day])
+                segment['days'][day] = {'actions': dict(bucket['actions']), 'categories': bucket['categories']}
+        totals = {name: Counter() for name in COUNTERS}
+        for segment in manifest['segments'].values():
+            for name in COUNTERS:
+                totals[name].update(segment['counters'][name])
+        manifest['counters'] = {name: dict(counter) for name, counter in totals.items()}
+        manifest['total_actions'] = sum(segment['rows'] for segment in manifest['segments'].values())
+        manifest['source'] = source
+        with atomic_write(self.manifest_path) as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        self.load()
+
+    # Xoá toàn bộ phần lưu trữ (khi history.csv được ghi lại đầy đủ, ví dụ xuất từ SQLite)
+    def clear(self):
+        with get_lock(self.history_path).exclusive():
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.load()
+
+
+_archives = {}
+
+
+# === FUNCTION: Lấy phần lưu trữ của một file lịch sử ===
+def get_history_archive(history_path):
+    archive = _archives.get(history_path)
+    if archive is None:
+        archive = _archives[history_path] = HistoryArchive(history_path)
+    return archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lưu trữ các tháng cũ của history.csv (gzip theo tháng)")
+    parser.add_argument('--history', default='history.csv')
+    parser.add_argument('--rotate', action='store_true', help="Chuyển ngay các tháng trước tháng này")
+    args = parser.parse_args()
+
+    archive = get_history_archive(args.history)
+    if args.rotate:
+        rotated = archive.rotate()
+        print("✅ Đã chuyển các tháng cũ sang " + archive.directory if rotated else "ℹ️ Không có tháng cũ để chuyển")
+    archive.load()
+    print(f"{'tháng':>8}{'dòng':>12}{'đoạn':>6}{'nén (KB)':>10}")
+    for month in archive.months():
+        segment = archive.segments[month]
+        print(f"{month:>8}{segment['rows']:>12,}{len(segment['parts']):>6}{segment['bytes'] / 1024:>10,.1f}")
+    size = os.path.getsize(args.history) if os.path.exists(args.history) else 0
+    print(f"Đã lưu trữ {archive.total_actions:,} sự kiện; {args.history}: {size / 1024:,.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import atexit
+import csv
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import instrumentation
+from file_lock import get_lock
+from instrumentation import timed
+
+HISTORY_FIELDNAMES = ['action', 'timestamp', 'word', 'category', 'language']
+
+
+# === CLASS: Ghi lịch sử theo lô ===
+# Sự kiện được giữ trong bộ đệm vòng và ghi hàng loạt khi bộ đệm đầy, sau flush_interval
+# giây, khi kết thúc phiên học hoặc khi thoát. File history.csv được mở một lần và giữ lại.
+# Lần ghi đầu tiên của mỗi tháng (và của mỗi tiến trình) chuyển các tháng trước sang
+# history.csv.archive (history_archive); ghi giữ khoá chung để không chen vào lúc đang chuyển.
+class HistoryLogger:
+    def __init__(self, path, capacity=256, flush_interval=2.0):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._buffer = deque(maxlen=capacity)
+        self._lock = threading.RLock()
+        self._file = None
+        self._writer = None
+        self._timer = None
+        self._second = None
+        self._timestamp = None
+        self._month = None
+
+    def _now(self):
+        # Định dạng thời gian một lần cho mỗi giây thay vì mỗi sự kiện
+        second = int(time.time())
+        if second != self._second:
+            self._second = second
+            self._timestamp = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+        return self._timestamp
+
+    # history.csv vẫn là file đang mở (chưa bị xoá hay thay bởi history_archive)
+    def _is_current(self):
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            return False
+
+    def _open(self):
+        if self._file is None or not self._is_current():
+            if self._file is not None:
+                self._file.close()
+            self._file = open(self.path, mode='a', newline='', encoding='utf-8')
+            instrumentation.count('file_opens')
+            self._writer = csv.writer(self._file)
+            if self._file.tell() == 0:
+                self._writer.writerow(HISTORY_FIELDNAMES)
+        return self._writer
+
+    def log(self, action, word, category, language):
+        with self._lock:
+            self._buffer.append((action, self._now(), word, category, language))
+            if len(self._buffer) >= self.capacity:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    @timed()
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                if self._timer is not threading.current_thread():
+                    self._timer.cancel()
+                self._timer = None
+            if not self._buffer:
+                return
+            month = self._buffer[0][1][:7]
+            if month != self._month:
+                self._rotate(month)
+                self._month = month
+            with get_lock(self.path).shared():
+                writer = self._open()
+                start = self._file.tell() if instrumentation.enabled else 0
+                writer.writerows(self._buffer)
+                self._file.flush()
+            if instrumentation.enabled:
+                instrumentation.count('bytes_written', self._file.tell() - start)
+            self._buffer.clear()
+
+    # Chỉ nạp history_archive khi dòng đầu tiên của history.csv thuộc một tháng trước
+    def _rotate(self, month):
+        try:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                first = next(reader, None) and next(reader, None)
+        except OSError:
+            return
+        if not first or len(first) < 2 or first[1][:7] >= month:
+            return
+        from history_archive import get_history_archive
+        try:
+            get_history_archive(self.path).rotate(month)
+        except (OSError, ValueError):
+            # Không chuyển được thì các dòng cũ ở lại history.csv tới lần chuyển sau
+            pass
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
+
+
+_loggers = {}
+
+
+# === FUNCTION: Lấy bộ ghi lịch sử cho một file ===
+def get_history_logger(path):
+    logger = _loggers.get(path)
+    if logger is None:
+        logger = _loggers[path] = HistoryLogger(path)
+    return logger
+
+
+# === FUNCTION: Ghi hết bộ đệm của mọi bộ ghi lịch sử ===
+@atexit.register
+def flush_history_loggers():
+    for logger in _loggers.values():
+        logger.flush()
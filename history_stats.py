@@ -0,0 +1,182 @@
+import csv
+import hashlib
+import json
+import os
+from collections import Counter
+
+import instrumentation
+from instrumentation import timed
+
+SNAPSHOT_SUFFIX = '.stats.json'
+SNAPSHOT_VERSION = 1
+# Số byte dùng để nhận diện file: phần đầu file và phần ngay trước offset đã đọc
+FINGERPRINT_BYTES = 4096
+
+COUNTERS = ('actions', 'categories', 'learn_categories', 'wrong_categories', 'languages')
+
+
+# === FUNCTION: Cộng một dòng lịch sử vào các bộ đếm ===
+# Dùng chung với history_archive (tóm tắt của các đoạn đã lưu trữ, n dòng giống nhau một lần)
+def count_row(counters, row, n=1):
+    action = row['action']
+    category = row.get('category', '')
+    counters['actions'][action] += n
+    counters['languages'][row.get('language', '')] += n
+    if category:
+        counters['categories'][category] += n
+    if action == 'learn':
+        counters['learn_categories'][category] += n
+    elif action == 'wrong':
+        counters['wrong_categories'][category] += n
+
+
+def _fingerprint(f, offset):
+    f.seek(0)
+    head = f.read(min(offset, FINGERPRINT_BYTES))
+    f.seek(max(0, offset - FINGERPRINT_BYTES))
+    tail = f.read(offset - max(0, offset - FINGERPRINT_BYTES))
+    return hashlib.sha1(head + b'\0' + tail).hexdigest()
+
+
+# === CLASS: Thống kê history.csv được cộng dồn ===
+# Lưu ảnh chụp các bộ đếm cùng số byte đã đọc vào history.csv.stats.json. Mỗi lần làm mới
+# chỉ đọc các dòng mới được ghi thêm, từng dòng một (bộ nhớ không tăng theo kích thước file);
+# nếu file bị cắt ngắn hoặc bị thay bằng file khác (inode / dấu vân tay thay đổi) thì đếm lại
+# từ đầu. Lớp con (history_analytics) dùng lại cách đọc này với bộ đếm và ảnh chụp riêng.
+class HistoryStats:
+    SNAPSHOT_SUFFIX = SNAPSHOT_SUFFIX
+
+    def __init__(self, history_path):
+        self.history_path = history_path
+        self.snapshot_path = history_path + self.SNAPSHOT_SUFFIX
+        self._reset()
+        self._load_snapshot()
+
+    def _reset(self):
+        self.offset = 0
+        self.inode = None
+        self.fingerprint = None
+        self.header = None
+        self.total_actions = 0
+        self._reset_counts()
+
+    def _reset_counts(self):
+        self.counters = {name: Counter() for name in COUNTERS}
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != SNAPSHOT_VERSION:
+            return
+        self.offset = data['offset']
+        self.inode = data['inode']
+        self.fingerprint = data['fingerprint']
+        self.header = data['header']
+        self.total_actions = data['total_actions']
+        self.counters = {name: Counter(data['counters'][name]) for name in COUNTERS}
+
+    def _save_snapshot(self):
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'offset': self.offset,
+            'inode': self.inode,
+            'fingerprint': self.fingerprint,
+            'header': self.header,
+            'total_actions': self.total_actions,
+            'counters': {name: dict(counter) for name, counter in self.counters.items()},
+        }
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _count(self, row):
+        count_row(self.counters, row)
+
+    # Đọc phần mới của history.csv (chỉ các dòng đã ghi trọn) và cập nhật bộ đếm
+    @timed()
+    def refresh(self):
+        if not os.path.exists(self.history_path):
+            if self.offset:
+                self._reset()
+            return self
+        instrumentation.count('file_opens')
+        with open(self.history_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if self.offset and (st.st_ino != self.inode or st.st_size < self.offset
+                                or _fingerprint(f, self.offset) != self.fingerprint):
+                self._reset()
+            if st.st_size == self.offset:
+                return self
+            f.seek(self.offset)
+            read = 0
+
+            def lines():
+                nonlocal read
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    read += len(line)
+                    yield line.decode('utf-8')
+
+            source = lines()
+            if self.header is None:
+                header_line = next(source, None)
+                if header_line is None:
+                    return self
+                self.header = next(csv.reader([header_line]))
+            parsed = self.total_actions
+            for row in csv.DictReader(source, fieldnames=self.header):
+                self.total_actions += 1
+                self._count(row)
+            instrumentation.count('history_rows_parsed', self.total_actions - parsed)
+            self.offset += read
+            self.inode = st.st_ino
+            self.fingerprint = _fingerprint(f, self.offset)
+        self._save_snapshot()
+        return self
+
+    # Các tháng trước đã được chuyển sang history.csv.archive (history_archive)
+    def _archive(self):
+        from history_archive import get_history_archive
+        return get_history_archive(self.history_path).load()
+
+    # Bộ đếm của cả phần đã lưu trữ (lấy từ tóm tắt trong manifest) lẫn history.csv
+    def _totals(self):
+        archive = self._archive()
+        if not archive.total_actions:
+            return self.total_actions, self.counters
+        return (archive.total_actions + self.total_actions,
+                {name: archive.counters[name] + self.counters[name] for name in COUNTERS})
+
+    def top_categories(self, top_n=3):
+        return self._totals()[1]['categories'].most_common(top_n)
+
+    # Cùng định dạng với compute_learning_report
+    def report(self):
+        total_actions, counters = self._totals()
+        actions = counters['actions']
+        return {
+            'total_actions': total_actions,
+            'learn_count': actions['learn'],
+            'correct_count': actions['correct'],
+            'wrong_count': actions['wrong'],
+            'lookup_count': actions['lookup'],
+            'category_counter': Counter(counters['learn_categories']),
+            'wrong_category_counter': Counter(counters['wrong_categories']),
+            'language_counter': Counter(counters['languages']),
+        }
+
+
+_stats = {}
+
+
+# === FUNCTION: Lấy thống kê lịch sử đã cập nhật tới cuối file ===
+def get_history_stats(history_path):
+    stats = _stats.get(history_path)
+    if stats is None:
+        stats = _stats[history_path] = HistoryStats(history_path)
+    return stats.refresh()
@@ -0,0 +1,132 @@
+import atexit
+import functools
+import math
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# VOCAB_PROFILE=1 bật đo đạc; VOCAB_PROFILE_OUT=<file> chạy thêm cProfile và ghi pstats ra file
+ENV_VAR = 'VOCAB_PROFILE'
+ENV_OUT = 'VOCAB_PROFILE_OUT'
+# Giá trị VOCAB_PROFILE được coi là bật (không phân biệt hoa thường); 0, false, no... là tắt
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+enabled = False
+counters = Counter()
+# tên -> [số lần, tổng thời gian, thời gian lớn nhất, Counter các bucket log2(micro giây)]
+latencies = {}
+_profiler = None
+_profile_out = None
+
+
+def count(name, n=1):
+    if enabled:
+        counters[name] += n
+
+
+def record(name, seconds):
+    stats = latencies.get(name)
+    if stats is None:
+        stats = latencies[name] = [0, 0.0, 0.0, Counter()]
+    stats[0] += 1
+    stats[1] += seconds
+    stats[2] = max(stats[2], seconds)
+    stats[3][max(0, int(math.log2(seconds * 1e6))) if seconds > 0 else 0] += 1
+
+
+# === Đo thời gian: decorator và context manager ===
+# Khi tắt chỉ tốn một phép kiểm tra cờ cho mỗi lần gọi
+def timed(name=None):
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def timer(name):
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def _percentile(buckets, total, q):
+    # Cận trên của bucket chứa phân vị q (micro giây)
+    seen = 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen >= total * q:
+            return 2 ** (bucket + 1)
+    return 0
+
+
+# === FUNCTION: Bảng tóm tắt bộ đếm và độ trễ ===
+def summary():
+    lines = ["📈 Đo đạc hiệu năng"]
+    if counters:
+        lines.append(f"{'bộ đếm':<32}{'giá trị':>14}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name:<32}{value:>14,}")
+    if latencies:
+        lines.append(f"{'hàm':<32}{'lần':>8}{'tổng (ms)':>12}{'tb (ms)':>10}"
+                     f"{'p50 (ms)':>10}{'p99 (ms)':>10}{'max (ms)':>10}")
+        for name, (calls, total, longest, buckets) in sorted(latencies.items(), key=lambda x: -x[1][1]):
+            lines.append(f"{name:<32}{calls:>8}{total * 1000:>12.2f}{total / calls * 1000:>10.3f}"
+                         f"{min(_percentile(buckets, calls, 0.5) / 1000, longest * 1000):>10.3f}"
+                         f"{min(_percentile(buckets, calls, 0.99) / 1000, longest * 1000):>10.3f}"
+                         f"{longest * 1000:>10.3f}")
+    return '\n'.join(lines)
+
+
+# Đăng ký ngay khi import (trước các hàm atexit khác) để chạy sau cùng và tính cả
+# phần ghi file lúc thoát (nén nhật ký, ghi lịch sử)
+@atexit.register
+def dump(stream=None):
+    if not enabled:
+        return
+    stream = stream or sys.stderr
+    if _profiler is not None:
+        import pstats
+
+        _profiler.disable()
+        if _profile_out:
+            _profiler.dump_stats(_profile_out)
+            print(f"📝 Đã ghi cProfile vào {_profile_out}", file=stream)
+        pstats.Stats(_profiler, stream=stream).sort_stats('cumulative').print_stats(20)
+    print(summary(), file=stream)
+
+
+# === FUNCTION: Bật đo đạc (dump() in tóm tắt khi thoát) ===
+# profile_out: ghi thêm kết quả cProfile (pstats) ra file này
+def enable(profile_out=None):
+    global enabled, _profiler, _profile_out
+    if enabled:
+        return
+    enabled = True
+    if profile_out:
+        import cProfile
+
+        _profile_out = profile_out
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+if os.environ.get(ENV_VAR, '').strip().lower() in TRUE_VALUES or os.environ.get(ENV_OUT):
+    enable(os.environ.get(ENV_OUT))
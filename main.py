@@ -1,50 +1,130 @@
-import csv
 import os
-import difflib
-import random
-import time
+import sys
 from datetime import datetime
 import json
 
+import instrumentation
+from instrumentation import timed
+
+# Các module tính năng (kho từ vựng, lịch sử, game, hồ sơ...) được import trong hàm dùng
+# chúng, để menu hiện ra ngay mà không phải nạp hết; dữ liệu cũng chỉ được đọc ở lần chọn
+# chức năng đầu tiên. Ngân sách thời gian khởi động: benchmarks/check_startup.py
+
 
 # === CONFIG ===
 CSV_FILE = 'vocab.csv'
+HISTORY_FILE = 'history.csv'
+DB_FILE = 'vocab.db'
 
 CONFIG_FILE = 'config.json'
+# Cấu hình lúc load_config đọc, để save_config chỉ ghi các khóa đã thay đổi
+_loaded_config = {}
+# Cấu hình chọn nơi lưu dữ liệu / lịch ôn: đọc một lần, save_config cập nhật lại
+_storage_config = None
 
-def load_config():
+def read_config_file():
     if not os.path.exists(CONFIG_FILE):
         return {"language": "English", "user_level": 1}
     with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def load_config():
+    global _loaded_config
+    name = os.environ.get('VOCAB_USER')
+    if name:
+        # Chỉ đọc file hồ sơ, chưa cần tải kho từ vựng
+        from profiles import get_profile_config
+        return get_profile_config(name)
+    _loaded_config = read_config_file()
+    return dict(_loaded_config)
+
+def storage_config():
+    global _storage_config
+    if _storage_config is None:
+        _storage_config = read_config_file()
+    return _storage_config
+
 def save_config(config):
-    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    global _loaded_config, _storage_config
+    profile = current_profile()
+    if profile is not None:
+        profile.config = dict(config)
+        profile.save()
+        return
+    from file_lock import atomic_write, get_lock
+
+    # Tiến trình khác có thể đã sửa config.json: giữ các khóa mà cấu hình này không đổi
+    with get_lock(CONFIG_FILE).exclusive():
+        merged = read_config_file()
+        merged.update({k: v for k, v in config.items() if _loaded_config.get(k) != v})
+        with atomic_write(CONFIG_FILE) as f:
+            json.dump(merged, f, ensure_ascii=False, indent=2)
+        _loaded_config = merged
+        _storage_config = merged
+
+# === FUNCTION: Chọn nơi lưu dữ liệu ===
+# config.json: "storage": "sqlite" để dùng vocab.db thay cho vocab.csv/history.csv
+# (chuyển dữ liệu bằng: python sqlite_store.py import / export)
+def sqlite_store():
+    if storage_config().get('storage') != 'sqlite':
+        return None
+    from sqlite_store import get_sqlite_store
+    return get_sqlite_store(DB_FILE)
+
+def dictionary_store(file_path=CSV_FILE):
+    db = sqlite_store()
+    if db is not None:
+        return db
+    from vocab_store import get_store
+    return get_store(file_path)
+
+# === FUNCTION: Hồ sơ người học hiện tại ===
+# VOCAB_USER=<tên> để học với tiến độ và cấp độ riêng (profiles/<tên>.json),
+# dùng chung dữ liệu từ điển với những người học khác
+def current_profile():
+    name = os.environ.get('VOCAB_USER')
+    if not name:
+        return None
+    from profiles import get_profile_manager
+    return get_profile_manager(dictionary_store()).get(name)
+
+def open_store(file_path=CSV_FILE):
+    profile = current_profile()
+    return profile if profile is not None else dictionary_store(file_path)
+
+# === FUNCTION: Lịch ôn SM-2 ===
+# config.json: "scheduler": "sm2" để chọn từ cần ôn theo ngày đến hạn SM-2 thay cho
+# calculate_priority (chỉ với kho vocab.csv dùng chung)
+def sm2_scheduler(store):
+    if storage_config().get('scheduler') != 'sm2' or not hasattr(store, 'add_listener'):
+        return None
+    from sm2 import get_scheduler
+    return get_scheduler(store)
+
+# Sự kiện được ghi theo lô, xem history_logger.HistoryLogger
+@timed()
 def log_history(action, word, category, language):
-    file_exists = os.path.exists("history.csv")
-    with open("history.csv", mode='a', newline='', encoding='utf-8') as f:
-        fieldnames = ['action', 'timestamp', 'word', 'category', 'language']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow({
+    db = sqlite_store()
+    if db is not None:
+        db.log_history({
             'action': action,
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'word': word,
             'category': category,
             'language': language
         })
+        return
+    from history_logger import get_history_logger
+    get_history_logger(HISTORY_FILE).log(action, word, category, language)
+
+@timed()
+def flush_history():
+    from history_logger import get_history_logger
+    get_history_logger(HISTORY_FILE).flush()
 # === FUNCTION: Check if word exists ===
+@timed()
 def word_exists(word, file_path=CSV_FILE):
-    if not os.path.exists(file_path):
-        return False
-    with open(file_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['word'].strip().lower() == word.strip().lower():
-                return True
-    return False
+    return open_store(file_path).exists(word)
 
 # === FUNCTION: Add new word ===
 def add_new_word_with_check():
@@ -53,40 +133,37 @@ def add_new_word_with_check():
         print(f"⚠️ Từ '{word}' đã tồn tại trong dữ liệu.")
         choice = input("👉 Bạn có muốn bổ sung thêm nghĩa và ví dụ không? (y/n): ").strip().lower()
         if choice == 'y':
-            updated = False
-            with open(CSV_FILE, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                vocab = list(reader)
-
-            for row in vocab:
-                if row['word'].strip().lower() == word.lower():
-                    # Bổ sung nghĩa nếu chưa có
-                    new_meaning = input(f"👉 Nhập nghĩa bổ sung (để trống nếu không): ").strip()
-                    if new_meaning and new_meaning.lower() not in row['meaning'].lower():
-                        row['meaning'] += f" | {new_meaning}"
-                        updated = True
-
-                    # Bổ sung ví dụ nếu chưa có
-                    new_example = input(f"👉 Nhập ví dụ bổ sung (để trống nếu không): ").strip()
-                    if new_example and new_example not in row['example']:
-                        row['example'] += f"\n- {new_example}"
-                        updated = True
+            updated = []
+            store = open_store()
+            for pos in store.positions_for_word(word):
+                row = dict(store.row(pos))
+                # Bổ sung nghĩa nếu chưa có
+                new_meaning = input(f"👉 Nhập nghĩa bổ sung (để trống nếu không): ").strip()
+                if new_meaning and new_meaning.lower() not in row['meaning'].lower():
+                    row['meaning'] += f" | {new_meaning}"
+                    updated.append(pos)
+
+                # Bổ sung ví dụ nếu chưa có
+                new_example = input(f"👉 Nhập ví dụ bổ sung (để trống nếu không): ").strip()
+                if new_example and new_example not in row['example']:
+                    row['example'] += f"\n- {new_example}"
+                    updated.append(pos)
+                store.update(pos, row)
 
             if updated:
-                fieldnames = ['word', 'meaning', 'phonetic', 'language', 'review_count', 'last_review',
-              'is_mastered', 'last_result', 'example', 'type', 'category', 'level']
-                with open(CSV_FILE, mode='w', newline='', encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows([
-                       {k: row.get(k, '') for k in fieldnames}
-                       for row in vocab
-                    ])
+                store.persist(sorted(set(updated)))
                 print("✅ Đã cập nhật thêm nghĩa/ví dụ.")
             else:
                 print("ℹ️ Không có nội dung nào được cập nhật.")
         return  # Dừng lại sau khi cập nhật
 
+    # Từ gần giống đã có thì có thể chỉ là gõ khác đi (hospitl / hospital)
+    similar = similar_words(word)
+    if similar:
+        print("⚠️ Đã có từ gần giống: " + ", ".join(f"{row['word']} ({row['meaning']})" for row in similar))
+        if input("👉 Vẫn thêm từ mới này? (y/n): ").strip().lower() != 'y':
+            return
+
     # Trường hợp từ chưa có, tiến hành thêm mới
     meaning = input("Nhập nghĩa của từ: ").strip()
     phonetic = input("Nhập phiên âm (nếu có): ").strip()
@@ -121,14 +198,7 @@ def add_new_word_with_check():
         'level': level
     }
 
-    fieldnames = ['word', 'meaning', 'phonetic', 'language', 'review_count', 'last_review',
-                  'is_mastered', 'last_result', 'example', 'type', 'category', 'level']
-    file_exists = os.path.isfile(CSV_FILE)
-    with open(CSV_FILE, mode='a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(new_entry)
+    open_store().add(new_entry)
 
     print(f"✅ Đã thêm từ mới: {word} – {meaning}")
 
@@ -158,25 +228,26 @@ def calculate_priority(word_data):
     return priority
 
 # === FUNCTION: Gợi ý các từ cần ôn ===
+@timed()
 def get_words_to_review(language_filter=None, user_level=5, file_path=CSV_FILE, top_n=10):
-    if not os.path.exists(file_path):
-        return []
-
-    with open(file_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        vocab_list = []
-        for row in reader:
-            level_str = row.get('level', '').strip()
-            if not level_str.isdigit():
-                continue  # Bỏ qua nếu không phải số
-            level = int(level_str)
-
-            if language_filter in [None, '', 'All', row['language']] and level <= user_level:
-                row['priority'] = calculate_priority(row)
-                vocab_list.append(row)
+    store = open_store(file_path)
+    language = None if language_filter in [None, '', 'All'] else language_filter
+
+    # Chỉ mục ưu tiên theo (language, level) đã bỏ qua các dòng có cấp độ không phải số
+    scheduler = sm2_scheduler(store)
+    if scheduler is not None:
+        # Độ ưu tiên là số ngày đã quá hạn
+        candidates = [(overdue, store.row(pos))
+                      for overdue, pos in scheduler.due(language, user_level, top_n)]
+    else:
+        candidates = store.review_candidates(language, user_level, top_n)
 
-    sorted_words = sorted(vocab_list, key=lambda x: -x['priority'])
-    return sorted_words[:top_n]
+    words = []
+    for priority, row in candidates:
+        row = dict(row)
+        row['priority'] = priority
+        words.append(row)
+    return words
 
 # === FUNCTION: Cập nhật trạng thái từ sau khi ôn ===
 def update_word(word_data, correct):
@@ -187,49 +258,44 @@ def update_word(word_data, correct):
     return word_data
 
 # === FUNCTION: Lưu danh sách sau khi ôn ===
+@timed()
 def save_vocab_list(vocab_list, file_path=CSV_FILE):
     if not vocab_list:
         return
-    fieldnames = ['word', 'meaning', 'phonetic', 'language', 'review_count', 'last_review', 'is_mastered', 'last_result', 'example', 'type', 'category', 'level']
-    existing_data = []
-    if os.path.exists(file_path):
-        with open(file_path, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            existing_data = list(reader)
-    updated_dict = {row['word']: row for row in vocab_list}
-    for row in existing_data:
-        if row['word'] in updated_dict:
-            row.update(updated_dict[row['word']])
-        else:
-            updated_dict[row['word']] = row
-    with open(file_path, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in updated_dict.values():
-            writer.writerow({k: v for k, v in row.items() if k in fieldnames})
+    store = open_store(file_path)
+    scheduler = sm2_scheduler(store)
+    store.upsert(vocab_list)
+    if scheduler is not None:
+        scheduler.save()
 
 # === FUNCTION: So sánh ngôn ngữ linh hoạt ===
+# Chấp nhận từng nghĩa tách bởi '|' hoặc '/', bỏ qua dấu tiếng Việt, xem answer_matcher
+@timed()
 def is_similar(answer, correct_answer):
-    answer = answer.strip().lower()
-    correct_answer = correct_answer.strip().lower()
-    if answer == correct_answer:
-        return True
-    if answer in correct_answer or correct_answer in answer:
-        return True
-    similarity = difflib.SequenceMatcher(None, answer, correct_answer).ratio()
-    return similarity >= 0.9
+    from answer_matcher import answer_matches
+    return answer_matches(answer, correct_answer)
 
 # === FUNCTION: Thống kê top 5 sai gần nhất ===
 def show_recent_wrong_words(file_path=CSV_FILE):
-    if not os.path.exists(file_path):
+    store = open_store(file_path)
+    if not len(store):
         return
-    with open(file_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        wrong_words = [row for row in reader if row.get('last_result') == 'wrong']
-        wrong_words = sorted(wrong_words, key=lambda x: x['last_review'], reverse=True)
-        print("\n📉 Top 5 từ sai gần đây:")
-        for i, row in enumerate(wrong_words[:5], 1):
-            print(f"{i}. {row['word']} ({row['phonetic']}) - {row['meaning']} - ôn gần nhất: {row['last_review']}")
+    wrong_words = store.filter(last_result='wrong')
+    wrong_words = sorted(wrong_words, key=lambda x: x['last_review'], reverse=True)
+    print("\n📉 Top 5 từ sai gần đây:")
+    for i, row in enumerate(wrong_words[:5], 1):
+        print(f"{i}. {row['word']} ({row['phonetic']}) - {row['meaning']} - ôn gần nhất: {row['last_review']}")
+
+# === FUNCTION: Quyết định nâng cấp độ theo tỷ lệ đúng ===
+# 'auto': tự động lên cấp, 'ask': hỏi người học, None: giữ nguyên cấp độ
+def level_up_decision(correct_ratio, user_level):
+    if user_level >= 5:
+        return None
+    if correct_ratio == 1.0:
+        return 'auto'
+    if correct_ratio >= 0.7:
+        return 'ask'
+    return None
 
 # === FUNCTION: Review flashcards ===
 def review_session(lang, user_level):
@@ -256,6 +322,7 @@ def review_session(lang, user_level):
         print("-" * 30)
 
     save_vocab_list(words)
+    flush_history()
     print("\n✅ Đã cập nhật trạng thái ôn tập.")
     show_recent_wrong_words()
 
@@ -264,10 +331,11 @@ def review_session(lang, user_level):
     total_words = len(words)
     correct_ratio = len(correct_words) / total_words if total_words else 0
 
-    if user_level < 5:
+    decision = level_up_decision(correct_ratio, user_level)
+    if decision is not None:
         next_level = user_level + 1
 
-        if correct_ratio == 1.0:
+        if decision == 'auto':
             print(f"🎉 Chúc mừng 🏆 Bạn đã học thuộc 100% từ vựng cấp độ {user_level}. Bạn sẽ được chuyển lên cấp {next_level}!")
             config = load_config()
             config['user_level'] = next_level
@@ -305,84 +373,143 @@ def review_session(lang, user_level):
 
 # === FUNCTION: Learn new words ===
 def learn_new_words(lang, user_level, goal=5):
-    if not os.path.exists(CSV_FILE):
+    store = open_store()
+    if not len(store):
         print("⚠️ Không tìm thấy dữ liệu.")
         return
 
-    # Lấy các category học nhiều nhất để ưu tiên
-    top_categories = get_top_categories_from_history(top_n=3)
-    category_priority = {cat: 3 - idx for idx, (cat, _) in enumerate(top_categories)}
-
-    with open(CSV_FILE, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        new_words = []
-
-        for row in reader:
-            if row.get('review_count', '0') == '0' and row.get('language', '') == lang:
-                raw_level = row.get('level', '').strip()
-                category = row.get('category', '')
-                if raw_level.isdigit():
-                    level = int(raw_level)
-                    if level <= user_level:
-                        # Gán điểm ưu tiên theo chủ đề
-                        row['priority'] = category_priority.get(category, 0)
-                        new_words.append(row)
-
-    # Sắp xếp từ mới theo độ ưu tiên giảm dần
-    new_words.sort(key=lambda x: -x['priority'])
-
+    new_words = pick_new_words(store, lang, user_level, goal)
     if not new_words:
         print(f"🎉 Bạn đã học hết từ mới rồi!")
         return
 
-    print(f"\n📘 Học {min(goal, len(new_words))} từ mới tiếng {lang} hôm nay:\n")
-    today = datetime.today().strftime("%Y-%m-%d")
+    print(f"\n📘 Học {len(new_words)} từ mới tiếng {lang} hôm nay:\n")
     learned = []
 
-    for word in new_words[:goal]:
+    for word in new_words:
         print(f"Từ: {word['word']}")
         print(f"Phiên âm: {word.get('phonetic', 'Không có')}")
         print(f"Nghĩa: {word.get('meaning', 'Không rõ nghĩa')}")
         print(f"Ví dụ: {word.get('example', 'Không có ví dụ.')}")
+        show_related_words(word['word'], lang)
         mark = input("→ Đánh dấu từ này là đã học? (y/n): ").strip().lower()
         if mark == 'y':
-            word['review_count'] = '1'
-            word['last_review'] = today
-            word['last_result'] = 'correct'
-            word['is_mastered'] = 'False'
+            mark_learned(word, lang)
             learned.append(word)
-            log_history("learn", word['word'], word.get('category', ''), lang)
 
             # 🧠 Nếu người học đang ở cấp độ 2: kiểm tra ngữ pháp đơn giản
            
         print("-" * 30)
 
+    flush_history()
     if learned:
         save_vocab_list(learned)
         print(f"\n✅ Đã cập nhật {len(learned)} từ đã học.")
     else:
         print("👍 Không có từ nào được đánh dấu là đã học.")
 
+# === FUNCTION: Chọn tối đa goal từ mới, ưu tiên các chủ đề học nhiều nhất ===
+@timed()
+def pick_new_words(store, lang, user_level, goal=5):
+    from review_queue import top_n as select_top_n
+
+    # Lấy các category học nhiều nhất để ưu tiên
+    top_categories = get_top_categories_from_history(top_n=3)
+    category_priority = {cat: 3 - idx for idx, (cat, _) in enumerate(top_categories)}
+
+    # Gán điểm ưu tiên theo chủ đề và lấy các từ cao nhất bằng heap giới hạn;
+    # chỉ sao chép các từ được chọn
+    def priority(row):
+        return category_priority.get(row.get('category', ''), 0)
+
+    new_words = []
+    for row in select_top_n(store.unlearned(lang, user_level), goal, key=priority):
+        row = dict(row)
+        row['priority'] = priority(row)
+        new_words.append(row)
+    return new_words
+
+# === FUNCTION: Đánh dấu một từ là đã học (chưa ghi vào file) ===
+def mark_learned(word, lang):
+    word['review_count'] = '1'
+    word['last_review'] = datetime.today().strftime("%Y-%m-%d")
+    word['last_result'] = 'correct'
+    word['is_mastered'] = 'False'
+    log_history("learn", word['word'], word.get('category', ''), lang)
+
+# === FUNCTION: Gợi ý từ liên quan ===
+# Cùng chủ đề/loại từ, nghĩa và câu ví dụ có chung từ, cách viết gần giống (xem related_words);
+# chỉ với kho vocab.csv dùng chung. Chỉ mục được chuẩn bị ở luồng phụ: trả về None khi chưa xong
+def suggest_related_words(word, lang, k=3):
+    store = dictionary_store()
+    if not hasattr(store, 'add_listener'):
+        return []
+    from related_words import get_related_index
+    index = get_related_index(store, wait=False)
+    if index is None:
+        return None
+    positions = store.positions_for_word(word, lang)
+    if not positions:
+        return []
+    return [store.row(pos) for _, pos in index.related(positions[0], k, language=lang)]
+
+def show_related_words(word, lang):
+    related = suggest_related_words(word, lang)
+    if related is None:
+        print("⏳ Chỉ mục từ liên quan đang được dựng ở nền (có thể dựng trước: python related_words.py).")
+    elif related:
+        print("🔗 Từ liên quan: " + ", ".join(f"{row['word']} ({row['meaning']})" for row in related))
+
+# === FUNCTION: Gợi ý khi gõ sai hoặc gõ dở một từ ===
+# Sai một lỗi gõ, bắt đầu bằng phần đã gõ, rồi sai hai lỗi gõ (xem word_search);
+# chỉ với kho vocab.csv dùng chung
+def suggest_words(keyword, lang, k=5):
+    store = dictionary_store()
+    if not hasattr(store, 'add_listener'):
+        return []
+    from word_search import SEARCH_SUFFIX, get_word_search
+    if not os.path.exists(store.file_path + SEARCH_SUFFIX):
+        print("⏳ Đang dựng chỉ mục tra từ (chỉ lần đầu)...")
+    return [store.row(pos) for _, pos in get_word_search(store).suggest(keyword, k, language=lang)]
+
+# === FUNCTION: Từ gần giống (sai một lỗi gõ) đã có, có thể là từ sắp thêm bị gõ khác đi ===
+def similar_words(word, k=3):
+    store = dictionary_store()
+    if not hasattr(store, 'add_listener'):
+        return []
+    from word_search import get_word_search
+    return [store.row(pos) for _, _, pos in get_word_search(store).similar(word, k, max_typos=1)]
+
 # === FUNCTION: Tra cứu từ ===
 def lookup_word(lang):
     keyword = input("\n🔍 Nhập từ bạn muốn tra cứu: ").strip().lower()
     found = False
 
-    with open(CSV_FILE, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row['word'].strip().lower() == keyword and row['language'] == lang:
-                print(f"\n📖 Kết quả tra cứu:")
-                print(f"Từ: {row['word']}")
-                print(f"Phiên âm: {row.get('phonetic', '')}")
-                print(f"Nghĩa: {row.get('meaning', '')}")
-                print(f"Ví dụ: {row.get('example', '')}")
-                print(f"Loại từ: {row.get('type', '')}")
-                print(f"Chủ đề: {row.get('category', '')}")
-                print(f"Cấp độ: {row.get('level', '')}")
-                found = True
-                log_history("lookup", row['word'], row['category'], lang)
-                break
+    row = open_store().find(keyword, language=lang)
+    # Không có đúng từ đã nhập: gợi ý từ gần giống / bắt đầu bằng từ đó để chọn
+    suggestions = suggest_words(keyword, lang) if row is None and keyword else []
+    if suggestions:
+        print("🤔 Có phải bạn muốn tìm:")
+        for i, suggestion in enumerate(suggestions, 1):
+            print(f"{i}. {suggestion['word']} – {suggestion['meaning']}")
+        choice = input("👉 Chọn số để xem (Enter để bỏ qua): ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(suggestions):
+            row = open_store().find(suggestions[int(choice) - 1]['word'], language=lang)
+
+    if row is not None:
+        from vocab_store import public_row
+        row = public_row(row)
+        print(f"\n📖 Kết quả tra cứu:")
+        print(f"Từ: {row['word']}")
+        print(f"Phiên âm: {row.get('phonetic', '')}")
+        print(f"Nghĩa: {row.get('meaning', '')}")
+        print(f"Ví dụ: {row.get('example', '')}")
+        print(f"Loại từ: {row.get('type', '')}")
+        print(f"Chủ đề: {row.get('category', '')}")
+        print(f"Cấp độ: {row.get('level', '')}")
+        show_related_words(row['word'], lang)
+        found = True
+        log_history("lookup", row['word'], row['category'], lang)
 
     if not found:
         print("❌ Từ này chưa có trong dữ liệu.")
@@ -402,56 +529,43 @@ def learn_new_word_menu(lang, user_level):
     else:
         print("❌ Lựa chọn không hợp lệ.")
 # === FUNCTION: phân tích hành vi ===
-from collections import Counter
-
+@timed()
 def get_top_categories_from_history(top_n=3):
-    if not os.path.exists("history.csv"):
+    db = sqlite_store()
+    if db is not None:
+        return db.top_categories(top_n)
+    flush_history()
+    if not os.path.exists(HISTORY_FILE):
         return []
+    from history_stats import get_history_stats
+    return get_history_stats(HISTORY_FILE).top_categories(top_n)
+# === FUNCTION: thống kê history.csv cho báo cáo học tập ===
+# Chỉ đọc phần mới ghi thêm vào history.csv, xem history_stats.HistoryStats
+@timed()
+def compute_learning_report():
+    db = sqlite_store()
+    if db is not None:
+        return db.history_report()
+    flush_history()
+    if not os.path.exists(HISTORY_FILE):
+        return None
+    from history_stats import get_history_stats
+    return get_history_stats(HISTORY_FILE).report()
 
-    with open("history.csv", newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        categories = [row['category'] for row in reader if row.get('category')]
-        counter = Counter(categories)
-        return counter.most_common(top_n)
 # === FUNCTION: tạo báo cáo học tập ===
 def generate_learning_report():
-    if not os.path.exists("history.csv"):
+    report = compute_learning_report()
+    if report is None:
         print("⚠️ Chưa có dữ liệu hành vi để tạo báo cáo.")
         return
 
-    from collections import Counter
-    import csv
-
-    total_actions = 0
-    learn_count = 0
-    correct_count = 0
-    wrong_count = 0
-    lookup_count = 0
-
-    category_counter = Counter()
-    wrong_category_counter = Counter()
-    language_counter = Counter()
-
-    with open("history.csv", newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            action = row['action']
-            category = row.get('category', '')
-            lang = row.get('language', '')
-
-            total_actions += 1
-            language_counter[lang] += 1
-
-            if action == "learn":
-                learn_count += 1
-                category_counter[category] += 1
-            elif action == "wrong":
-                wrong_count += 1
-                wrong_category_counter[category] += 1
-            elif action == "correct":
-                correct_count += 1
-            elif action == "lookup":
-                lookup_count += 1
+    learn_count = report['learn_count']
+    lookup_count = report['lookup_count']
+    correct_count = report['correct_count']
+    wrong_count = report['wrong_count']
+    category_counter = report['category_counter']
+    wrong_category_counter = report['wrong_category_counter']
+    language_counter = report['language_counter']
 
     print("\n📊 BÁO CÁO HỌC TẬP TỪ history.csv")
     print(f"- Tổng số lượt học: {learn_count}")
@@ -477,25 +591,55 @@ def generate_learning_report():
     if language_counter:
         top_lang = language_counter.most_common(1)[0]
         print(f"- Ngôn ngữ học chính: {top_lang[0]}")
+
+    show_recent_progress()
+
+# === FUNCTION: Tiến độ gần đây: chuỗi ngày học, 7 ngày qua so với 7 ngày trước đó ===
+# Xem history_analytics (chỉ với history.csv); biểu đồ: python history_analytics.py --chart
+def show_recent_progress():
+    if sqlite_store() is not None or not os.path.exists(HISTORY_FILE):
+        return
+    from datetime import date, timedelta
+    from history_analytics import get_history_analytics
+    analytics = get_history_analytics(HISTORY_FILE)
+    current, longest = analytics.streaks()
+    print(f"- Chuỗi ngày học liên tiếp: {current} ngày (dài nhất: {longest} ngày)")
+    today = date.today()
+    week = analytics.totals(today - timedelta(days=6), today)
+    previous = analytics.totals(today - timedelta(days=13), today - timedelta(days=7))
+    answered = week['correct'] + week['wrong']
+    line = f"- 7 ngày qua: {week['learn']} lượt học, {week['lookup']} lượt tra, {answered} câu trả lời"
+    if answered:
+        accuracy = round(week['correct'] / answered * 100, 2)
+        line += f" (đúng {accuracy}%"
+        if previous['correct'] + previous['wrong']:
+            before = round(previous['correct'] / (previous['correct'] + previous['wrong']) * 100, 2)
+            line += f", tuần trước {before}%"
+        line += ")"
+    print(line)
+    weakest = analytics.category_error_rates(today - timedelta(days=29), today)
+    if weakest:
+        category, answers, rate = weakest[0]
+        print(f"- Chủ đề sai nhiều nhất 30 ngày qua: {category} ({rate}% sai / {answers} câu)")
 # === MINI GAME SESSION: Mixed Unlimited Play ===
 def play_game_session(lang, user_level):
-    if not os.path.exists(CSV_FILE):
+    from game_index import GameIndex
+    from game_rounds import RoundPrefetcher, game_vocab
+
+    store = open_store()
+    if not len(store):
         print("⚠️ Không tìm thấy dữ liệu từ vựng.")
         return
 
-    with open(CSV_FILE, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        vocab = [
-            row for row in reader
-            if int(row['review_count']) >= 1
-            and row['language'] == lang
-            and int(row.get('level', '5')) <= user_level
-        ]
+    vocab = game_vocab(store, lang, user_level)
 
     if len(vocab) < 10:
         print("⚠️ Bạn cần ít nhất 10 từ đã học để chơi game.")
         return
 
+    # Dựng chỉ mục nội dung game một lần; câu hỏi được chuẩn bị sẵn trong luồng nền
+    index = GameIndex(vocab)
+    prefetcher = RoundPrefetcher(index)
     score = 0
     total = 0
     mistakes = 0
@@ -504,49 +648,50 @@ def play_game_session(lang, user_level):
     print("\n🎮 BẮT ĐẦU PHIÊN CHƠI MINI-GAME!")
     print("(Nhấn 'q' bất kỳ lúc nào để thoát.)\n")
 
-    while True:
-        user_input = input("👉 Nhấn Enter để chơi tiếp, hoặc 'q' để thoát: ").strip().lower()
-        if user_input == 'q':
-            break
+    try:
+        while True:
+            user_input = input("👉 Nhấn Enter để chơi tiếp, hoặc 'q' để thoát: ").strip().lower()
+            if user_input == 'q':
+                break
 
-        game_type = random.choice(['match', 'type', 'odd'])
+            game_round = prefetcher.get()
 
-        if game_type == 'match':
-            correct = play_game_match(vocab)
-        elif game_type == 'type':
-            correct = play_game_type(vocab)
-        else:
-            correct = play_game_odd_one_out(vocab)
+            if game_round['type'] == 'match':
+                correct = play_game_match(vocab, index, game_round)
+            elif game_round['type'] == 'type':
+                correct = play_game_type(vocab, game_round)
+            else:
+                correct = play_game_odd_one_out(vocab, index, game_round)
 
-        total += 1
-        if correct:
-            score += 1
-        else:
-            mistakes += 1
-            if mistakes >= max_mistakes:
-                print(f"\n❌ Bạn đã trả lời sai quá {max_mistakes} câu. Mini game kết thúc!")
-                break
+            total += 1
+            if correct:
+                score += 1
+            else:
+                mistakes += 1
+                if mistakes >= max_mistakes:
+                    print(f"\n❌ Bạn đã trả lời sai quá {max_mistakes} câu. Mini game kết thúc!")
+                    break
+    finally:
+        prefetcher.stop()
 
     print("\n📊 KẾT QUẢ PHIÊN CHƠI:")
     print(f"Số câu đúng: {score}/{total}")
     if total > 0:
         print(f"Tỷ lệ đúng: {round(score / total * 100, 2)}%")
     print("👍 Cảm ơn bạn đã tham gia!")
-def play_game_match(vocab):
+def play_game_match(vocab, index=None, game_round=None):
     if len(vocab) < 4:
         print("⚠️ Cần ít nhất 4 từ vựng để chơi trò chơi.")
         return False
+    if game_round is None:
+        from game_index import GameIndex
+        from game_rounds import build_match_round
+        game_round = build_match_round(index or GameIndex(vocab))
 
-    word = random.choice(vocab)
-    correct_answer = word['meaning']
-    options = [correct_answer]
+    correct_answer = game_round['answer']
+    options = game_round['options']
 
-    meanings = list(set([w['meaning'] for w in vocab if w['meaning'] != correct_answer]))
-    random.shuffle(meanings)
-    options += meanings[:3]
-    random.shuffle(options)
-
-    print(f"\n🔤 Từ: {word['word']}")
+    print(f"\n🔤 Từ: {game_round['word']}")
     print("Nghĩa nào là đúng?")
     for i, opt in enumerate(options):
         print(f"{i+1}. {opt}")
@@ -554,7 +699,7 @@ def play_game_match(vocab):
     answer = input("Chọn đáp án (1–4) hoặc gõ nghĩa: ").strip().lower()
 
     # Kiểm tra nếu là số từ 1–4
-    if answer in ['1', '2', '3', '4']:
+    if answer in ['1', '2', '3', '4'] and int(answer) <= len(options):
         chosen = options[int(answer) - 1]
     else:
         # Tìm trong danh sách các đáp án xem người dùng gõ giống cái nào
@@ -572,53 +717,51 @@ def play_game_match(vocab):
     print(f"📘 Đáp án đúng là: {correct_answer}")
     return chosen == correct_answer
 # === MINI GAME: Type English Word from Meaning ===
-def play_game_type(vocab):
-    word = random.choice(vocab)
-    correct_word = word['word'].strip().lower()
-
-    print(f"\n📝 Nghĩa tiếng Việt: {word['meaning']}")
+def play_game_type(vocab, game_round=None):
+    if game_round is None:
+        from game_index import GameIndex
+        from game_rounds import build_type_round
+        game_round = build_type_round(GameIndex(vocab))
+    correct_word = game_round['answer'].strip().lower()
+
+    print(f"\n📝 Nghĩa tiếng Việt: {game_round['meaning']}")
     answer = input("Từ tiếng Anh là gì? ").strip().lower()
 
     if answer == correct_word:
         print("✅ Chính xác!")
         return True
     else:
-        print(f"❌ Sai. Đáp án đúng là: {word['word']}")
+        print(f"❌ Sai. Đáp án đúng là: {game_round['answer']}")
         return False
-def play_game_odd_one_out(vocab):
-    filtered_vocab = [word for word in vocab if word.get('category') and word.get('type')]
-    if len(filtered_vocab) < 4:
+def play_game_odd_one_out(vocab, index=None, game_round=None):
+    from game_index import GameIndex
+    from game_rounds import build_odd_round
+
+    index = index or GameIndex(vocab)
+    if len(index.grouped) < 4:
         print("⚠️ Không đủ dữ liệu để tạo câu hỏi.")
         return False
 
-    grouping_field = random.choice(['type', 'category'])
-    group_candidates = [word[grouping_field] for word in filtered_vocab]
-    selected_group = random.choice(list(set(group_candidates)))
-    same_group_words = [w for w in filtered_vocab if w[grouping_field] == selected_group]
-
-    if len(same_group_words) < 3:
+    game_round = game_round or build_odd_round(index)
+    if game_round is None:
         return False
-
-    wrong_word = random.choice([w for w in filtered_vocab if w[grouping_field] != selected_group])
-    options = random.sample(same_group_words, 3) + [wrong_word]
-    random.shuffle(options)
+    options = game_round['options']
 
     print("\n🧠 Chọn từ KHÁC NHÓM so với 3 từ còn lại:")
     for i, opt in enumerate(options):
-        print(f"{i+1}. {opt['word']}")
+        print(f"{i+1}. {opt}")
 
     answer = input("Chọn số thứ tự từ khác nhóm (1–4): ").strip()
     if answer not in ['1', '2', '3', '4']:
         print("❌ Lựa chọn không hợp lệ.")
         return False
 
-    chosen = options[int(answer)-1]
-    if chosen[grouping_field] != selected_group:
+    if int(answer) - 1 == game_round['answer_index']:
         print("✅ Chính xác!")
         return True
     else:
-        print(f"❌ Sai. Từ đúng là: {wrong_word['word']} ({wrong_word['meaning']})")
-        print(f"🧠 Ba từ còn lại thuộc nhóm '{grouping_field}': '{selected_group}'")
+        print(f"❌ Sai. Từ đúng là: {game_round['answer']} ({game_round['answer_meaning']})")
+        print(f"🧠 Ba từ còn lại thuộc nhóm '{game_round['field']}': '{game_round['group']}'")
         return False
 
 # === MAIN MENU ===
@@ -706,5 +849,32 @@ def main():
         else:
             print("❌ Lựa chọn không hợp lệ.Vui lòng chọn số từ 1 đến 6.")
 
+# === FUNCTION: Thoát bình thường khi nhận SIGTERM/SIGHUP ===
+# Mặc định hai tín hiệu này kết thúc tiến trình mà không chạy atexit, nên bộ đệm lịch sử
+# (history_logger) bị mất. Chỉ đăng ký từ dòng lệnh: server.py tự xử lý trong vòng lặp asyncio.
+def install_signal_handlers():
+    import signal
+
+    def handle(signum, frame):
+        raise SystemExit(128 + signum)
+
+    for name in ('SIGTERM', 'SIGHUP'):
+        signum = getattr(signal, name, None)
+        if signum is not None and signal.getsignal(signum) == signal.SIG_DFL:
+            signal.signal(signum, handle)
+
 if __name__ == '__main__':
+    install_signal_handlers()
+    # Không có tham số thì bỏ qua argparse (nạp thêm gettext, locale, shutil)
+    if len(sys.argv) > 1:
+        import argparse
+
+        parser = argparse.ArgumentParser(description="AI Vocabulary Coach")
+        parser.add_argument('--profile', action='store_true',
+                            help="Đo thời gian/bộ đếm và in tóm tắt khi thoát (hoặc VOCAB_PROFILE=1)")
+        parser.add_argument('--profile-out', metavar='FILE',
+                            help="Chạy thêm cProfile và ghi pstats ra FILE (hoặc VOCAB_PROFILE_OUT)")
+        args = parser.parse_args()
+        if args.profile or args.profile_out:
+            instrumentation.enable(args.profile_out)
     main()
\ No newline at end of file
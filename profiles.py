@@ -0,0 +1,245 @@
+import atexit
+import heapq
+import json
+import os
+import re
+from collections import OrderedDict
+from datetime import date
+from itertools import islice
+
+from file_lock import atomic_write
+from review_queue import parse_count, parse_day
+from vocab_store import FIELDNAMES, normalize_word
+
+PROFILE_DIR = 'profiles'
+DEFAULT_CONFIG = {"language": "English", "user_level": 1}
+
+# Tiến độ của một từ được nén thành một số nguyên:
+# (review_count << 32) | (ngày ôn gần nhất << 3) | cờ (bit 0: đã thuộc, bit 1-2: kết quả)
+RESULTS = ['', 'correct', 'wrong']
+MASTERED = 1
+DAY_MASK = 0x1FFFFFFF
+PROGRESS_FIELDS = ('review_count', 'last_review', 'is_mastered', 'last_result')
+
+
+def pack_progress(review_count, day, mastered, last_result):
+    return (review_count << 32) | (day << 3) | (RESULTS.index(last_result) << 1) | int(mastered)
+
+
+def unpack_progress(value):
+    day = (value >> 3) & DAY_MASK
+    return {
+        'review_count': str(value >> 32),
+        'last_review': date.fromordinal(day).isoformat() if day else '',
+        'is_mastered': 'True' if value & MASTERED else 'False',
+        'last_result': RESULTS[(value >> 1) & 3],
+    }
+
+
+def _progress_from_row(row):
+    return pack_progress(
+        max(parse_count(row.get('review_count', '0')), 0),
+        parse_day(row.get('last_review', '') or '') or 0,
+        row.get('is_mastered') == 'True',
+        row.get('last_result', '') if row.get('last_result', '') in RESULTS else '',
+    )
+
+
+# Khoá tiến độ của một từ: (từ đã chuẩn hoá, ngôn ngữ). Vị trí dòng không dùng được vì nó
+# thay đổi (vị trí VocabStore tính từ 0, id SQLite tính từ 1 và được cấp lại khi import_csv,
+# file CSV có thể bị sửa từ bên ngoài).
+def word_key(row):
+    return normalize_word(row.get('word') or ''), row.get('language') or ''
+
+
+# === CLASS: Hồ sơ một người học ===
+# Dữ liệu từ điển (từ, nghĩa, ví dụ...) dùng chung từ kho từ vựng; hồ sơ chỉ giữ tiến độ
+# ôn tập theo word_key (từ, ngôn ngữ) và cấu hình riêng (ngôn ngữ, cấp độ).
+# Có cùng giao diện truy vấn/ghi với VocabStore nên các hàm học trong main dùng được trực tiếp.
+class Profile:
+    def __init__(self, name, store, path):
+        self.name = name
+        self.store = store
+        self.path = path
+        self.config = dict(DEFAULT_CONFIG)
+        self.progress = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.config.update(data.get('config', {}))
+        for word, language, value in data.get('progress', []):
+            self.progress[word, language] = value
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        progress = [[word, language, value] for (word, language), value in sorted(self.progress.items())]
+        with atomic_write(self.path) as f:
+            json.dump({'config': self.config, 'progress': progress}, f)
+        self.dirty = False
+
+    # --- truy vấn (cùng giao diện với VocabStore) ---
+    def __len__(self):
+        return len(self.store)
+
+    def row(self, pos):
+        row = dict(self.store.row(pos))
+        row.update(unpack_progress(self.progress.get(word_key(row), 0)))
+        return row
+
+    def exists(self, word):
+        return self.store.exists(word)
+
+    def positions_for_word(self, word, language=None):
+        return self.store.positions_for_word(word, language)
+
+    def find(self, word, language=None):
+        positions = self.positions_for_word(word, language)
+        return self.row(positions[0]) if positions else None
+
+    def filter(self, language=None, max_level=None, category=None, last_result=None):
+        positions = self.store.positions(language=language, max_level=max_level, category=category)
+        rows = (self.row(pos) for pos in positions)
+        if last_result is None:
+            return list(rows)
+        return [row for row in rows if row['last_result'] == last_result]
+
+    @staticmethod
+    def _priority(value, today):
+        day = (value >> 3) & DAY_MASK
+        if value & MASTERED or not day:
+            return 0
+        priority = today - day + (5 - (value >> 32)) * 2
+        if (value >> 1) & 3 == RESULTS.index('wrong'):
+            priority += 10
+        return priority
+
+    # Chỉ các từ đã có tiến độ mới có độ ưu tiên khác 0; còn lại giữ thứ tự trong file
+    def review_candidates(self, language=None, max_level=5, n=10):
+        today = date.today().toordinal()
+        positions = self.store.positions(language=language, max_level=max_level)
+        allowed = set(positions)
+        active = []
+        for (word, language), value in self.progress.items():
+            priority = self._priority(value, today)
+            if priority:
+                active.extend((-priority, pos) for pos in self.store.positions_for_word(word, language)
+                              if pos in allowed)
+        active.sort()
+        active_positions = {pos for _, pos in active}
+        zero = ((0, pos) for pos in positions if pos not in active_positions)
+        return [(-neg, self.row(pos)) for neg, pos in islice(heapq.merge(active, zero), n)]
+
+    def unlearned(self, language, max_level):
+        rows = (self.row(pos) for pos in self.store.positions(language=language, max_level=max_level))
+        return [row for row in rows if parse_count(row['review_count']) == 0]
+
+    # --- ghi dữ liệu ---
+    def update(self, pos, changes):
+        # Chỉ lưu phần tiến độ; phần từ điển (nghĩa, ví dụ...) được ghi vào kho dùng chung
+        current = self.store.row(pos)
+        static = {k: v for k, v in changes.items()
+                  if k in FIELDNAMES and k not in PROGRESS_FIELDS and current.get(k) != v}
+        key = word_key(current)
+        if static:
+            self.store.update(pos, static)
+            self.store.persist([pos])
+        row = self.row(pos)
+        if word_key(row) != key and key in self.progress:
+            # Từ bị đổi chữ / ngôn ngữ: tiến độ đi theo từ
+            row.update(unpack_progress(self.progress.pop(key)))
+        row.update(changes)
+        self.progress[word_key(row)] = _progress_from_row(row)
+        self.dirty = True
+
+    def persist(self, positions):
+        if self.dirty:
+            self.save()
+
+    def upsert(self, rows):
+        for row in rows:
+            positions = [pos for pos in self.positions_for_word(row['word'])
+                         if self.store.row(pos)['word'] == row['word']]
+            if not positions:
+                self.store.add({**row, 'review_count': '0', 'last_review': '',
+                                'is_mastered': 'False', 'last_result': ''})
+                positions = self.positions_for_word(row['word'])[-1:]
+            for pos in positions:
+                self.update(pos, row)
+        self.persist(None)
+
+    def add(self, row):
+        self.upsert([row])
+
+
+def profile_path(name, directory=PROFILE_DIR):
+    if not re.fullmatch(r'[\w.-]+', name) or name.startswith('.'):
+        raise ValueError(f"Tên hồ sơ không hợp lệ: {name!r}")
+    return os.path.join(directory, f'{name}.json')
+
+
+# === CLASS: Quản lý hồ sơ, giữ tối đa max_loaded hồ sơ trong bộ nhớ (LRU) ===
+class ProfileManager:
+    def __init__(self, store, directory=PROFILE_DIR, max_loaded=128):
+        self.store = store
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+
+    def path_for(self, name):
+        return profile_path(name, self.directory)
+
+    def get(self, name):
+        profile = self._loaded.get(name)
+        if profile is None:
+            profile = self._loaded[name] = Profile(name, self.store, self.path_for(name))
+            while len(self._loaded) > self.max_loaded:
+                _, evicted = self._loaded.popitem(last=False)
+                if evicted.dirty:
+                    evicted.save()
+        else:
+            self._loaded.move_to_end(name)
+        return profile
+
+    def save_all(self):
+        for profile in self._loaded.values():
+            if profile.dirty:
+                profile.save()
+
+
+_managers = {}
+
+
+# === FUNCTION: Ghi các hồ sơ còn thay đổi chưa lưu khi thoát ===
+@atexit.register
+def save_profiles():
+    for manager in _managers.values():
+        manager.save_all()
+
+
+# === FUNCTION: Lấy bộ quản lý hồ sơ dùng chung một kho từ vựng ===
+def get_profile_manager(store, directory=PROFILE_DIR):
+    key = (id(store), directory)
+    manager = _managers.get(key)
+    if manager is None or manager.store is not store:
+        manager = _managers[key] = ProfileManager(store, directory)
+    return manager
+
+
+# === FUNCTION: Cấu hình (ngôn ngữ, cấp độ) của một hồ sơ ===
+# Không cần kho từ vựng: lấy từ hồ sơ đang mở nếu có, nếu không thì chỉ đọc file hồ sơ
+def get_profile_config(name, directory=PROFILE_DIR):
+    for (_, manager_directory), manager in _managers.items():
+        profile = manager._loaded.get(name) if manager_directory == directory else None
+        if profile is not None:
+            return dict(profile.config)
+    config = dict(DEFAULT_CONFIG)
+    path = profile_path(name, directory)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            config.update(json.load(f).get('config', {}))
+    return config
@@ -0,0 +1,451 @@
+import argparse
+import atexit
+import heapq
+import math
+import re
+import threading
+import zlib
+from array import array
+from itertools import accumulate
+
+import snapshot
+from vocab_store import get_store, normalize_word
+
+RELATED_SUFFIX = '.related'
+MAGIC = b'VOCABREL'
+FORMAT_VERSION = 1
+TEXT_FIELDS = ('word', 'meaning', 'example')
+
+# Trọng số từng loại đặc trưng (trước khi nhân IDF)
+MEANING_WEIGHT = 1.0
+EXAMPLE_WEIGHT = 0.5
+NGRAM_WEIGHT = 0.7
+NGRAM = 3
+# Cộng thêm vào độ tương đồng cosine khi cùng chủ đề / cùng loại từ
+CATEGORY_BONUS = 0.1
+TYPE_BONUS = 0.05
+# Đặc trưng có ở hơn 10% số từ (và ít nhất 50 từ) được coi là từ dừng và bỏ qua
+STOP_RATIO = 0.1
+STOP_MIN_DF = 50
+# Danh sách vị trí của mỗi đặc trưng được sắp theo trọng số giảm dần; truy vấn chỉ duyệt
+# SCAN_LIMIT vị trí đầu nên thời gian không tăng theo kích thước bộ từ
+SCAN_LIMIT = 512
+# Số dòng phải đánh chỉ mục lại vượt tỉ lệ này thì dựng lại toàn bộ
+REBUILD_RATIO = 0.2
+# File chỉ mục còn khớp và chỉ thiếu tối đa ngần này dòng mới thì dùng ngay, không chờ luồng phụ
+SYNC_NEW_ROWS = 1000
+# Chờ luồng phụ tối đa ngần này giây trước khi báo chưa xong (bộ từ nhỏ dựng xong ngay)
+BACKGROUND_WAIT = 0.3
+TOKEN = re.compile(r'\w+')
+
+
+# === FUNCTION: Các đặc trưng của một từ -> trọng số ===
+# Token của nghĩa, token của câu ví dụ và n-gram ký tự của chính từ đó
+def extract_features(word, meaning, example):
+    features = {}
+    for token in TOKEN.findall(meaning.lower()):
+        key = 'm ' + token
+        features[key] = features.get(key, 0.0) + MEANING_WEIGHT
+    for token in TOKEN.findall(example.lower()):
+        key = 'e ' + token
+        features[key] = features.get(key, 0.0) + EXAMPLE_WEIGHT
+    padded = f'^{normalize_word(word)}$'
+    for i in range(max(1, len(padded) - NGRAM + 1)):
+        key = 'g ' + padded[i:i + NGRAM]
+        features[key] = features.get(key, 0.0) + NGRAM_WEIGHT
+    return features
+
+
+def _texts(rows, pos):
+    return [rows.get(pos, field) for field in TEXT_FIELDS]
+
+
+def _fingerprint(texts):
+    return zlib.crc32('\x1f'.join(texts).encode('utf-8'))
+
+
+# Số ô băm: luỹ thừa của 2, khoảng hai ô cho mỗi từ
+def _bucket_count(rows):
+    return 1 << max(12, (2 * rows).bit_length())
+
+
+# === CLASS: Chỉ mục từ liên quan (TF-IDF thưa trên các đặc trưng băm) ===
+# Mỗi đặc trưng được băm (crc32) vào một ô; chỉ mục ngược lưu theo dạng CSR: vị trí và trọng số
+# (đã nhân IDF và chuẩn hoá L2 theo từng từ) của mọi từ có đặc trưng thuộc ô b nằm trong
+# postings/weights[offsets[b]:offsets[b + 1]]. Độ liên quan = cosine + thưởng cùng chủ đề/loại từ.
+# Chỉ mục được dựng một lần và lưu ở vocab.csv.related (đọc qua mmap, xem snapshot.read_file).
+# Từ thêm/sửa sau đó (listener của kho) được đưa vào phần delta thay vì dựng lại; trọng số
+# của phần gốc giữ IDF lúc dựng. fingerprints[pos] (crc32 của từ, nghĩa, ví dụ) cho biết dòng
+# nào đã đổi so với lúc đánh chỉ mục.
+# Việc đọc/dựng/đối chiếu (tới ~50 s với 1M từ) có thể chạy ở luồng phụ (wait=False) trên một
+# bản sao của deck; trong lúc đó listener chỉ ghi lại các vị trí đổi, và khi luồng xong chúng
+# được đánh chỉ mục lại trên luồng chính (poll). File chỉ mục còn khớp thì được dùng ngay, không
+# qua luồng phụ. Chỉ mục chỉ dùng được khi ready.
+class RelatedIndex:
+    def __init__(self, store, wait=True):
+        self.store = store
+        self.path = store.file_path + RELATED_SUFFIX
+        self.rows = store.rows
+        self.dirty = False
+        self.ready = False
+        self.fingerprints = None
+        self._checked = False
+        self._thread = None
+        # None: chưa chuẩn bị; False: đang chuẩn bị; True: xong, chờ poll nhận kết quả
+        self._done = None
+        self._error = None
+        self._changes = set()
+        self._reloaded = False
+        store.add_listener(self._on_change)
+        self.poll(wait)
+
+    # --- chuẩn bị (đọc file, dựng, đối chiếu với deck) ---
+    def _start(self, wait):
+        self.ready = False
+        self._done = False
+        self._error = None
+        self._changes = set()
+        self._reloaded = False
+        if self._checked:
+            # Đã dùng được trước đó: đối chiếu lại toàn bộ với fingerprints
+            self._checked = False
+            self._digest = (None, None, None)
+        if wait or (self.fingerprints is None and self.load() and self._current()):
+            self._prepare(self.store.rows)
+        else:
+            self._thread = threading.Thread(target=self._prepare, args=(self.store.rows.copy(),), daemon=True)
+            self._thread.start()
+
+    def _prepare(self, rows):
+        try:
+            self.rows = rows
+            if self.fingerprints is None and not self.load():
+                self.build()
+            self._check()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+
+    # File vừa đọc còn khớp với deck (các dòng lúc lưu còn nguyên, thêm không quá SYNC_NEW_ROWS)
+    def _current(self):
+        rows = self.store.rows
+        saved, sizes, crc = self._digest
+        return (saved == len(self.fingerprints) <= len(rows) <= saved + SYNC_NEW_ROWS
+                and rows.digest(TEXT_FIELDS, saved, sizes) == (crc, sizes))
+
+    # Chỉ mục đã dùng được chưa; bắt đầu chuẩn bị nếu cần, wait=True thì chờ xong.
+    # Chỉ gọi từ luồng chính (cùng luồng với các thao tác ghi vào kho).
+    def poll(self, wait=False):
+        while not self.ready:
+            if self._done is None:
+                self._start(wait)
+            if not self._done:
+                self._thread.join(None if wait else BACKGROUND_WAIT)
+                if not self._done:
+                    return False
+            self._thread, self._done = None, None
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            changes = sorted(self._changes)
+            total = len(self.store.rows)
+            if (self._reloaded or total < len(self.fingerprints)
+                    or len(changes) + len(self.delta_rows) > REBUILD_RATIO * total
+                    or any(pos > len(self.fingerprints) for pos in changes)):
+                continue
+            # Các dòng thêm/sửa trong lúc chuẩn bị (dòng thêm mới có vị trí liên tiếp)
+            self.rows = self.store.rows
+            for pos in changes:
+                self._reindex(pos)
+            self.dirty = self.dirty or bool(changes)
+            self.ready = True
+        return True
+
+    # --- dựng / đọc / ghi ---
+    def build(self):
+        rows = self.rows
+        buckets = _bucket_count(len(rows))
+        mask = buckets - 1
+        df = array('I', bytes(4 * buckets))
+        entries, entry_weights, ends = array('I'), array('f'), array('I')
+        fingerprints = array('I')
+        bucket_of = {}
+        for pos in range(len(rows)):
+            texts = _texts(rows, pos)
+            fingerprints.append(_fingerprint(texts))
+            vector = {}
+            for feature, weight in extract_features(*texts).items():
+                bucket = bucket_of.get(feature)
+                if bucket is None:
+                    bucket = bucket_of[feature] = zlib.crc32(feature.encode('utf-8')) & mask
+                vector[bucket] = vector.get(bucket, 0.0) + weight
+            entries.extend(vector)
+            entry_weights.extend(vector.values())
+            ends.append(len(entries))
+            for bucket in vector:
+                df[bucket] += 1
+        del bucket_of
+
+        # IDF theo ô (0 với từ dừng), rồi đặt từng từ vào danh sách của các ô của nó
+        stop = max(STOP_MIN_DF, STOP_RATIO * len(rows))
+        idf_of = {count: math.log((1 + len(rows)) / (1 + count)) + 1 if count <= stop else 0.0
+                  for count in set(df)}
+        idfs = [idf_of[count] for count in df]
+        offsets = array('I', accumulate((count if idfs[bucket] else 0 for bucket, count in enumerate(df)),
+                                        initial=0))
+        fill = array('I', offsets)
+        postings = array('I', bytes(4 * offsets[-1]))
+        weights = array('f', bytes(4 * offsets[-1]))
+        start = 0
+        for pos, end in enumerate(ends):
+            row_buckets = entries[start:end]
+            row_weights = [weight * idfs[bucket] for bucket, weight in zip(row_buckets, entry_weights[start:end])]
+            norm = math.hypot(*row_weights)
+            for bucket, weight in zip(row_buckets, row_weights):
+                if weight:
+                    i = fill[bucket]
+                    postings[i] = pos
+                    weights[i] = weight / norm
+                    fill[bucket] = i + 1
+            start = end
+        del entries, entry_weights, ends, fill, idfs
+
+        # Chỉ các danh sách dài hơn SCAN_LIMIT mới cần sắp theo trọng số
+        for bucket in range(buckets):
+            a, b = offsets[bucket], offsets[bucket + 1]
+            if b - a > SCAN_LIMIT:
+                ranked = sorted(zip(weights[a:b], postings[a:b]), key=lambda item: -item[0])
+                weights[a:b] = array('f', (weight for weight, _ in ranked))
+                postings[a:b] = array('I', (pos for _, pos in ranked))
+
+        self.mask = mask
+        self.count = len(rows)
+        self.df, self.offsets, self.postings, self.weights = df, offsets, postings, weights
+        self.fingerprints = fingerprints
+        self._reset_delta()
+        self._checked = True
+        self.dirty = True
+        self.save()
+
+    def _reset_delta(self):
+        # Ô -> [(trọng số, vị trí)] của các từ thêm/sửa sau khi dựng; vị trí -> các ô của nó
+        self.delta = {}
+        self.delta_rows = {}
+        self.delta_df = {}
+        # Vị trí có dòng trong phần gốc đã cũ (bị bỏ qua khi truy vấn)
+        self.dropped = set()
+
+    def save(self):
+        if not self.dirty or not self._checked:
+            return
+        delta = [(pos, bucket, weight) for bucket, items in self.delta.items() for weight, pos in items]
+
+        rows = self.rows
+        crc, sizes = rows.digest(TEXT_FIELDS)
+
+        def dump(out):
+            out.number(self.count)
+            out.array(array('Q', sizes))
+            for values in (self.df, self.offsets, self.postings, self.weights, self.fingerprints):
+                out.array(values)
+            out.array(array('I', (pos for pos, _, _ in delta)))
+            out.array(array('I', (bucket for _, bucket, _ in delta)))
+            out.array(array('f', (weight for _, _, weight in delta)))
+            out.array(array('I', sorted(self.dropped)))
+
+        # Chữ ký: (0, số dòng, Deck.digest của các cột văn bản) của deck mà chỉ mục phản ánh
+        if snapshot.write_file(self.path, MAGIC, FORMAT_VERSION, (0, len(rows), crc), dump):
+            self.dirty = False
+
+    def load(self):
+        def read(src, signature):
+            count = src.number()
+            sizes = src.array()
+            arrays = [src.array() for _ in range(5)]
+            delta = [src.array() for _ in range(3)]
+            dropped = src.array()
+            if len(arrays[0]) + 1 != len(arrays[1]) or len(arrays[4]) < count:
+                return None
+            return signature, count, list(sizes), arrays, delta, dropped
+
+        loaded = snapshot.read_file(self.path, MAGIC, FORMAT_VERSION, read)
+        if loaded is None:
+            return False
+        (_, rows, crc), self.count, sizes, arrays, delta, dropped = loaded
+        self.df, self.offsets, self.postings, self.weights, fingerprints = arrays
+        self.mask = len(self.df) - 1
+        self.fingerprints = array('I', fingerprints)
+        self._reset_delta()
+        for pos, bucket, weight in zip(*delta):
+            self.delta.setdefault(bucket, []).append((weight, pos))
+            self.delta_rows.setdefault(pos, []).append(bucket)
+            if pos >= self.count:
+                self.delta_df[bucket] = self.delta_df.get(bucket, 0) + 1
+        self.dropped = set(dropped)
+        self._digest = (rows, sizes, crc)
+        self._checked = False
+        return True
+
+    # Đối chiếu với deck hiện tại: các dòng đã có lúc lưu còn nguyên (digest khớp) thì chỉ cần
+    # thêm các dòng mới; nếu không thì so từng dòng với fingerprints và đánh chỉ mục lại các
+    # dòng đã đổi (hoặc dựng lại nếu quá nhiều)
+    def _check(self):
+        if self._checked:
+            return
+        rows = self.rows
+        fingerprints = self.fingerprints
+        if len(rows) < len(fingerprints):
+            self.build()
+            return
+        saved, sizes, crc = self._digest
+        if saved == len(fingerprints) and rows.digest(TEXT_FIELDS, saved, sizes) == (crc, sizes):
+            changed = []
+        else:
+            changed = [pos for pos in range(len(fingerprints))
+                       if _fingerprint(_texts(rows, pos)) != fingerprints[pos]]
+        changed.extend(range(len(fingerprints), len(rows)))
+        if len(changed) + len(self.delta_rows) > REBUILD_RATIO * len(rows):
+            self.build()
+            return
+        for pos in changed:
+            self._reindex(pos)
+        self._checked = True
+        self.dirty = self.dirty or bool(changed)
+
+    # --- cập nhật tăng dần ---
+    def _on_change(self, pos):
+        if not self.ready:
+            # Đang chuẩn bị ở luồng phụ: ghi lại để xử lý khi xong
+            if pos is None:
+                self._reloaded = True
+            else:
+                self._changes.add(pos)
+        elif pos is None:
+            # Kho được tải lại: chuẩn bị lại ở lần dùng sau
+            self.ready = False
+        else:
+            fingerprints = self.fingerprints
+            if pos > len(fingerprints):
+                self.ready = False
+            elif pos == len(fingerprints) or _fingerprint(_texts(self.rows, pos)) != fingerprints[pos]:
+                self._reindex(pos)
+                self.dirty = True
+
+    def _reindex(self, pos):
+        texts = _texts(self.rows, pos)
+        old = self.delta_rows.pop(pos, None)
+        if old is not None:
+            for bucket in old:
+                self.delta[bucket] = [item for item in self.delta[bucket] if item[1] != pos]
+        elif pos < self.count:
+            self.dropped.add(pos)
+        features = self._buckets(extract_features(*texts))
+        if pos == len(self.fingerprints):
+            self.fingerprints.append(_fingerprint(texts))
+            for bucket in features:
+                self.delta_df[bucket] = self.delta_df.get(bucket, 0) + 1
+        else:
+            self.fingerprints[pos] = _fingerprint(texts)
+        vector = self._vector(features)
+        for bucket, weight in vector.items():
+            self.delta.setdefault(bucket, []).append((weight, pos))
+        self.delta_rows[pos] = list(vector)
+
+    # --- truy vấn ---
+    def _buckets(self, features):
+        buckets = {}
+        for feature, weight in features.items():
+            bucket = zlib.crc32(feature.encode('utf-8')) & self.mask
+            buckets[bucket] = buckets.get(bucket, 0.0) + weight
+        return buckets
+
+    # Vector TF-IDF (đã chuẩn hoá) theo số từ hiện tại
+    def _vector(self, buckets):
+        total = len(self.fingerprints)
+        stop = max(STOP_MIN_DF, STOP_RATIO * total)
+        vector = {}
+        for bucket, weight in buckets.items():
+            count = self.df[bucket] + self.delta_df.get(bucket, 0)
+            if count <= stop:
+                vector[bucket] = weight * (math.log((1 + total) / (1 + count)) + 1)
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        return {bucket: weight / norm for bucket, weight in vector.items()} if norm else {}
+
+    # k từ liên quan nhất với từ ở vị trí pos: [(điểm, vị trí)], điểm giảm dần
+    def related(self, pos, k=5, language=None):
+        self.poll(wait=True)
+        rows = self.rows
+        vector = self._vector(self._buckets(extract_features(*_texts(rows, pos))))
+        offsets, postings, weights = self.offsets, self.postings, self.weights
+        scores = {}
+        get = scores.get
+        for bucket, query_weight in vector.items():
+            start = offsets[bucket]
+            end = min(offsets[bucket + 1], start + SCAN_LIMIT)
+            for other, weight in zip(postings[start:end], weights[start:end]):
+                scores[other] = get(other, 0.0) + query_weight * weight
+        for other in self.dropped.intersection(scores):
+            del scores[other]
+        for bucket, query_weight in vector.items():
+            for weight, other in self.delta.get(bucket, ()):
+                scores[other] = get(other, 0.0) + query_weight * weight
+        scores.pop(pos, None)
+        if not scores:
+            return []
+
+        # Thưởng cho các cặp cùng chủ đề / loại từ (bỏ qua giá trị trống)
+        bonuses = [(rows.matcher(field, value), bonus)
+                   for field, bonus in (('category', CATEGORY_BONUS), ('type', TYPE_BONUS))
+                   for value in [rows.get(pos, field)] if value]
+        allowed = rows.matcher('language', language) if language else None
+        ranked = []
+        for other, score in scores.items():
+            if allowed is not None and not allowed(other):
+                continue
+            for same, bonus in bonuses:
+                if same(other):
+                    score += bonus
+            ranked.append((score, other))
+        return heapq.nlargest(k, ranked)
+
+
+_indexes = {}
+
+
+# === FUNCTION: Lấy chỉ mục từ liên quan gắn với kho từ vựng ===
+# wait=False: không chờ; trả về None (và chuẩn bị ở luồng phụ) nếu chỉ mục chưa dùng được
+def get_related_index(store, wait=True):
+    index = _indexes.get(id(store))
+    if index is None or index.store is not store:
+        index = _indexes[id(store)] = RelatedIndex(store, wait)
+    return index if index.poll(wait) else None
+
+
+@atexit.register
+def save_indexes():
+    for index in _indexes.values():
+        if index.ready:
+            index.save()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gợi ý từ liên quan trong vocab.csv")
+    parser.add_argument('word', nargs='?', help="Từ cần gợi ý (bỏ trống để chỉ dựng chỉ mục)")
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--language')
+    parser.add_argument('--rebuild', action='store_true', help="Dựng lại chỉ mục từ đầu")
+    parser.add_argument('--file', default='vocab.csv')
+    args = parser.parse_args()
+
+    vocab = get_store(args.file)
+    index = get_related_index(vocab)
+    if args.rebuild:
+        index.build()
+    if args.word:
+        positions = vocab.positions_for_word(args.word, args.language)
+        if not positions:
+            print(f"❌ Không tìm thấy từ: {args.word}")
+        for score, pos in index.related(positions[0], args.k, args.language) if positions else []:
+            row = vocab.row(pos)
+            print(f"{score:.3f}  {row['word']} – {row['meaning']} ({row['category']}, {row['type']})")
@@ -0,0 +1,108 @@
+import json
+import os
+
+import instrumentation
+
+
+JOURNAL_SUFFIX = '.journal'
+COMPACTING_SUFFIX = '.journal.compacting'
+
+
+# === CLASS: Nhật ký ghi trước (write-ahead) cho vocab.csv ===
+# Mỗi dòng là một bản ghi JSON {"pos": ..., "row": {...}} chứa toàn bộ dòng đã thay đổi.
+# Bản ghi chỉ hợp lệ khi kết thúc bằng '\n'; phần đuôi bị ghi dở (crash giữa chừng)
+# được bỏ qua khi đọc lại và bị cắt đi trước lần ghi tiếp theo.
+class ReviewJournal:
+    def __init__(self, csv_path, fsync_every=32):
+        self.path = csv_path + JOURNAL_SUFFIX
+        self.compacting_path = csv_path + COMPACTING_SUFFIX
+        self.fsync_every = fsync_every
+        self._file = None
+        self._pending = 0
+
+    @staticmethod
+    def _read(path):
+        records = []
+        valid_size = 0
+        if not os.path.exists(path):
+            return records, valid_size
+        instrumentation.count('file_opens')
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                records.append(record)
+                valid_size += len(line)
+        return records, valid_size
+
+    # Trả về các bản ghi hợp lệ theo thứ tự ghi (kể cả bản ghi của lần nén đang dở)
+    def replay(self):
+        pending, _ = self._read(self.compacting_path)
+        records, _ = self._read(self.path)
+        return pending + records
+
+    def _open(self):
+        if self._file is None:
+            _, valid_size = self._read(self.path)
+            self._file = open(self.path, 'ab')
+            instrumentation.count('file_opens')
+            if self._file.tell() != valid_size:
+                self._file.truncate(valid_size)
+                self._file.seek(valid_size)
+        return self._file
+
+    def append(self, records):
+        f = self._open()
+        data = b''.join(
+            json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n' for record in records
+        )
+        f.write(data)
+        f.flush()
+        instrumentation.count('bytes_written', len(data))
+        self._pending += len(records)
+        if self._pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self._pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    # Chuyển nhật ký hiện tại sang file .compacting để nén, các lần ghi sau vào file mới
+    def begin_compaction(self):
+        self.close()
+        if os.path.exists(self.compacting_path):
+            # Lần nén trước chưa xong: gộp nhật ký hiện tại vào sau nó
+            with open(self.compacting_path, 'ab') as dst:
+                _, valid_size = self._read(self.compacting_path)
+                dst.truncate(valid_size)
+                if os.path.exists(self.path):
+                    with open(self.path, 'rb') as src:
+                        dst.write(src.read(self._read(self.path)[1]))
+                dst.flush()
+                os.fsync(dst.fileno())
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        elif os.path.exists(self.path):
+            os.replace(self.path, self.compacting_path)
+
+    def end_compaction(self):
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
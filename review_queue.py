@@ -0,0 +1,165 @@
+import bisect
+import heapq
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+
+from instrumentation import timed
+from vocab_store import parse_level
+
+# Từ kích thước này việc nạp numpy (~0.1 s) mới rẻ hơn tính từng dòng
+VECTOR_MIN_ROWS = 50_000
+
+
+@lru_cache(maxsize=4096)
+def parse_day(value):
+    # Trả về số thứ tự ngày (date.toordinal) hoặc None nếu ngày trống / sai định dạng
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except ValueError:
+        return None
+
+
+def parse_count(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+# === FUNCTION: Phần tĩnh của độ ưu tiên ===
+# calculate_priority = (hôm nay - last_review) + (5 - count) * 2 + 10 nếu sai lần trước.
+# Phần không phụ thuộc ngày hôm nay được tính một lần khi dòng thay đổi:
+# priority = today + static_priority. Trả về None nếu độ ưu tiên luôn bằng 0.
+def static_priority(row):
+    if row.get("is_mastered", "False") == "True":
+        return None
+    last_review = row.get("last_review", "") or ""
+    day = parse_day(last_review)
+    if day is None:
+        if last_review.strip():
+            print(f"⚠️ Lỗi định dạng ngày với từ: {row.get('word', '')}. Bỏ qua.")
+        return None
+    static = -day + (5 - parse_count(row.get("review_count", "0"))) * 2
+    if row.get("last_result", "") == "wrong":
+        static += 10
+    return static
+
+
+# === FUNCTION: Chọn top N bằng heap giới hạn, O(n log k) ===
+# Giữ nguyên thứ tự ổn định như sorted(..., reverse=True)[:n]
+def top_n(items, n, key):
+    return heapq.nlargest(n, items, key=key)
+
+
+# === CLASS: Hàng đợi ôn tập ===
+# Chỉ mục độ ưu tiên chia theo nhóm (language, level). Mỗi nhóm giữ một danh sách
+# (-static_priority, pos) đã sắp xếp và một danh sách các dòng có độ ưu tiên 0.
+# Chỉ mục được cập nhật từng dòng khi kho từ vựng thay đổi; khi dựng lại cả chỉ mục (mở kho,
+# tải lại) độ ưu tiên được tính một lượt trên các cột của Deck (vector_priority, cần numpy)
+# với bộ từ lớn.
+class ReviewQueue:
+    def __init__(self, store):
+        self.store = store
+        self._active = defaultdict(list)
+        self._zero = defaultdict(list)
+        self._entries = {}
+        self.rebuild()
+        store.add_listener(self._on_change)
+
+    @timed()
+    def rebuild(self):
+        self._active = defaultdict(list)
+        self._zero = defaultdict(list)
+        self._entries = {}
+        review_buckets = None
+        if len(self.store.rows) >= VECTOR_MIN_ROWS or 'numpy' in sys.modules:
+            try:
+                from vector_priority import review_buckets
+            except ImportError:  # Không có numpy: tính từng dòng
+                pass
+        if review_buckets is not None:
+            active, zero, self._entries = review_buckets(self.store.rows)
+            self._active.update(active)
+            self._zero.update(zero)
+            return
+        for pos, row in enumerate(self.store.rows):
+            entry = self._entry(row)
+            if entry is None:
+                continue
+            bucket, static = entry
+            if static is None:
+                self._zero[bucket].append(pos)
+            else:
+                self._active[bucket].append((-static, pos))
+            self._entries[pos] = entry
+        for items in self._active.values():
+            items.sort()
+
+    def _entry(self, row):
+        level = parse_level(row.get('level'))
+        if level is None:
+            return None  # Bỏ qua nếu cấp độ không phải số
+        return (row.get('language', ''), level), static_priority(row)
+
+    def _remove(self, pos):
+        entry = self._entries.pop(pos, None)
+        if entry is None:
+            return
+        bucket, static = entry
+        if static is None:
+            items, item = self._zero[bucket], pos
+        else:
+            items, item = self._active[bucket], (-static, pos)
+        i = bisect.bisect_left(items, item)
+        if i < len(items) and items[i] == item:
+            del items[i]
+
+    def _on_change(self, pos):
+        if pos is None:
+            self.rebuild()
+            return
+        self._remove(pos)
+        entry = self._entry(self.store.rows[pos])
+        if entry is None:
+            return
+        bucket, static = entry
+        if static is None:
+            bisect.insort(self._zero[bucket], pos)
+        else:
+            bisect.insort(self._active[bucket], (-static, pos))
+        self._entries[pos] = entry
+
+    def _buckets(self, language, max_level):
+        keys = set(self._active) | set(self._zero)
+        return [key for key in keys
+                if (language is None or key[0] == language) and key[1] <= max_level]
+
+    # Trả về [(priority, pos)] theo độ ưu tiên giảm dần, hoà thì theo thứ tự trong file
+    @timed()
+    def top(self, language=None, max_level=5, n=10, today=None):
+        today = (today or date.today()).toordinal()
+        buckets = self._buckets(language, max_level)
+        active = heapq.merge(*(self._active[key] for key in buckets))
+        zero = heapq.merge(*(self._zero[key] for key in buckets))
+        merged = heapq.merge(
+            ((neg_static - today, pos) for neg_static, pos in active),
+            ((0, pos) for pos in zero),
+        )
+        return [(-neg, pos) for neg, pos in islice(merged, n)]
+
+
+_queues = {}
+
+
+# === FUNCTION: Lấy hàng đợi ôn tập gắn với kho từ vựng ===
+def get_review_queue(store):
+    queue = _queues.get(id(store))
+    if queue is None or queue.store is not store:
+        queue = _queues[id(store)] = ReviewQueue(store)
+    return queue
@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from game_index import GameIndex
+from game_rounds import ROUND_BUILDERS, ROUND_TYPES, generate_rounds, game_vocab
+from grading import apply_results, grade_answers, summarize
+from main import (compute_learning_report, flush_history, get_words_to_review, load_config,
+                  log_history, mark_learned, open_store, pick_new_words, save_vocab_list)
+from vocab_store import public_row
+
+MAX_BODY = 1 << 20
+# Mục trong hàng đợi ghi: ghi các sự kiện lịch sử đang chờ (VocabServer.log)
+LOG_HISTORY = object()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(query, name, default):
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise HttpError(400, f"'{name}' phải là số nguyên")
+
+
+# Các hàm chạy trong luồng ghi (đọc-gộp-ghi vocab.csv / history.csv)
+def _learn_words(words, lang):
+    store = open_store()
+    learned = []
+    for word in words:
+        row = store.find(word, language=lang)
+        if row is not None:
+            row = dict(row)
+            mark_learned(row, lang)
+            learned.append(row)
+    flush_history()
+    if learned:
+        save_vocab_list(learned)
+    return [row['word'] for row in learned]
+
+
+def _grade(answers, lang, user_level, apply):
+    pairs = [(entry['word'], entry.get('answer', '')) for entry in answers]
+    results = grade_answers(pairs, lang)
+    summary = apply_results(results, lang, user_level) if apply else summarize(results, user_level)
+    return {'results': results, 'summary': summary}
+
+
+# === CLASS: Dịch vụ HTTP/JSON cho ứng dụng học từ ===
+# Kho từ vựng nằm sẵn trong bộ nhớ (open_store). Mọi truy cập kho đi qua một khoá asyncio và
+# chạy trong luồng phụ (asyncio.to_thread), nên việc đọc file và chấm điểm không chặn vòng lặp
+# sự kiện. Các thao tác ghi (kể cả ghi lịch sử) được xếp vào hàng đợi và một tác vụ ghi duy nhất
+# chạy lần lượt từng thao tác, nên các yêu cầu đồng thời không ghi đè lên nhau.
+class VocabServer:
+    def __init__(self):
+        config = load_config()
+        self.language = config['language']
+        self.user_level = config['user_level']
+        self.version = 0
+        self._lock = asyncio.Lock()
+        self._writes = asyncio.Queue()
+        self._writer = None
+        self._history = []
+        self._games = {}
+        self._clients = set()
+        self.routes = {
+            ('GET', '/lookup'): self.lookup,
+            ('GET', '/review'): self.review,
+            ('POST', '/grade'): self.grade,
+            ('GET', '/learn'): self.learn_candidates,
+            ('POST', '/learn'): self.learn,
+            ('GET', '/game/round'): self.game_round,
+            ('GET', '/report'): self.report,
+        }
+
+    # --- truy cập kho ---
+    async def read(self, func, *args):
+        async with self._lock:
+            return await asyncio.to_thread(func, *args)
+
+    async def write(self, func, *args):
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((func, args, future))
+        return await future
+
+    # Ghi lịch sử qua tác vụ ghi mà không chờ. Các sự kiện dồn lại thành một lượt ghi, giữ đúng
+    # thứ tự với các thao tác ghi khác; lượt này không đổi kho nên không cần khoá kho.
+    def log(self, action, row, lang):
+        if not self._history:
+            self._writes.put_nowait(LOG_HISTORY)
+        self._history.append((action, row['word'], row['category'], lang))
+
+    def _log_pending(self):
+        events, self._history = self._history, []
+        return asyncio.to_thread(lambda: [log_history(*event) for event in events])
+
+    async def _run_writer(self):
+        while True:
+            item = await self._writes.get()
+            if item is None:
+                return
+            if item is LOG_HISTORY:
+                try:
+                    await self._log_pending()
+                except Exception as e:
+                    print(f"⚠️ Lỗi khi ghi lịch sử: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            func, args, future = item
+            try:
+                async with self._lock:
+                    result = await asyncio.to_thread(func, *args)
+                    self.version += 1
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+    # --- endpoint ---
+    def _lang_level(self, params):
+        return (params.get('language', self.language),
+                _int_param(params, 'level', self.user_level))
+
+    async def lookup(self, params, body):
+        word = params.get('word', '').strip().lower()
+        if not word:
+            raise HttpError(400, "Thiếu tham số 'word'")
+        lang = params.get('language', self.language)
+
+        def find():
+            row = open_store().find(word, language=lang)
+            return None if row is None else public_row(row)
+
+        row = await self.read(find)
+        if row is None:
+            raise HttpError(404, "Từ này chưa có trong dữ liệu.")
+        self.log("lookup", row, lang)
+        return row
+
+    async def review(self, params, body):
+        lang, level = self._lang_level(params)
+        n = _int_param(params, 'n', 10)
+        words = await self.read(lambda: get_words_to_review(lang, level, top_n=n))
+        return {'words': [public_row(word) for word in words]}
+
+    async def grade(self, params, body):
+        answers = body.get('answers')
+        if not isinstance(answers, list) or not all(isinstance(a, dict) and 'word' in a for a in answers):
+            raise HttpError(400, "'answers' phải là danh sách {\"word\": ..., \"answer\": ...}")
+        lang, level = self._lang_level(body)
+        if body.get('apply'):
+            return await self.write(_grade, answers, lang, level, True)
+        return await self.read(_grade, answers, lang, level, False)
+
+    async def learn_candidates(self, params, body):
+        lang, level = self._lang_level(params)
+        goal = _int_param(params, 'goal', 5)
+        words = await self.read(lambda: pick_new_words(open_store(), lang, level, goal))
+        return {'words': [public_row(word) for word in words]}
+
+    async def learn(self, params, body):
+        words = body.get('words')
+        if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+            raise HttpError(400, "'words' phải là danh sách các từ")
+        lang = body.get('language', self.language)
+        return {'learned': await self.write(_learn_words, words, lang)}
+
+    async def game_round(self, params, body):
+        lang, level = self._lang_level(params)
+        kind = params.get('type')
+        if kind is not None and kind not in ROUND_TYPES:
+            raise HttpError(400, f"'type' phải là một trong {', '.join(ROUND_TYPES)}")
+
+        def build():
+            # Chỉ mục game được dựng lại khi có thao tác ghi mới
+            key = (lang, level)
+            cached = self._games.get(key)
+            if cached is None or cached[0] != self.version:
+                vocab = game_vocab(open_store(), lang, level)
+                if len(vocab) < 4:
+                    raise HttpError(409, "Cần ít nhất 4 từ vựng đã học để chơi trò chơi.")
+                index = GameIndex(vocab)
+                cached = self._games[key] = (self.version, index, generate_rounds(index))
+            if kind is None:
+                return next(cached[2])
+            game_round = ROUND_BUILDERS[kind](cached[1])
+            if game_round is None:
+                raise HttpError(409, "Không đủ dữ liệu để tạo câu hỏi.")
+            return game_round
+
+        return await self.read(build)
+
+    async def report(self, params, body):
+        report = await self.read(compute_learning_report)
+        if report is None:
+            raise HttpError(404, "Chưa có dữ liệu hành vi để tạo báo cáo.")
+        return report
+
+    # --- HTTP ---
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise HttpError(405, f"Không hỗ trợ {method} {url.path}")
+            raise HttpError(404, f"Không tìm thấy {url.path}")
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise HttpError(400, "Nội dung yêu cầu không phải JSON hợp lệ")
+            if not isinstance(body, dict):
+                raise HttpError(400, "Nội dung yêu cầu phải là một đối tượng JSON")
+        else:
+            body = {}
+        return await handler(params, body)
+
+    async def handle_connection(self, reader, writer):
+        self._clients.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    raise HttpError(413, "Nội dung yêu cầu quá lớn")
+                body = await reader.readexactly(length)
+
+                try:
+                    status, payload = 200, await self.dispatch(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+
+                keep_alive = (version == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HttpError as e:
+            self._respond(writer, e.status, {'error': str(e)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        # Nạp kho từ vựng một lần trước khi nhận yêu cầu
+        await asyncio.to_thread(open_store)
+        self._writer = asyncio.create_task(self._run_writer())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🌐 Đang phục vụ tại http://{host}:{server.sockets[0].getsockname()[1]}", flush=True)
+        # SIGTERM/SIGHUP dừng máy chủ trong vòng lặp sự kiện để vẫn ghi hết bộ đệm lịch sử
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for name in ('SIGTERM', 'SIGHUP'):
+            signum = getattr(signal, name, None)
+            if signum is not None:
+                try:
+                    loop.add_signal_handler(signum, stop.set)
+                except (NotImplementedError, RuntimeError):
+                    pass
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            # Đóng các kết nối keep-alive đang chờ để chúng kết thúc bình thường
+            for writer in list(self._clients):
+                writer.close()
+            # Chạy nốt các thao tác ghi đã xếp hàng (lịch sử tra từ) rồi ghi bộ đệm lịch sử
+            await self._writes.put(None)
+            await self._writer
+            await asyncio.to_thread(flush_history)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Máy chủ HTTP/JSON cho AI Vocabulary Coach")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(VocabServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import atexit
+import bisect
+import json
+import os
+from datetime import date
+from itertools import islice
+
+from file_lock import atomic_write
+from review_queue import parse_count, parse_day
+from vocab_store import get_store, normalize_word, parse_level
+
+STATE_SUFFIX = '.sm2.json'
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Điểm chất lượng SM-2 (0–5) cho câu trả lời đúng / sai
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+
+# === FUNCTION: Một bước SM-2 ===
+# state = (ease, interval, repetitions); trả về state mới
+def sm2_step(state, quality):
+    ease, interval, repetitions = state
+    if quality >= 3:
+        if repetitions == 0:
+            interval = 1
+        elif repetitions == 1:
+            interval = 6
+        else:
+            interval = round(interval * ease)
+        repetitions += 1
+    else:
+        repetitions = 0
+        interval = 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ease, interval, repetitions
+
+
+# === FUNCTION: Chuyển đổi từ các cột review_count / last_result / last_review ===
+# Các lần ôn trước lần cuối được coi là đúng, lần cuối theo last_result.
+# Trả về None nếu từ chưa được học.
+def migrate_row(row):
+    count = parse_count(row.get('review_count', '0'))
+    day = parse_day(row.get('last_review', '') or '')
+    if count <= 0 or day is None:
+        return None
+    state = (DEFAULT_EASE, 0, 0)
+    for _ in range(count - 1):
+        state = sm2_step(state, QUALITY_CORRECT)
+    last_quality = QUALITY_WRONG if row.get('last_result') == 'wrong' else QUALITY_CORRECT
+    ease, interval, repetitions = sm2_step(state, last_quality)
+    return [round(ease, 4), interval, repetitions, day + interval, count]
+
+
+# === CLASS: Lịch ôn tập SM-2 ===
+# Mỗi từ (theo vị trí trong kho) có [ease, interval, repetitions, due, review_count]; tệp lịch
+# lưu thêm (từ, ngôn ngữ) sau mỗi trạng thái để khi tải gắn lịch theo từ chứ không theo vị trí.
+# Danh sách (due, pos) được giữ có thứ tự bằng bisect nên "từ nào đến hạn hôm nay" chỉ là
+# một đoạn đầu của danh sách. Lịch được cập nhật khi review_count của một từ tăng lên
+# (update_word + save_vocab_list, hoặc học từ mới).
+# Giữa hai lần chạy, hoặc khi kho được tải lại (tiến trình khác ghi vocab.csv), vị trí có thể
+# dịch chuyển: _keys nhớ (từ, ngôn ngữ) của từng vị trí có lịch để chuyển lịch theo từ (_match).
+class Sm2Scheduler:
+    def __init__(self, store):
+        self.store = store
+        self.path = store.file_path + STATE_SUFFIX
+        self.states = {}
+        self._keys = {}
+        self._due = []
+        self.dirty = False
+        if os.path.exists(self.path):
+            self.load()
+        else:
+            self.migrate()
+        store.add_listener(self._on_change)
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as f:
+            saved = json.load(f)
+        self.states, self._keys = {}, {}
+        legacy = False
+        for pos, state in saved.items():
+            pos = int(pos)
+            if len(state) > 5:
+                self._keys[pos] = tuple(state[5:7])
+            elif pos < len(self.store.rows):
+                # Tệp cũ chưa lưu (từ, ngôn ngữ): gắn theo dòng hiện tại ở vị trí đó
+                self._keys[pos] = self._key(pos)
+                legacy = True
+            self.states[pos] = state[:5]
+        self._match()
+        self.dirty = self.dirty or legacy
+
+    def save(self):
+        if not self.dirty:
+            return
+        with atomic_write(self.path) as f:
+            json.dump({pos: state + list(self._keys[pos]) for pos, state in self.states.items()}, f)
+        self.dirty = False
+
+    def migrate(self):
+        self.states = {}
+        for pos, row in enumerate(self.store.rows):
+            state = migrate_row(row)
+            if state is not None:
+                self.states[pos] = state
+        self._keys = {pos: self._key(pos) for pos in self.states}
+        self._due = sorted((state[3], pos) for pos, state in self.states.items())
+        self.dirty = True
+
+    def _key(self, pos):
+        rows = self.store.rows
+        return normalize_word(rows.get(pos, 'word')), rows.get(pos, 'language')
+
+    # Đối chiếu lịch với kho: giữ lịch ở vị trí còn đúng từ, chuyển lịch của từ đã đổi vị trí,
+    # bỏ lịch của từ đã bị xoá
+    def _match(self):
+        rows = self.store.rows
+        states, keys, moved = {}, {}, []
+        for pos, state in self.states.items():
+            key = self._keys.get(pos)
+            if key is None:
+                continue
+            if pos < len(rows) and self._key(pos) == key:
+                states[pos], keys[pos] = state, key
+            else:
+                moved.append((key, state))
+        for key, state in moved:
+            pos = next((pos for pos in self.store.positions_for_word(*key) if pos not in states), None)
+            if pos is not None:
+                states[pos], keys[pos] = state, key
+        self.dirty = self.dirty or states != self.states
+        self.states, self._keys = states, keys
+        self._due = sorted((state[3], pos) for pos, state in states.items())
+
+    # Kho vừa tải lại (tiến trình khác ghi vocab.csv): đối chiếu lịch theo từ, rồi cập nhật các từ
+    # đã được ôn trong lúc đó
+    def relocate(self):
+        self._match()
+        rows = self.store.rows
+        for pos in rows.select([rows.mask('review_count', lambda v: parse_count(v) > 0)]):
+            if pos in self.states:
+                self._on_change(pos)
+            else:
+                state = migrate_row(rows[pos])
+                if state is not None:
+                    self._set(pos, state)
+
+    def _set(self, pos, state):
+        old = self.states.get(pos)
+        if old is not None:
+            i = bisect.bisect_left(self._due, (old[3], pos))
+            if i < len(self._due) and self._due[i] == (old[3], pos):
+                del self._due[i]
+        self.states[pos] = state
+        self._keys[pos] = self._key(pos)
+        bisect.insort(self._due, (state[3], pos))
+        self.dirty = True
+
+    def review(self, pos, correct, today=None):
+        today = (today or date.today()).toordinal()
+        old = self.states.get(pos)
+        state = (old[0], old[1], old[2]) if old else (DEFAULT_EASE, 0, 0)
+        ease, interval, repetitions = sm2_step(state, QUALITY_CORRECT if correct else QUALITY_WRONG)
+        count = parse_count(self.store.rows[pos].get('review_count', '0'))
+        self._set(pos, [round(ease, 4), interval, repetitions, today + interval, count])
+
+    def _on_change(self, pos):
+        if pos is None:
+            self.relocate()
+            return
+        row = self.store.rows[pos]
+        count = parse_count(row.get('review_count', '0'))
+        old = self.states.get(pos)
+        if old is not None:
+            self._keys[pos] = self._key(pos)
+        if count > (old[4] if old else 0):
+            day = parse_day(row.get('last_review', '') or '')
+            self.review(pos, row.get('last_result') != 'wrong',
+                        date.fromordinal(day) if day else None)
+
+    # Các từ đến hạn (due <= hôm nay), quá hạn lâu nhất trước
+    def due(self, language=None, max_level=5, n=10, today=None):
+        today = (today or date.today()).toordinal()
+        end = bisect.bisect_right(self._due, (today, float('inf')))
+        rows = self.store.rows
+
+        def matches(pos):
+            row = rows[pos]
+            level = parse_level(row.get('level'))
+            return (level is not None and level <= max_level
+                    and (language is None or row.get('language') == language))
+
+        return [(today - due, pos) for due, pos in islice(
+            (item for item in islice(self._due, end) if matches(item[1])), n)]
+
+
+_schedulers = {}
+
+
+# === FUNCTION: Lấy lịch SM-2 gắn với kho từ vựng ===
+def get_scheduler(store):
+    scheduler = _schedulers.get(id(store))
+    if scheduler is None or scheduler.store is not store:
+        scheduler = _schedulers[id(store)] = Sm2Scheduler(store)
+    return scheduler
+
+
+@atexit.register
+def save_schedulers():
+    for scheduler in _schedulers.values():
+        scheduler.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo lại lịch SM-2 từ các cột review_count/last_result")
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--vocab', default='vocab.csv')
+    args = parser.parse_args()
+
+    scheduler = get_scheduler(get_store(args.vocab))
+    scheduler.migrate()
+    scheduler.save()
+    print(f"✅ Đã tạo lịch SM-2 cho {len(scheduler.states)} từ ({scheduler.path})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+import instrumentation
+from deck import Deck
+from file_lock import atomic_write
+
+SNAPSHOT_SUFFIX = '.snapshot'
+MAGIC = b'VOCABSNP'
+# Tăng khi đổi định dạng hoặc cách mã hoá các cột trong deck.py: ảnh chụp cũ bị bỏ qua
+FORMAT_VERSION = 1
+
+# magic, phiên bản định dạng, thứ tự byte, rồi chữ ký CSV: mtime_ns, kích thước, crc32
+HEADER = struct.Struct('<8sI8sqQI')
+NUMBER = struct.Struct('<Q')
+LENGTH = struct.Struct('<I')
+ARRAY = struct.Struct('<cBQ')
+# Dữ liệu mảng được căn theo 8 byte để memoryview.cast đọc thẳng trên mmap
+ALIGN = 8
+
+
+def _map(f):
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # file rỗng
+        return None
+
+
+# === FUNCTION: Chữ ký của file CSV (mtime, kích thước, crc32 nội dung) ===
+def csv_signature(path):
+    try:
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            mapped = _map(f)
+            crc = 0
+            if mapped is not None:
+                with mapped:
+                    crc = zlib.crc32(mapped)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, crc
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class _Writer:
+    def __init__(self, f):
+        self.f = f
+
+    def number(self, value):
+        self.f.write(NUMBER.pack(value))
+
+    def bytes(self, data):
+        self.number(len(data))
+        self.f.write(data)
+
+    def array(self, values):
+        typecode = values.typecode if isinstance(values, array) else values.format
+        self.f.write(ARRAY.pack(typecode.encode('ascii'), values.itemsize, len(values)))
+        self.f.write(bytes(-self.f.tell() % ALIGN))
+        if isinstance(values, array):
+            values.tofile(self.f)
+        else:
+            self.f.write(values.cast('B'))
+
+    # Bảng chuỗi: số lượng, rồi mỗi chuỗi là độ dài (4 byte) + UTF-8
+    def strings(self, values):
+        self.number(len(values))
+        self.f.write(b''.join(LENGTH.pack(len(data)) + data
+                              for data in (value.encode('utf-8') for value in values)))
+
+
+class _Reader:
+    def __init__(self, view, offset=0):
+        self.view = view
+        self.offset = offset
+
+    def _take(self, size):
+        end = self.offset + size
+        if end > len(self.view):
+            raise SnapshotError('ảnh chụp bị cắt cụt')
+        chunk = self.view[self.offset:end]
+        self.offset = end
+        return chunk
+
+    def _unpack(self, layout):
+        if self.offset + layout.size > len(self.view):
+            raise SnapshotError('ảnh chụp bị cắt cụt')
+        values = layout.unpack_from(self.view, self.offset)
+        self.offset += layout.size
+        return values
+
+    def number(self):
+        return self._unpack(NUMBER)[0]
+
+    # Các hàm dưới trả về memoryview trên mmap (không chép)
+    def bytes(self):
+        return self._take(self.number())
+
+    def array(self):
+        typecode, itemsize, count = self._unpack(ARRAY)
+        typecode = typecode.decode('ascii')
+        if struct.calcsize(typecode) != itemsize:
+            raise SnapshotError('kích thước phần tử khác với máy ghi ảnh chụp')
+        self._take(-self.offset % ALIGN)
+        return self._take(count * itemsize).cast(typecode)
+
+    def strings(self):
+        values = []
+        for _ in range(self.number()):
+            size = self._unpack(LENGTH)[0]
+            values.append(str(self._take(size), 'utf-8'))
+        return values
+
+
+# === FUNCTION: Ghi một file nhị phân gắn với chữ ký của vocab.csv ===
+# Phần đầu (magic, phiên bản, thứ tự byte, chữ ký) do hàm này ghi, phần thân do dump(out)
+# ghi qua _Writer. File chỉ là bộ nhớ đệm: không ghi được (thư mục chỉ đọc, file đang được
+# map trên Windows...) thì bỏ qua và trả về False.
+def write_file(path, magic, version, signature, dump):
+    if signature is None:
+        return False
+    mtime_ns, size, crc = signature
+    try:
+        with atomic_write(path, binary=True) as f:
+            f.write(HEADER.pack(magic, version, sys.byteorder.encode('ascii'), mtime_ns, size, crc))
+            dump(_Writer(f))
+    except OSError:
+        return False
+    return True
+
+
+# === FUNCTION: Đọc file do write_file ghi, qua mmap ===
+# Trả về load(src, chữ ký đã lưu) nếu magic và phiên bản khớp, None nếu file thiếu/cũ/hỏng.
+# Mảng và chuỗi byte mà src trả về trỏ thẳng vào vùng mmap, vùng này được giải phóng cùng chúng.
+def read_file(path, magic, version, load):
+    try:
+        with open(path, 'rb') as f:
+            mapped = _map(f)
+    except OSError:
+        return None
+    instrumentation.count('file_opens')
+    if mapped is None:
+        return None
+    view = memoryview(mapped)
+    try:
+        if len(view) < HEADER.size:
+            return None
+        found, found_version, byteorder, *signature = HEADER.unpack_from(view, 0)
+        if (found, found_version, byteorder.rstrip(b'\0')) != (magic, version, sys.byteorder.encode('ascii')):
+            return None
+        return load(_Reader(view, HEADER.size), tuple(signature))
+    except (SnapshotError, ValueError, TypeError, UnicodeDecodeError, struct.error):
+        return None
+
+
+# === FUNCTION: Ghi ảnh chụp nhị phân của deck (cùng chỉ mục theo từ) ===
+# signature: csv_signature() của đúng file CSV mà deck phản ánh
+def write(path, signature, deck, word_keys):
+    def dump(out):
+        deck.dump(out)
+        out.array(word_keys)
+
+    if write_file(path, MAGIC, FORMAT_VERSION, signature, dump):
+        instrumentation.count('snapshot_writes')
+
+
+# === FUNCTION: Đọc ảnh chụp ===
+# Trả về (deck, word_keys) nếu ảnh chụp khớp chữ ký CSV hiện tại, None nếu thiếu/cũ/hỏng
+# (khi đó đọc lại CSV và ghi ảnh chụp mới). first_revision: số phiên bản của dòng đầu tiên.
+# Các cột của deck trỏ thẳng vào vùng mmap.
+def read(path, signature, fieldnames, first_revision):
+    def load(src, stored):
+        if signature is None or stored != tuple(signature):
+            return None
+        deck = Deck.load(src, first_revision)
+        if deck.fieldnames != list(fieldnames):
+            return None
+        word_keys = src.array()
+        if len(word_keys) != len(deck):
+            return None
+        return deck, word_keys
+
+    loaded = read_file(path, MAGIC, FORMAT_VERSION, load)
+    if loaded is not None:
+        instrumentation.count('snapshot_loads')
+    return loaded
@@ -0,0 +1,303 @@
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+from collections import Counter
+from datetime import date
+
+from file_lock import atomic_write, get_lock
+from review_queue import static_priority
+from vocab_store import FIELDNAMES, normalize_word
+
+HISTORY_FIELDNAMES = ['action', 'timestamp', 'word', 'category', 'language']
+
+# Cột tính sẵn khi ghi (bằng Python), để truy vấn không phải gọi hàm Python cho từng dòng:
+# word_key = normalize_word(word), priority_base = review_queue.static_priority(row).
+# word_key NULL nghĩa là chưa tính (CSDL cũ, hoặc dòng được thêm bằng công cụ khác như sqlite3):
+# được tính lại khi mở kho.
+DERIVED_COLUMNS = (('word_key', 'TEXT'), ('priority_base', 'INTEGER'))
+# Các cột mà priority_base phụ thuộc vào
+PRIORITY_FIELDS = ('is_mastered', 'last_review', 'review_count', 'last_result')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS vocab (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} TEXT NOT NULL DEFAULT ""' for name in FIELDNAMES)},
+    {', '.join(f'{name} {type_}' for name, type_ in DERIVED_COLUMNS)}
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    {', '.join(f'{name} TEXT NOT NULL DEFAULT ""' for name in HISTORY_FIELDNAMES)}
+);
+CREATE INDEX IF NOT EXISTS idx_history_action_category ON history (action, category);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_vocab_language_level_count ON vocab (language, level, review_count);
+CREATE INDEX IF NOT EXISTS idx_vocab_word_key ON vocab (word_key, language);
+CREATE INDEX IF NOT EXISTS idx_vocab_language_priority ON vocab (language, priority_base);
+"""
+
+# Cùng công thức với calculate_priority: priority = hôm nay + static_priority (0 nếu None)
+PRIORITY_SQL = "CASE WHEN priority_base IS NULL THEN 0 ELSE ? + priority_base END"
+
+
+def _levels(max_level):
+    return [str(level) for level in range(1, max_level + 1)]
+
+
+def _derived(row):
+    return normalize_word(row.get('word') or ''), static_priority(row)
+
+
+INSERT_SQL = (f"INSERT INTO vocab ({', '.join(FIELDNAMES)}, word_key, priority_base) "
+              f"VALUES ({', '.join('?' * (len(FIELDNAMES) + 2))})")
+
+
+def _insert_values(row):
+    values = {k: row.get(k) or '' for k in FIELDNAMES}
+    return [*values.values(), *_derived(values)]
+
+
+# === CLASS: Kho từ vựng trên SQLite ===
+# Cùng giao diện với VocabStore (vị trí là id của dòng), các truy vấn ôn tập, học từ mới,
+# tra từ và thống kê lịch sử được đẩy xuống SQL.
+class SqliteStore:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # server.py dùng kết nối từ các luồng khác nhau nhưng luôn tuần tự (khoá của kho)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        # idx_vocab_word cũ là chỉ mục trên hàm Python normalize_word: client không đăng ký hàm
+        # đó (ví dụ sqlite3) không ghi được vào bảng vocab
+        self.conn.execute("DROP INDEX IF EXISTS idx_vocab_word")
+        columns = {record[1] for record in self.conn.execute("PRAGMA table_info(vocab)")}
+        for name, type_ in DERIVED_COLUMNS:
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE vocab ADD COLUMN {name} {type_}")
+        self.conn.executescript(INDEXES)
+        self._fill_derived()
+
+    # Tính các cột word_key / priority_base còn thiếu
+    def _fill_derived(self):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE vocab SET word_key = ?, priority_base = ? WHERE id = ?",
+                [(*_derived(self._as_row(record)), record['id'])
+                 for record in self.conn.execute("SELECT * FROM vocab WHERE word_key IS NULL").fetchall()],
+            )
+
+    @staticmethod
+    def _as_row(record):
+        return {k: record[k] for k in FIELDNAMES}
+
+    def _select(self, where='1', params=(), order='id', limit=None):
+        sql = f"SELECT * FROM vocab WHERE {where} ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [self._as_row(record) for record in self.conn.execute(sql, params)]
+
+    def _filter_sql(self, language=None, max_level=None, category=None, last_result=None):
+        clauses, params = [], []
+        if language is not None:
+            clauses.append("language = ?")
+            params.append(language)
+        if max_level is not None:
+            levels = _levels(max_level)
+            clauses.append(f"level IN ({', '.join('?' * len(levels))})" if levels else "0")
+            params.extend(levels)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if last_result is not None:
+            clauses.append("last_result = ?")
+            params.append(last_result)
+        return ' AND '.join(clauses) or '1', params
+
+    # --- truy vấn ---
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM vocab").fetchone()[0]
+
+    def exists(self, word):
+        return self.conn.execute(
+            "SELECT 1 FROM vocab WHERE word_key = ? LIMIT 1", (normalize_word(word),)
+        ).fetchone() is not None
+
+    def positions_for_word(self, word, language=None):
+        sql = "SELECT id FROM vocab WHERE word_key = ?"
+        params = [normalize_word(word)]
+        if language is not None:
+            sql += " AND language = ?"
+            params.append(language)
+        return [record[0] for record in self.conn.execute(sql + " ORDER BY id", params)]
+
+    def row(self, pos):
+        record = self.conn.execute("SELECT * FROM vocab WHERE id = ?", (pos,)).fetchone()
+        return self._as_row(record) if record else None
+
+    def find(self, word, language=None):
+        positions = self.positions_for_word(word, language)
+        return self.row(positions[0]) if positions else None
+
+    def positions(self, **criteria):
+        where, params = self._filter_sql(**criteria)
+        return [record[0] for record in self.conn.execute(f"SELECT id FROM vocab WHERE {where} ORDER BY id", params)]
+
+    def filter(self, **criteria):
+        where, params = self._filter_sql(**criteria)
+        return self._select(where, params)
+
+    # Các từ có độ ưu tiên dương được lấy theo chỉ mục (language, priority_base); chỉ khi không
+    # đủ n từ như vậy mới sắp xếp cả phần còn lại (độ ưu tiên 0 hoặc âm)
+    def review_candidates(self, language=None, max_level=5, n=10):
+        where, params = self._filter_sql(language=language, max_level=max_level)
+        today = date.today().toordinal()
+        records = self.conn.execute(
+            f"SELECT *, ? + priority_base AS priority FROM vocab WHERE {where} AND priority_base > ? "
+            f"ORDER BY priority_base DESC, id LIMIT {int(n)}", [today] + params + [-today]).fetchall()
+        if len(records) < n:
+            records = self.conn.execute(
+                f"SELECT *, {PRIORITY_SQL} AS priority FROM vocab WHERE {where} "
+                f"ORDER BY priority DESC, id LIMIT {int(n)}", [today] + params).fetchall()
+        return [(record['priority'], self._as_row(record)) for record in records]
+
+    def unlearned(self, language, max_level):
+        where, params = self._filter_sql(language=language, max_level=max_level)
+        return self._select(f"{where} AND review_count = '0'", params)
+
+    # --- ghi dữ liệu ---
+    def update(self, pos, changes):
+        fields = [k for k in FIELDNAMES if k in changes]
+        if not fields:
+            return
+        values = [changes[k] for k in fields]
+        if 'word' in changes or any(k in changes for k in PRIORITY_FIELDS):
+            current = self.row(pos)
+            if current is not None:
+                fields += ['word_key', 'priority_base']
+                values += _derived({**current, **{k: changes[k] for k in FIELDNAMES if k in changes}})
+        self.conn.execute(
+            f"UPDATE vocab SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+            values + [pos],
+        )
+
+    def _insert(self, row):
+        cursor = self.conn.execute(INSERT_SQL, _insert_values(row))
+        return cursor.lastrowid
+
+    def persist(self, positions):
+        self.conn.commit()
+
+    def upsert(self, rows):
+        with self.conn:
+            for row in rows:
+                positions = [record[0] for record in self.conn.execute(
+                    "SELECT id FROM vocab WHERE word_key = ? AND word = ?",
+                    (normalize_word(row['word']), row['word']),
+                )]
+                if positions:
+                    for pos in positions:
+                        self.update(pos, row)
+                else:
+                    self._insert(row)
+
+    def add(self, row):
+        with self.conn:
+            self._insert(row)
+
+    # --- lịch sử ---
+    def log_history(self, entry):
+        with self.conn:
+            self.conn.execute(
+                f"INSERT INTO history ({', '.join(HISTORY_FIELDNAMES)}) VALUES (?, ?, ?, ?, ?)",
+                [entry.get(k, '') or '' for k in HISTORY_FIELDNAMES],
+            )
+
+    # Đếm theo nhóm, giữ thứ tự xuất hiện đầu tiên để most_common hoà giống Counter
+    def _history_counter(self, column, where='1', params=()):
+        sql = (f"SELECT {column}, COUNT(*) FROM history WHERE {where} "
+               f"GROUP BY {column} ORDER BY MIN(id)")
+        return Counter(dict(self.conn.execute(sql, params).fetchall()))
+
+    def top_categories(self, top_n=3):
+        return self._history_counter('category', "category != ''").most_common(top_n)
+
+    def history_report(self):
+        actions = self._history_counter('action')
+        return {
+            'total_actions': sum(actions.values()),
+            'learn_count': actions['learn'],
+            'correct_count': actions['correct'],
+            'wrong_count': actions['wrong'],
+            'lookup_count': actions['lookup'],
+            'category_counter': self._history_counter('category', "action = 'learn'"),
+            'wrong_category_counter': self._history_counter('category', "action = 'wrong'"),
+            'language_counter': self._history_counter('language'),
+        }
+
+    # --- chuyển đổi CSV ---
+    def import_csv(self, vocab_path, history_path=None):
+        with self.conn:
+            self.conn.execute("DELETE FROM vocab")
+            with open(vocab_path, newline='', encoding='utf-8') as f:
+                self.conn.executemany(INSERT_SQL, map(_insert_values, csv.DictReader(f)))
+            if history_path and os.path.exists(history_path):
+                from history_archive import get_history_archive
+                self.conn.execute("DELETE FROM history")
+                # Các tháng cũ đã được nén vào history.csv.archive (history_archive)
+                archived = get_history_archive(history_path).load().rows()
+                with open(history_path, newline='', encoding='utf-8') as f:
+                    self.conn.executemany(
+                        f"INSERT INTO history ({', '.join(HISTORY_FIELDNAMES)}) VALUES (?, ?, ?, ?, ?)",
+                        ([row.get(k) or '' for k in HISTORY_FIELDNAMES]
+                         for row in itertools.chain(archived, csv.DictReader(f))),
+                    )
+
+    def export_csv(self, vocab_path, history_path=None):
+        with get_lock(vocab_path).exclusive(), atomic_write(vocab_path, newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            for record in self.conn.execute("SELECT * FROM vocab ORDER BY id"):
+                writer.writerow(self._as_row(record))
+        if history_path:
+            from history_archive import get_history_archive
+            # history.csv được ghi lại đầy đủ nên bỏ phần lưu trữ cũ (tháng sau sẽ chuyển lại)
+            get_history_archive(history_path).clear()
+            with open(history_path, mode='w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=HISTORY_FIELDNAMES)
+                writer.writeheader()
+                for record in self.conn.execute("SELECT * FROM history ORDER BY id"):
+                    writer.writerow({k: record[k] for k in HISTORY_FIELDNAMES})
+
+
+_stores = {}
+
+
+# === FUNCTION: Lấy kho SQLite (mỗi file một kết nối) ===
+def get_sqlite_store(db_path):
+    store = _stores.get(db_path)
+    if store is None:
+        store = _stores[db_path] = SqliteStore(db_path)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chuyển dữ liệu giữa vocab.csv/history.csv và SQLite")
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('--db', default='vocab.db')
+    parser.add_argument('--vocab', default='vocab.csv')
+    parser.add_argument('--history', default='history.csv')
+    args = parser.parse_args()
+
+    store = get_sqlite_store(args.db)
+    if args.command == 'import':
+        store.import_csv(args.vocab, args.history)
+        print(f"✅ Đã nhập {len(store)} từ vào {args.db}")
+    else:
+        store.export_csv(args.vocab, args.history)
+        print(f"✅ Đã xuất {len(store)} từ ra {args.vocab}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import numpy as np
+
+from deck import _typecode
+from review_queue import parse_count, parse_day
+from vocab_store import parse_level
+
+NO_LEVEL = -1
+
+
+# Khung nhìn numpy (không chép) lên mảng mã của một cột Deck: array hoặc memoryview trên mmap
+def _view(codes):
+    return np.frombuffer(codes, dtype=np.dtype(_typecode(codes)))
+
+
+# Mặt nạ các dòng có giá trị cột mã hoá (language, is_mastered, ...) đúng bằng value
+def _equals(deck, field, value):
+    column = deck.columns[field]
+    code = column.lookup.get(value)
+    if code is None:
+        return np.zeros(len(deck), dtype=bool)
+    return _view(column.codes) == code
+
+
+# Cột số của Deck dưới dạng int64; trả về (giá trị, mặt nạ ô trống, mặt nạ giá trị bất thường).
+# Giá trị bất thường (giữ nguyên văn trong column.irregular) do hàm gọi tự xử lý.
+def _numbers(deck, field):
+    column = deck.columns[field]
+    _, empty, irregular, _, _ = column.spec
+    codes = _view(column.codes)
+    return codes.astype(np.int64), codes == empty, codes == irregular
+
+
+# === FUNCTION: Phần tĩnh của độ ưu tiên cho cả bộ từ (xem review_queue.static_priority) ===
+# Đọc thẳng các cột của Deck: last_review (số thứ tự ngày), review_count, is_mastered,
+# last_result. Trả về (static, active): static là mảng int64, active cho biết dòng có độ ưu
+# tiên khác 0 (chưa thuộc và có ngày ôn hợp lệ); priority = today + static với các dòng active.
+def static_priorities(deck):
+    days, no_day, irregular_day = _numbers(deck, 'last_review')
+    valid = ~(no_day | irregular_day)
+    for pos, value in deck.columns['last_review'].irregular.items():
+        day = parse_day(value)
+        if day is not None:
+            days[pos] = day
+            valid[pos] = True
+    counts, no_count, _ = _numbers(deck, 'review_count')
+    counts[no_count] = 0
+    for pos, value in deck.columns['review_count'].irregular.items():
+        counts[pos] = parse_count(value)
+    mastered = _equals(deck, 'is_mastered', 'True')
+    static = -days + (5 - counts) * 2 + 10 * _equals(deck, 'last_result', 'wrong')
+    active = valid & ~mastered
+    # Cùng cảnh báo như static_priority cho ngày sai định dạng
+    for pos, value in deck.columns['last_review'].irregular.items():
+        if not valid[pos] and value.strip() and not mastered[pos]:
+            print(f"⚠️ Lỗi định dạng ngày với từ: {deck.get(pos, 'word')}. Bỏ qua.")
+    return static, active
+
+
+# === FUNCTION: Cấp độ của từng dòng (NO_LEVEL nếu không phải số, như parse_level) ===
+def levels(deck):
+    values, no_level, irregular = _numbers(deck, 'level')
+    values[no_level | irregular] = NO_LEVEL
+    for pos, value in deck.columns['level'].irregular.items():
+        level = parse_level(value)
+        if level is not None:
+            values[pos] = level
+    return values
+
+
+# === FUNCTION: Độ ưu tiên của mọi dòng trong một lượt vector ===
+# Bằng đúng calculate_priority từng dòng: days_since + (5 - count) * 2 + 10 * wrong,
+# 0 nếu đã thuộc hoặc không có ngày ôn hợp lệ. today là số thứ tự ngày (date.toordinal).
+def score_all(deck, today):
+    static, active = static_priorities(deck)
+    return np.where(active, today + static, 0)
+
+
+# === FUNCTION: Mặt nạ các dòng được ôn: cấp độ hợp lệ <= max_level, đúng ngôn ngữ ===
+def review_mask(deck, language=None, max_level=5):
+    values = levels(deck)
+    mask = (values != NO_LEVEL) & (values <= max_level)
+    if language is not None:
+        mask &= _equals(deck, 'language', language)
+    return mask
+
+
+# === FUNCTION: Lấy chỉ số top N bằng argpartition ===
+# Thứ tự giống sorted(key=-priority) ổn định: điểm giảm dần, hoà thì vị trí tăng dần.
+def top_n_indices(scores, n, mask=None):
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+    if n <= 0 or len(candidates) == 0:
+        return candidates[:0]
+    values = scores[candidates]
+    if n < len(candidates):
+        threshold = values[np.argpartition(-values, n - 1)[:n]].min()
+        above = candidates[values > threshold]
+        ties = candidates[values == threshold][:n - len(above)]
+        candidates = np.concatenate([above, ties])
+        values = scores[candidates]
+    return candidates[np.lexsort((candidates, -values))]
+
+
+# === FUNCTION: Các nhóm của hàng đợi ôn tập (review_queue.ReviewQueue) dựng một lượt ===
+# Trả về (active, zero, entries) giống ReviewQueue.rebuild: active[(language, level)] là danh
+# sách (-static, pos) đã sắp xếp, zero[...] là các vị trí có độ ưu tiên 0, entries[pos] là
+# ((language, level), static hoặc None).
+def review_buckets(deck):
+    static, active_mask = static_priorities(deck)
+    level_values = levels(deck)
+    languages = deck.columns['language']
+    language_codes = _view(languages.codes).astype(np.int64)
+    positions = np.flatnonzero(level_values != NO_LEVEL)
+    # Sắp theo (ngôn ngữ, cấp độ, dòng có độ ưu tiên trước, -static, vị trí)
+    neg_static = np.where(active_mask, -static, 0)[positions]
+    order = np.lexsort((positions, neg_static, ~active_mask[positions],
+                        level_values[positions], language_codes[positions]))
+    positions = positions[order]
+    keys = np.stack([language_codes[positions], level_values[positions],
+                     active_mask[positions].astype(np.int64)])
+    bounds = np.flatnonzero(np.any(keys[:, 1:] != keys[:, :-1], axis=0)) + 1
+    active, zero, entries = {}, {}, {}
+    for start, end in zip([0, *bounds.tolist()], [*bounds.tolist(), len(positions)]):
+        if start == end:
+            continue
+        language, level, is_active = keys[:, start].tolist()
+        bucket = (languages.values[language], level)
+        group = positions[start:end].tolist()
+        if is_active:
+            negs = (-static[positions[start:end]]).tolist()
+            active[bucket] = list(zip(negs, group))
+            entries.update(zip(group, ((bucket, -neg) for neg in negs)))
+        else:
+            zero[bucket] = group
+            entries.update(dict.fromkeys(group, (bucket, None)))
+    return active, zero, entries
@@ -0,0 +1,536 @@
+import atexit
+import csv
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+import instrumentation
+import snapshot
+from deck import REVISION, Deck
+from file_lock import atomic_write, get_lock
+from instrumentation import timed
+from review_journal import ReviewJournal
+
+
+FIELDNAMES = ['word', 'meaning', 'phonetic', 'language', 'review_count', 'last_review',
+              'is_mastered', 'last_result', 'example', 'type', 'category', 'level']
+
+# Số dòng CSV đọc và chuyển sang dạng cột mỗi lượt
+READ_CHUNK_ROWS = 4096
+
+# Nén nhật ký vào vocab.csv (chạy nền) khi nhật ký vượt quá kích thước này
+COMPACT_JOURNAL_BYTES = 4 * 1024 * 1024
+# Ghi một lượt nhiều dòng hơn thế này (nhập hàng loạt) thì ghi lại cả vocab.csv thay cho
+# từng bản ghi nhật ký
+JOURNAL_MAX_BATCH = 10_000
+
+# Mỗi dòng trong bộ nhớ mang số phiên bản REVISION (không ghi ra file). Bản sao dict(row) mà
+# hàm gọi sửa rồi ghi lại vẫn giữ số này, nên kho biết bản sao được đọc từ phiên bản nào của dòng.
+# Số phiên bản cũ giữ lại cho mỗi dòng để gộp các bản sao đọc trước khi dòng thay đổi
+MAX_SUPERSEDED = 16
+
+
+def normalize_word(word):
+    return word.strip().lower()
+
+
+def parse_level(value):
+    value = (value or '').strip()
+    return int(value) if value.isdigit() else None
+
+
+# === FUNCTION: Bản sao dict của một dòng để trả ra ngoài (hiển thị, JSON) ===
+# Bỏ số phiên bản REVISION: chỉ các bản sao sẽ được sửa rồi ghi lại mới cần giữ nó.
+def public_row(row):
+    return {key: value for key, value in row.items() if key != REVISION}
+
+
+def _word_key(word):
+    return zlib.crc32(normalize_word(word).encode('utf-8'))
+
+
+# === CLASS: Chỉ mục theo từ (viết thường) ===
+# Phần chính là mảng đã sắp xếp các số crc32(từ) << 32 | vị trí, dựng một lần khi đọc CSV và
+# lưu cùng ảnh chụp nên không phải dựng lại khi khởi động; dòng thêm/đổi từ sau đó vào dict phụ.
+# Vị trí tìm được luôn được so lại với từ hiện tại của dòng (xem VocabStore._word_positions),
+# nên mục cũ trong mảng (dòng đã đổi từ) hay trùng crc32 tự bị bỏ qua.
+class WordIndex:
+    def __init__(self, keys=None):
+        self.keys = keys if keys is not None else array('Q')
+        self.extra = {}
+
+    @classmethod
+    def build(cls, words):
+        return cls(array('Q', sorted((_word_key(word) << 32) | pos for pos, word in enumerate(words))))
+
+    def _base(self, key):
+        keys = self.keys
+        i = bisect_left(keys, key << 32)
+        end = (key + 1) << 32
+        positions = []
+        while i < len(keys) and keys[i] < end:
+            positions.append(keys[i] & 0xFFFFFFFF)
+            i += 1
+        return positions
+
+    def candidates(self, word):
+        return self._base(_word_key(word)) + self.extra.get(normalize_word(word), [])
+
+    def add(self, pos, word):
+        if pos not in self._base(_word_key(word)):
+            self.extra.setdefault(normalize_word(word), []).append(pos)
+
+    def remove(self, pos, word):
+        key = normalize_word(word)
+        bucket = self.extra.get(key)
+        if bucket and pos in bucket:
+            bucket.remove(pos)
+            if not bucket:
+                del self.extra[key]
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# === FUNCTION: Gộp ba chiều một dòng ===
+# base: dòng trước khi tiến trình này sửa, ours: dòng sau khi sửa, theirs: dòng hiện có trên đĩa.
+# Cột không bị sửa giữ giá trị trên đĩa; review_count cộng dồn số lần ôn của cả hai bên.
+def merge_rows(base, ours, theirs):
+    merged = dict(theirs)
+    for field in FIELDNAMES:
+        mine = ours.get(field, '')
+        if mine == base.get(field, ''):
+            continue
+        values = (base.get(field, ''), mine, theirs.get(field, ''))
+        if field == 'review_count' and values[2] != values[0] and all(v.isdigit() for v in values):
+            merged[field] = str(int(values[2]) + int(mine) - int(values[0]))
+        else:
+            merged[field] = mine
+    return merged
+
+
+# === CLASS: Kho từ vựng trong bộ nhớ ===
+# Đọc vocab.csv một lần, giữ các dòng trong bộ nhớ dạng cột (deck.Deck) cùng chỉ mục theo từ
+# (viết thường); lọc theo ngôn ngữ, cấp độ, chủ đề dùng mặt nạ trên các cột mã hoá.
+# File chỉ được đọc lại khi bị thay đổi từ bên ngoài. Bản đã phân tích được lưu thành ảnh chụp
+# nhị phân vocab.csv.snapshot (snapshot.py) để lần khởi động sau không phải đọc lại CSV.
+# Thay đổi được ghi vào nhật ký (review_journal) và chỉ nén vào vocab.csv khi nhật ký
+# đủ lớn (chạy nền) hoặc khi thoát chương trình.
+# Nhiều tiến trình có thể dùng chung một file: mọi lần ghi giữ khoá vocab.csv.lock và kiểm tra
+# phiên bản trên đĩa trước; nếu tiến trình khác đã ghi thì tải lại và gộp các dòng đang sửa
+# (merge_rows) thay vì ghi đè lên.
+class VocabStore:
+    def __init__(self, file_path, use_journal=True, use_snapshot=True):
+        self.file_path = file_path
+        self.journal = ReviewJournal(file_path) if use_journal else None
+        self.snapshot_path = file_path + snapshot.SNAPSHOT_SUFFIX if use_snapshot else None
+        self.lock = get_lock(file_path)
+        self.rows = Deck(FIELDNAMES)
+        self._words = WordIndex()
+        self._version = None
+        # Dòng (theo vị trí) đã sửa nhưng chưa ghi -> bản gốc trước khi sửa (None: dòng mới)
+        self._pending = {}
+        self._revision = 0
+        # Vị trí -> {số phiên bản: dòng cũ}
+        self._superseded = {}
+        self._listeners = []
+        self._compactor = None
+        self.load()
+
+    # Phiên bản trên đĩa: vocab.csv cùng nhật ký (kể cả nhật ký đang nén)
+    def _disk_version(self):
+        version = [_file_signature(self.file_path)]
+        if self.journal is not None:
+            version += [_file_signature(self.journal.path),
+                        _file_signature(self.journal.compacting_path)]
+        return tuple(version)
+
+    def is_stale(self):
+        return self._disk_version() != self._version
+
+    @timed()
+    def load(self):
+        old_rows = self.rows
+        with self.lock.shared():
+            self.rows = Deck(FIELDNAMES)
+            self._words = WordIndex()
+            self._pending = {}
+            if os.path.exists(self.file_path):
+                self._read_rows()
+            if self.journal is not None:
+                # File nhật ký có thể đã bị tiến trình khác đổi tên khi nén
+                self.journal.close()
+                records = self.journal.replay()
+                for record in records:
+                    self._apply_record(record)
+                instrumentation.count('journal_records_replayed', len(records))
+            self._version = self._disk_version()
+        self._carry_revisions(old_rows)
+        self._notify(None)
+
+    # Đọc từ ảnh chụp nếu còn khớp với vocab.csv, nếu không thì đọc CSV rồi ghi ảnh chụp mới
+    def _read_rows(self):
+        signature = snapshot.csv_signature(self.file_path) if self.snapshot_path else None
+        if signature is not None:
+            loaded = snapshot.read(self.snapshot_path, signature, FIELDNAMES, self._revision + 1)
+            if loaded is not None:
+                self.rows, keys = loaded
+                self._words = WordIndex(keys)
+                self._revision += len(self.rows)
+                return
+        with open(self.file_path, newline='', encoding='utf-8') as f:
+            self._read_csv(f)
+        instrumentation.count('file_opens')
+        instrumentation.count('rows_parsed', len(self.rows))
+        if signature is not None:
+            snapshot.write(self.snapshot_path, signature, self.rows, self._words.keys)
+
+    # Đọc CSV theo tiêu đề (cột thiếu để trống) thẳng vào các cột của Deck, từng khối dòng
+    def _read_csv(self, f):
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        columns = {name: i for i, name in enumerate(header)}
+        picks = [columns.get(field) for field in FIELDNAMES]
+        width = len(header)
+        keys = []
+        while True:
+            chunk = list(islice(reader, READ_CHUNK_ROWS))
+            if not chunk:
+                break
+            records = []
+            for values in chunk:
+                if not values:
+                    continue
+                if len(values) < width:
+                    values = values + [''] * (width - len(values))
+                records.append([values[i] if i is not None else '' for i in picks])
+            start = len(self.rows)
+            self.rows.extend(records, range(self._revision + 1, self._revision + 1 + len(records)))
+            self._revision += len(records)
+            keys.extend((_word_key(record[0]) << 32) | pos for pos, record in enumerate(records, start))
+        keys.sort()
+        self._words = WordIndex(array('Q', keys))
+
+    # Dòng không đổi sau khi tải lại giữ số phiên bản cũ; dòng đã đổi lấy số mới
+    # và bản cũ được giữ lại cho update()
+    def _carry_revisions(self, old_rows):
+        superseded = {}
+        for pos in range(min(len(self.rows), len(old_rows))):
+            if self.rows.get(pos, 'word') != old_rows.get(pos, 'word'):
+                continue
+            history = self._superseded.get(pos, {})
+            if self.rows.same(pos, old_rows, pos):
+                self.rows.set(pos, REVISION, old_rows.get(pos, REVISION))
+            else:
+                history = self._with_superseded(history, old_rows.to_dict(pos))
+            if history:
+                superseded[pos] = history
+        self._superseded = superseded
+
+    def _stamp(self, row):
+        self._revision += 1
+        row[REVISION] = self._revision
+
+    @staticmethod
+    def _with_superseded(history, old):
+        history = dict(history)
+        history[old[REVISION]] = old
+        while len(history) > MAX_SUPERSEDED:
+            del history[next(iter(history))]
+        return history
+
+    # Thay dòng ở vị trí pos (chỉ mục, phiên bản, listener)
+    def _replace(self, pos, row):
+        old = self.rows.to_dict(pos)
+        self._unindex(pos)
+        self._stamp(row)
+        self.rows[pos] = row
+        self._superseded[pos] = self._with_superseded(self._superseded.get(pos, {}), old)
+        self._index(pos)
+        self._notify(pos)
+
+    # Tìm lại vị trí của một dòng sau khi tải lại (vị trí cũ nếu còn khớp, không thì theo từ)
+    def _locate(self, pos, word, language):
+        if pos is not None and pos < len(self.rows) and self.rows[pos]['word'] == word:
+            return pos
+        matches = [p for p in self.positions_for_word(word, language) if self.rows[p]['word'] == word]
+        return matches[0] if matches else None
+
+    # Tiến trình khác đã ghi: tải lại từ đĩa rồi áp dụng lại các dòng đang sửa bằng merge_rows.
+    # Trả về {vị trí cũ: vị trí mới}.
+    def _rebase(self):
+        pending = [(pos, self.rows.to_dict(pos), base) for pos, base in self._pending.items()]
+        self.load()
+        moved = {}
+        for old_pos, ours, base in pending:
+            pos = None if base is None else self._locate(old_pos, base['word'], base['language'])
+            if pos is None:
+                pos = self._append(dict(ours))
+            else:
+                self._replace(pos, merge_rows(base, ours, self.rows[pos]))
+            self._pending[pos] = base
+            moved[old_pos] = pos
+        return moved
+
+    # Áp dụng lại một bản ghi nhật ký; nếu vị trí không còn khớp (CSV bị sửa từ bên ngoài)
+    # thì tìm theo từ và ngôn ngữ, không có thì thêm mới
+    def _apply_record(self, record):
+        row = {k: record['row'].get(k, '') for k in FIELDNAMES}
+        pos = self._locate(record.get('pos'), row['word'], row['language'])
+        if pos is None:
+            self._append(row, notify=False)
+        else:
+            self._unindex(pos)
+            self._stamp(row)
+            self.rows[pos] = row
+            self._index(pos)
+
+    # --- theo dõi thay đổi ---
+    # listener(pos) được gọi sau khi một dòng thay đổi; listener(None) khi tải lại toàn bộ
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _notify(self, pos):
+        for listener in self._listeners:
+            listener(pos)
+
+    # --- chỉ mục ---
+    def _append(self, row, notify=True):
+        pos = len(self.rows)
+        self._stamp(row)
+        self.rows.append(row)
+        self._index(pos)
+        if notify:
+            self._notify(pos)
+        return pos
+
+    def _index(self, pos):
+        self._words.add(pos, self.rows.get(pos, 'word'))
+
+    def _unindex(self, pos):
+        self._words.remove(pos, self.rows.get(pos, 'word'))
+
+    # Vị trí (tăng dần) các dòng có từ viết thường trùng với word
+    def _word_positions(self, word):
+        key = normalize_word(word)
+        return sorted({pos for pos in self._words.candidates(word)
+                       if normalize_word(self.rows.get(pos, 'word')) == key})
+
+    # --- truy vấn ---
+    def __len__(self):
+        return len(self.rows)
+
+    def exists(self, word):
+        return bool(self._word_positions(word))
+
+    def positions_for_word(self, word, language=None):
+        positions = self._word_positions(word)
+        if language is None:
+            return positions
+        return [pos for pos in positions if self.rows.get(pos, 'language') == language]
+
+    def row(self, pos):
+        return self.rows[pos]
+
+    def find(self, word, language=None):
+        positions = self.positions_for_word(word, language)
+        return self.rows[positions[0]] if positions else None
+
+    def positions(self, language=None, max_level=None, category=None, last_result=None):
+        return self.rows.select(self._masks(language, max_level, category, last_result))
+
+    def _masks(self, language=None, max_level=None, category=None, last_result=None):
+        masks = []
+        for field, value in (('language', language), ('category', category),
+                             ('last_result', last_result)):
+            if value is not None:
+                masks.append(self.rows.mask(field, lambda v, value=value: v == value))
+        if max_level is not None:
+            def accept(value):
+                level = parse_level(value)
+                return level is not None and level <= max_level
+            masks.append(self.rows.mask('level', accept))
+        return masks
+
+    def filter(self, **criteria):
+        return [self.rows[pos] for pos in self.positions(**criteria)]
+
+    # Trả về [(priority, row)] các từ cần ôn nhất, xem review_queue.ReviewQueue
+    def review_candidates(self, language=None, max_level=5, n=10):
+        from review_queue import get_review_queue
+        return [(priority, self.rows[pos])
+                for priority, pos in get_review_queue(self).top(language, max_level, n)]
+
+    def unlearned(self, language, max_level):
+        masks = self._masks(language, max_level)
+        masks.append(self.rows.mask('review_count', lambda v: v == '0'))
+        return [self.rows[pos] for pos in self.rows.select(masks)]
+
+    # --- ghi dữ liệu ---
+    def update(self, pos, changes):
+        current = self.rows.to_dict(pos)
+        base = self._superseded.get(pos, {}).get(changes.get(REVISION))
+        if base is not None:
+            # Bản sao được đọc trước khi dòng thay đổi (tải lại hoặc sửa khác): chỉ áp dụng
+            # phần mà hàm gọi đã sửa
+            changes = merge_rows(base, changes, current)
+        if pos not in self._pending:
+            self._pending[pos] = {k: current[k] for k in FIELDNAMES}
+        row = current
+        row.update({k: v for k, v in changes.items() if k in FIELDNAMES})
+        self._replace(pos, row)
+
+    def upsert(self, rows):
+        # Gộp theo đúng giá trị cột 'word' như save_vocab_list trước đây
+        changed = []
+        for row in rows:
+            positions = [pos for pos in self._word_positions(row['word'])
+                         if self.rows.get(pos, 'word') == row['word']]
+            if positions:
+                for pos in positions:
+                    self.update(pos, row)
+                changed.extend(positions)
+            else:
+                changed.append(self._add_pending(row))
+        self.persist(changed)
+
+    def add(self, row):
+        self.persist([self._add_pending(row)])
+
+    def _add_pending(self, row):
+        pos = self._append({k: row.get(k, '') for k in FIELDNAMES})
+        self._pending[pos] = None
+        return pos
+
+    # Thêm nhiều dòng mới một lượt (nhập hàng loạt) qua Deck.extend, chưa ghi xuống đĩa:
+    # trả về vị trí các dòng để truyền cho persist() cùng các dòng đã update()
+    def add_pending(self, rows):
+        start = len(self.rows)
+        records = [[row.get(k, '') for k in FIELDNAMES] for row in rows]
+        self.rows.extend(records, range(self._revision + 1, self._revision + 1 + len(records)))
+        self._revision += len(records)
+        positions = list(range(start, len(self.rows)))
+        for pos in positions:
+            self._index(pos)
+            self._pending[pos] = None
+            self._notify(pos)
+        return positions
+
+    # Ghi các dòng đã thay đổi: vào nhật ký nếu có, nếu không thì ghi lại toàn bộ file
+    @timed()
+    def persist(self, positions):
+        if not positions:
+            return
+        with self.lock.exclusive():
+            if self.is_stale():
+                moved = self._rebase()
+                positions = sorted({moved.get(pos, pos) for pos in positions})
+            if self.journal is None:
+                self._write_csv(self.rows)
+            elif len(positions) > JOURNAL_MAX_BATCH:
+                # Các dòng trong bộ nhớ đã gồm mọi bản ghi nhật ký (vừa rebase nếu cần)
+                self.journal.begin_compaction()
+                self._write_csv(self.rows)
+                self.journal.end_compaction()
+            else:
+                self.journal.append([
+                    {'pos': pos, 'row': dict(zip(FIELDNAMES, self.rows.record(pos)))}
+                    for pos in positions
+                ])
+            for pos in positions:
+                self._pending.pop(pos, None)
+            self._version = self._disk_version()
+        if self.journal is not None and self.journal.size() >= COMPACT_JOURNAL_BYTES:
+            self.compact(background=True)
+
+    @timed()
+    def _write_csv(self, deck):
+        # Ghi ra file tạm rồi thay thế, để file cũ còn nguyên nếu bị crash giữa chừng
+        with atomic_write(self.file_path, newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDNAMES)
+            writer.writerows(deck.records())
+        instrumentation.count('file_opens')
+        if self.snapshot_path:
+            words = WordIndex.build(deck.get(pos, 'word') for pos in range(len(deck)))
+            snapshot.write(self.snapshot_path, snapshot.csv_signature(self.file_path), deck, words.keys)
+        if instrumentation.enabled:
+            instrumentation.count('bytes_written', os.path.getsize(self.file_path))
+
+    def save(self):
+        with self.lock.exclusive():
+            if self.is_stale():
+                self._rebase()
+            self._write_csv(self.rows)
+            self._pending = {}
+            self._version = self._disk_version()
+
+    # Nén nhật ký vào vocab.csv. Chạy nền thì ghi từ bản chụp các dòng hiện tại,
+    # các thay đổi sau đó tiếp tục vào nhật ký mới.
+    def compact(self, background=False):
+        if self.journal is None:
+            return
+        self.wait_for_compaction()
+        with self.lock.exclusive():
+            if self.is_stale():
+                self._rebase()
+            if not self.journal.size() and not os.path.exists(self.journal.compacting_path):
+                self.journal.close()
+                return
+            frozen = self.rows.copy()
+            self.journal.begin_compaction()
+            self._version = self._disk_version()
+            compacting = _file_signature(self.journal.compacting_path)
+
+        def run():
+            with self.lock.exclusive():
+                # Tiến trình khác đã gộp thêm vào nhật ký đang nén: bản chụp không còn đủ,
+                # để lại cho lần nén sau
+                if _file_signature(self.journal.compacting_path) != compacting:
+                    return
+                stale = self.is_stale()
+                self._write_csv(frozen)
+                self.journal.end_compaction()
+                if not stale:
+                    self._version = self._disk_version()
+
+        if background:
+            self._compactor = threading.Thread(target=run, daemon=True)
+            self._compactor.start()
+        else:
+            run()
+
+    def wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+
+_stores = {}
+
+
+# === FUNCTION: Lấy kho từ vựng (tải lại nếu file đã thay đổi) ===
+def get_store(file_path):
+    store = _stores.get(file_path)
+    if store is None:
+        store = _stores[file_path] = VocabStore(file_path)
+    elif store.is_stale():
+        store.wait_for_compaction()
+        if store.is_stale():
+            store.load()
+    return store
+
+
+# === FUNCTION: Nén nhật ký của mọi kho từ vựng khi thoát ===
+@atexit.register
+def compact_stores():
+    for store in _stores.values():
+        store.compact()
@@ -0,0 +1,380 @@
+import argparse
+import atexit
+import zlib
+from array import array
+from bisect import bisect_left, insort
+from itertools import accumulate
+
+import snapshot
+from vocab_store import get_store, normalize_word
+
+SEARCH_SUFFIX = '.words'
+MAGIC = b'VOCABWRD'
+FORMAT_VERSION = 1
+
+# Chỉ tìm gần đúng với từ từ 3 ký tự: từ ngắn hơn sai một ký tự là ra cả trăm từ khác
+MIN_FUZZY_LENGTH = 3
+# Số lỗi gõ tối đa (thêm/thiếu/sai một ký tự, đảo hai ký tự liền nhau) của một gợi ý
+MAX_TYPOS = 2
+# Số vị trí tối đa duyệt cho mỗi tiền tố / mỗi biến thể xoá ký tự: thời gian truy vấn
+# không tăng theo kích thước bộ từ
+SCAN_LIMIT = 256
+# Số dòng thêm/sửa sau khi dựng vượt tỉ lệ này thì dựng lại toàn bộ
+REBUILD_RATIO = 0.2
+
+
+# === FUNCTION: Từ và các biến thể bỏ đi một ký tự ===
+# Hai từ cách nhau một lỗi gõ luôn có chung ít nhất một biến thể (kiểu SymSpell)
+def deletion_variants(word):
+    variants = {word}
+    if len(word) >= MIN_FUZZY_LENGTH:
+        variants.update(word[:i] + word[i + 1:] for i in range(len(word)))
+    return variants
+
+
+def _variant_key(variant):
+    return zlib.crc32(variant.encode('utf-8'))
+
+
+# === FUNCTION: Khoảng cách Damerau-Levenshtein (đảo hai ký tự liền nhau tính là một lỗi) ===
+# Trả về limit + 1 khi chắc chắn vượt limit
+def typo_distance(a, b, limit=MAX_TYPOS):
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+# Hai từ khác nhau có cách nhau đúng một lỗi gõ không (nhanh hơn typo_distance)
+def _one_typo(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 1:i + 2] == b[i:i + 1] and a[i:i + 1] == b[i + 1:i + 2]
+                                      and a[i + 2:] == b[i + 2:])
+
+
+# Số ô băm: luỹ thừa của 2, khoảng hai biến thể mỗi ô
+def _bucket_count(variants):
+    return 1 << max(12, (variants // 2).bit_length())
+
+
+# === CLASS: Chỉ mục tra từ: chính xác, theo tiền tố và gần đúng (lỗi gõ) ===
+# Phần gốc, dựng một lần và lưu ở vocab.csv.words (đọc qua mmap, xem snapshot.read_file):
+# - words/starts: các từ đã chuẩn hoá, sắp theo thứ tự từ điển và nối liền dạng UTF-8 (từ
+#   thứ i là words[starts[i]:starts[i + 1]]); order[i] là vị trí dòng của từ đó, rank là
+#   ánh xạ ngược. Tiền tố = một đoạn liên tiếp, tìm bằng chia đôi (thay cho cây trie).
+# - offsets/postings: biến thể xoá một ký tự của mọi từ được băm (crc32) vào ô; vị trí các
+#   từ có biến thể thuộc ô b nằm trong postings[offsets[b]:offsets[b + 1]].
+# Từ thêm/đổi sau đó (listener của kho) được đưa vào phần delta. Kết quả luôn được so lại
+# với từ hiện tại của dòng nên mục cũ trong phần gốc hay trùng crc32 tự bị bỏ qua.
+class WordSearch:
+    def __init__(self, store):
+        self.store = store
+        self.path = store.file_path + SEARCH_SUFFIX
+        self.dirty = False
+        self._checked = False
+        if not self.load():
+            self.build()
+        self._check()
+        store.add_listener(self._on_change)
+
+    # --- dựng / đọc / ghi ---
+    def build(self):
+        rows = self.store.rows
+        normalized = [normalize_word(rows.get(pos, 'word')) for pos in range(len(rows))]
+        order = array('I', sorted(range(len(normalized)), key=normalized.__getitem__))
+        rank = array('I', bytes(4 * len(order)))
+        for i, pos in enumerate(order):
+            rank[pos] = i
+        encoded = [normalized[pos].encode('utf-8') for pos in order]
+        starts = array('I', accumulate(map(len, encoded), initial=0))
+        words = b''.join(encoded)
+        del encoded
+
+        # Đếm số biến thể mỗi ô rồi đặt vị trí vào đúng chỗ (sắp xếp đếm, không cần sort)
+        keys, owners = array('I'), array('I')
+        for pos, word in enumerate(normalized):
+            for variant in deletion_variants(word):
+                keys.append(_variant_key(variant))
+                owners.append(pos)
+        del normalized
+        mask = _bucket_count(len(keys)) - 1
+        counts = array('I', bytes(4 * (mask + 1)))
+        for key in keys:
+            counts[key & mask] += 1
+        offsets = array('I', accumulate(counts, initial=0))
+        del counts
+        fill = array('I', offsets)
+        postings = array('I', bytes(4 * len(keys)))
+        for key, pos in zip(keys, owners):
+            bucket = key & mask
+            postings[fill[bucket]] = pos
+            fill[bucket] += 1
+        del keys, owners, fill
+
+        self.mask = mask
+        self.count = len(order)
+        self.words, self.starts, self.order, self.rank = words, starts, order, rank
+        self.offsets, self.postings = offsets, postings
+        self._reset_delta()
+        crc, sizes = rows.digest(('word',))
+        self._saved = (len(rows), sizes, crc, [])
+        self._checked = True
+        self.dirty = True
+        self.save()
+
+    def _reset_delta(self):
+        # Vị trí -> từ đã chuẩn hoá của các dòng thêm/đổi từ sau khi dựng, các cặp (từ, vị trí)
+        # đó đã sắp xếp (cho tìm theo tiền tố), biến thể xoá một ký tự -> vị trí
+        self.extra = {}
+        self.extra_words = []
+        self.extra_variants = {}
+
+    def save(self):
+        if not self.dirty or not self._checked:
+            return
+        rows = self.store.rows
+        crc, sizes = rows.digest(('word',))
+
+        def dump(out):
+            out.number(self.count)
+            out.array(array('Q', sizes))
+            out.bytes(self.words)
+            for values in (self.starts, self.order, self.rank, self.offsets, self.postings):
+                out.array(values)
+            out.array(array('I', sorted(self.extra)))
+
+        # Chữ ký: (0, số dòng, Deck.digest của cột từ) của deck mà chỉ mục phản ánh
+        if snapshot.write_file(self.path, MAGIC, FORMAT_VERSION, (0, len(rows), crc), dump):
+            self.dirty = False
+
+    def load(self):
+        def read(src, signature):
+            count = src.number()
+            sizes = src.array()
+            words = src.bytes()
+            arrays = [src.array() for _ in range(5)]
+            extra = src.array()
+            starts, order, rank, offsets, _ = arrays
+            if not (len(starts) == count + 1 == len(order) + 1 == len(rank) + 1) or len(offsets) < 2:
+                return None
+            return signature, count, list(sizes), words, arrays, extra
+
+        loaded = snapshot.read_file(self.path, MAGIC, FORMAT_VERSION, read)
+        if loaded is None:
+            return False
+        (_, rows, crc), self.count, sizes, self.words, arrays, extra = loaded
+        self.starts, self.order, self.rank, self.offsets, self.postings = arrays
+        self.mask = len(self.offsets) - 2
+        self._reset_delta()
+        self._saved = (rows, sizes, crc, list(extra))
+        self._checked = False
+        return True
+
+    # Đối chiếu với deck hiện tại: các dòng đã có lúc lưu còn nguyên (digest cột từ khớp) thì
+    # chỉ cần đưa các dòng đã đổi lúc lưu và các dòng mới vào delta; nếu không thì so từng dòng
+    # với từ chỉ mục đang giữ (hoặc dựng lại nếu quá nhiều dòng đã đổi)
+    def _check(self):
+        if self._checked:
+            return
+        rows = self.store.rows
+        saved, sizes, crc, extra = self._saved
+        if saved <= len(rows) and rows.digest(('word',), saved, sizes) == (crc, sizes):
+            self._reset_delta()
+            changed = list(extra) + list(range(saved, len(rows)))
+        else:
+            for pos in [pos for pos in self.extra if pos >= len(rows)]:
+                self._unindex(pos)
+            changed = [pos for pos in range(len(rows)) if self._current(pos) != self._indexed(pos)]
+        if len(changed) + len(self.extra) > REBUILD_RATIO * len(rows):
+            self.build()
+            return
+        for pos in changed:
+            self._reindex(pos)
+        crc, sizes = rows.digest(('word',))
+        self._saved = (len(rows), sizes, crc, list(self.extra))
+        self._checked = True
+        self.dirty = self.dirty or bool(changed)
+
+    # --- cập nhật tăng dần ---
+    def _on_change(self, pos):
+        if pos is None:
+            # Kho được tải lại: đối chiếu lại ở lần truy vấn sau
+            self._checked = False
+        elif self._checked and self._current(pos) != self._indexed(pos):
+            self._reindex(pos)
+            self.dirty = True
+
+    def _current(self, pos):
+        return normalize_word(self.store.rows.get(pos, 'word'))
+
+    def _base_word(self, i):
+        return str(self.words[self.starts[i]:self.starts[i + 1]], 'utf-8')
+
+    # Từ mà chỉ mục đang giữ cho dòng pos (None nếu chưa có)
+    def _indexed(self, pos):
+        if pos in self.extra:
+            return self.extra[pos]
+        return self._base_word(self.rank[pos]) if pos < self.count else None
+
+    def _unindex(self, pos):
+        old = self.extra.pop(pos, None)
+        if old is None:
+            return
+        self.extra_words.remove((old, pos))
+        for variant in deletion_variants(old):
+            bucket = self.extra_variants[variant]
+            bucket.discard(pos)
+            if not bucket:
+                del self.extra_variants[variant]
+
+    def _reindex(self, pos):
+        self._unindex(pos)
+        word = self._current(pos)
+        self.extra[pos] = word
+        insort(self.extra_words, (word, pos))
+        for variant in deletion_variants(word):
+            self.extra_variants.setdefault(variant, set()).add(pos)
+
+    # --- truy vấn ---
+    def _lower_bound(self, prefix):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._base_word(mid) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _accept(self, pos, language):
+        return pos < len(self.store.rows) and (language is None or self.store.rows.get(pos, 'language') == language)
+
+    # Gợi ý hoàn thành từ: [(từ, vị trí)] của các từ bắt đầu bằng prefix, từ ngắn trước
+    def complete(self, prefix, k=5, language=None):
+        self._check()
+        prefix = normalize_word(prefix)
+        if not prefix:
+            return []
+        found = {}
+        i = self._lower_bound(prefix)
+        end = min(self.count, i + SCAN_LIMIT)
+        while i < end:
+            word = self._base_word(i)
+            if not word.startswith(prefix):
+                break
+            pos = self.order[i]
+            if pos not in self.extra and self._accept(pos, language):
+                found.setdefault(word, pos)
+            i += 1
+        i = bisect_left(self.extra_words, (prefix,))
+        end = min(len(self.extra_words), i + SCAN_LIMIT)
+        while i < end and self.extra_words[i][0].startswith(prefix):
+            word, pos = self.extra_words[i]
+            if self._accept(pos, language):
+                found[word] = min(pos, found.get(word, pos))
+            i += 1
+        return sorted(((word, pos) for word, pos in found.items()), key=lambda item: (len(item[0]), item[0]))[:k]
+
+    # Từ gần đúng: [(số lỗi gõ, từ, vị trí)] với 0 < số lỗi <= max_typos, ít lỗi trước; cùng số
+    # lỗi thì ưu tiên từ cùng chữ cái đầu và dài gần bằng từ đã nhập. Chỉ tính khoảng cách đầy
+    # đủ (typo_distance) khi chưa đủ k từ sai một lỗi gõ.
+    def similar(self, query, k=5, language=None, max_typos=MAX_TYPOS):
+        self._check()
+        query = normalize_word(query)
+        if len(query) < MIN_FUZZY_LENGTH:
+            return []
+        candidates = set()
+        for variant in deletion_variants(query):
+            bucket = _variant_key(variant) & self.mask
+            start = self.offsets[bucket]
+            candidates.update(self.postings[start:min(self.offsets[bucket + 1], start + SCAN_LIMIT)])
+            candidates.update(self.extra_variants.get(variant, ()))
+        found, rest = {}, []
+        for pos in sorted(candidates):
+            word = self._current(pos)
+            if word == query or word in found or not self._accept(pos, language):
+                continue
+            if _one_typo(query, word):
+                found[word] = (1, pos)
+            else:
+                rest.append((word, pos))
+        if len(found) < k and max_typos > 1:
+            for word, pos in rest:
+                distance = typo_distance(query, word, max_typos)
+                if distance <= max_typos and word not in found:
+                    found[word] = (distance, pos)
+        ranked = sorted((distance, word[0] != query[0], abs(len(word) - len(query)), word, pos)
+                        for word, (distance, pos) in found.items())
+        return [(distance, word, pos) for distance, _, _, word, pos in ranked[:k]]
+
+    # Gợi ý khi tra không thấy: [(từ, vị trí)], xếp theo: sai một lỗi gõ, bắt đầu bằng
+    # từ đã nhập, sai hai lỗi gõ
+    def suggest(self, query, k=5, language=None):
+        typos = self.similar(query, k, language)
+        ranked = [(word, pos) for distance, word, pos in typos if distance == 1]
+        ranked += [item for item in self.complete(query, k, language) if item[0] != normalize_word(query)]
+        ranked += [(word, pos) for distance, word, pos in typos if distance > 1]
+        seen = set()
+        return [item for item in ranked if not (item[0] in seen or seen.add(item[0]))][:k]
+
+
+_indexes = {}
+
+
+# === FUNCTION: Lấy chỉ mục tra từ gắn với kho từ vựng ===
+def get_word_search(store):
+    index = _indexes.get(id(store))
+    if index is None or index.store is not store:
+        index = _indexes[id(store)] = WordSearch(store)
+    return index
+
+
+@atexit.register
+def save_indexes():
+    for index in _indexes.values():
+        index.save()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tra từ theo tiền tố hoặc gần đúng trong vocab.csv")
+    parser.add_argument('query', nargs='?', help="Từ cần tra (bỏ trống để chỉ dựng chỉ mục)")
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--language')
+    parser.add_argument('--prefix', action='store_true', help="Chỉ gợi ý hoàn thành từ")
+    parser.add_argument('--rebuild', action='store_true', help="Dựng lại chỉ mục từ đầu")
+    parser.add_argument('--file', default='vocab.csv')
+    args = parser.parse_args()
+
+    vocab = get_store(args.file)
+    index = get_word_search(vocab)
+    if args.rebuild:
+        index.build()
+    if args.query:
+        matches = index.complete(args.query, args.k, args.language) if args.prefix \
+            else [(word, pos) for _, word, pos in index.similar(args.query, args.k, args.language)]
+        if not matches:
+            print(f"❌ Không có gợi ý cho: {args.query}")
+        for word, pos in matches:
+            row = vocab.row(pos)
+            print(f"{row['word']} – {row['meaning']} ({row['language']})")